@@ -0,0 +1,135 @@
+"""
+Columnar analytics table mirroring the ledger's documents.
+
+Amounts (int64 cents), types, categories, job ids and dates are kept in
+NumPy arrays so period breakdowns (by category, month, day or job over an
+arbitrary date range) are single vectorized passes instead of loops over
+records, and sums stay exact integers.
+NumPy is optional: without it the ledger answers the same questions
+from its date-ordered index.
+"""
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+TYPE_CODES = {'income': 1, 'expense': 2}
+
+
+def available():
+    return np is not None
+
+
+def _to_day(date):
+    try:
+        return np.datetime64(date, 'D')
+    except (TypeError, ValueError):
+        return np.datetime64('NaT', 'D')
+
+
+def _group_sums(codes, amounts, size):
+    """Exact int64 sum of `amounts` per code (bincount would go through float64)"""
+    sums = np.zeros(size, dtype=np.int64)
+    np.add.at(sums, codes, amounts)
+    return sums
+
+
+class DocumentTable:
+    """Column store: amount i8 (cents), type i1, category i4, job_id i4, date M8[D].
+
+    Rows are appended; an updated document overwrites its row in place.
+    """
+
+    def __init__(self, capacity=1024):
+        self.size = 0
+        self.amount = np.zeros(capacity, dtype=np.int64)
+        self.doc_type = np.zeros(capacity, dtype=np.int8)
+        self.category = np.zeros(capacity, dtype=np.int32)
+        self.job_id = np.full(capacity, -1, dtype=np.int32)
+        self.date = np.full(capacity, np.datetime64('NaT'), dtype='datetime64[D]')
+        self.categories = []
+        self._category_codes = {}
+        self._rows = {}
+
+    def _grow(self, needed=1):
+        capacity = max(len(self.amount), 1)
+        while capacity < self.size + needed:
+            capacity *= 2
+        for name in ('amount', 'doc_type', 'category', 'job_id', 'date'):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def _category_code(self, category):
+        code = self._category_codes.get(category)
+        if code is None:
+            code = self._category_codes[category] = len(self.categories)
+            self.categories.append(category)
+        return code
+
+    def _set(self, i, doc):
+        self.amount[i] = doc.amount_cents
+        self.doc_type[i] = TYPE_CODES.get(doc.type, 0)
+        self.category[i] = self._category_code(doc.category or 'Other')
+        self.job_id[i] = -1 if doc.job_id is None else doc.job_id
+        self.date[i] = _to_day(doc.date)
+
+    def append(self, doc):
+        if self.size == len(self.amount):
+            self._grow()
+        self._set(self.size, doc)
+        self._rows[doc.id] = self.size
+        self.size += 1
+
+    def extend(self, docs):
+        """Append a batch of documents with one slice assignment per column"""
+        count = len(docs)
+        if self.size + count > len(self.amount):
+            self._grow(count)
+        rows = slice(self.size, self.size + count)
+        self.amount[rows] = [doc.amount_cents for doc in docs]
+        self.doc_type[rows] = [TYPE_CODES.get(doc.type, 0) for doc in docs]
+        self.category[rows] = [self._category_code(doc.category or 'Other') for doc in docs]
+        self.job_id[rows] = [-1 if doc.job_id is None else doc.job_id for doc in docs]
+        self.date[rows] = [_to_day(doc.date) for doc in docs]
+        self._rows.update((doc.id, self.size + offset) for offset, doc in enumerate(docs))
+        self.size += count
+
+    def update(self, docs):
+        """Overwrite the rows of documents already in the table"""
+        for doc in docs:
+            self._set(self._rows[doc.id], doc)
+
+    def _mask(self, doc_type, start, end):
+        mask = self.doc_type[:self.size] == TYPE_CODES.get(doc_type, 0)
+        dates = self.date[:self.size]
+        if start:
+            mask &= dates >= _to_day(start)
+        if end:
+            mask &= dates <= _to_day(end)
+        return mask
+
+    def breakdown(self, doc_type, by='category', start=None, end=None):
+        """{group: amount in cents} for one document type over an inclusive date range"""
+        mask = self._mask(doc_type, start, end)
+        amounts = self.amount[:self.size][mask]
+        if by == 'category':
+            codes = self.category[:self.size][mask]
+            sums = _group_sums(codes, amounts, len(self.categories))
+            counts = np.bincount(codes, minlength=len(self.categories))
+            return {self.categories[code]: int(sums[code]) for code in np.flatnonzero(counts)}
+        if by == 'job':
+            keys = self.job_id[:self.size][mask]
+        elif by in ('month', 'day'):
+            keys = self.date[:self.size][mask].astype('datetime64[M]' if by == 'month' else 'datetime64[D]')
+        else:
+            raise ValueError(f'Unknown grouping: {by}')
+        groups, inverse = np.unique(keys, return_inverse=True)
+        sums = _group_sums(inverse.ravel(), amounts, len(groups))
+        if by == 'job':
+            labels = [None if g < 0 else int(g) for g in groups]
+        else:
+            labels = [None if np.isnat(g) else str(g) for g in groups]
+        return dict(zip(labels, (int(v) for v in sums)))
@@ -0,0 +1,167 @@
+"""
+Request and response helpers for the JSON API (docs/API.md).
+
+- Sparse fieldsets: `?fields=id,number,status` returns only those record
+  fields.
+- Page-number pagination: `?page=2&per_page=50`.
+- Batch writes: a request body may be one object or an array of up to
+  MAX_BATCH objects. A batch is validated as a whole before anything is
+  written, then stored in one ledger call (one transaction).
+
+Field names are the record fields (records.Document / records.Job). The
+names used in the original API docs (job_number, customer_name, revenue,
+vendor_name, total_amount) are accepted as aliases. Money can be sent in
+dollars (amount, quoted_price) or cents (amount_cents,
+quoted_price_cents). Fields the server owns (ids, stored receipt files
+and extraction results) cannot be set through the API.
+"""
+
+from money import to_cents
+from records import DOCUMENT_TYPES, Document, Job
+
+DEFAULT_PER_PAGE = 20
+MAX_PER_PAGE = 500
+MAX_BATCH = 1000
+
+ALIASES = {
+    Job: {'job_number': 'number', 'customer_name': 'customer', 'revenue': 'quoted_price'},
+    Document: {'vendor_name': 'vendor', 'total_amount': 'amount'},
+}
+# Fields only the server writes: the receipt file comes from an upload and
+# extraction from the background task
+READ_ONLY = {
+    Job: ('id',),
+    Document: ('id', 'file_info', 'extraction'),
+}
+# Dollar inputs and the cent fields they are stored in
+DOLLAR_FIELDS = {'quoted_price': 'quoted_price_cents', 'amount': 'amount_cents'}
+
+
+class ApiError(ValueError):
+    """A request the API rejects; `index` points at the offending batch item"""
+
+    def __init__(self, message, status=400, index=None):
+        super().__init__(message)
+        self.status = status
+        self.index = index
+
+    def to_dict(self):
+        body = {'error': str(self)}
+        if self.index is not None:
+            body['index'] = self.index
+        return body
+
+
+def parse_fields(value, record_type):
+    """'id,number' -> ('id', 'number'); None (every field) when not given"""
+    if not value:
+        return None
+    fields = tuple(field.strip() for field in value.split(',') if field.strip())
+    unknown = [field for field in fields if field not in record_type.__slots__]
+    if unknown:
+        raise ApiError(f'Unknown fields: {", ".join(unknown)}')
+    return fields
+
+
+def _positive_int(value, default, name):
+    if value is None or value == '':
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise ApiError(f'{name} must be a positive integer')
+    return number
+
+
+def paginate(items, page=None, per_page=None):
+    """(items on the page, page metadata) for 1-based page numbers"""
+    page = _positive_int(page, 1, 'page')
+    per_page = min(_positive_int(per_page, DEFAULT_PER_PAGE, 'per_page'), MAX_PER_PAGE)
+    start = (page - 1) * per_page
+    meta = {
+        'page': page,
+        'per_page': per_page,
+        'total': len(items),
+        'pages': (len(items) + per_page - 1) // per_page,
+    }
+    return items[start:start + per_page], meta
+
+
+def batch_items(body):
+    """(list of objects, whether the body was an array) from a parsed JSON body"""
+    if isinstance(body, dict):
+        return [body], False
+    if not isinstance(body, list):
+        raise ApiError('Expected a JSON object or an array of objects')
+    if not body:
+        raise ApiError('Empty batch')
+    if len(body) > MAX_BATCH:
+        raise ApiError(f'At most {MAX_BATCH} items per batch', status=413)
+    for index, item in enumerate(body):
+        if not isinstance(item, dict):
+            raise ApiError('Expected a JSON object', index=index)
+    return body, True
+
+
+def _changes(record_type, data, index):
+    """Record constructor arguments from a request object"""
+    aliases = ALIASES.get(record_type, {})
+    changes = {}
+    for name, value in data.items():
+        field = aliases.get(name, name)
+        if field in DOLLAR_FIELDS:
+            field, value = DOLLAR_FIELDS[field], to_cents(value)
+        if field not in record_type.__slots__:
+            raise ApiError(f'Unknown field: {name}', index=index)
+        if field in READ_ONLY[record_type]:
+            raise ApiError(f'Read-only field: {name}', index=index)
+        changes[field] = value
+    return changes
+
+
+def _checked(record, job_ids, index):
+    if isinstance(record, Document):
+        if record.type not in DOCUMENT_TYPES:
+            raise ApiError('type must be income or expense', index=index)
+        if record.job_id is not None and job_ids is not None and record.job_id not in job_ids:
+            raise ApiError(f'Unknown job_id {record.job_id}', index=index)
+    return record
+
+
+def new_records(record_type, items, job_ids=None):
+    """Validated new records for a batch of request objects"""
+    records = []
+    for index, data in enumerate(items):
+        try:
+            record = record_type(**_changes(record_type, data, index))
+        except ApiError:
+            raise
+        except (TypeError, ValueError) as e:
+            raise ApiError(str(e), index=index)
+        records.append(_checked(record, job_ids, index))
+    return records
+
+
+def updated_records(items, lookup, job_ids=None, ids=None):
+    """New versions of stored records for a batch of request objects.
+
+    Each object names its record with `id` unless `ids` gives them;
+    `lookup` returns the stored record for an id (None if there is none).
+    """
+    records = []
+    for index, data in enumerate(items):
+        data = dict(data)
+        record_id = ids[index] if ids is not None else data.pop('id', None)
+        current = lookup(record_id) if record_id is not None else None
+        if current is None:
+            raise ApiError(f'Resource not found: {record_id}', status=404, index=index)
+        try:
+            record = current.replace(**_changes(type(current), data, index))
+        except ApiError:
+            raise
+        except (TypeError, ValueError) as e:
+            raise ApiError(str(e), index=index)
+        records.append(_checked(record, job_ids, index))
+    return records
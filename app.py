@@ -1,1038 +1,249 @@
+import functools
 import os
-from datetime import datetime, timedelta
-from flask import Flask, request, redirect, url_for, session, jsonify, make_response
+from datetime import date, datetime, timedelta
+from flask import (Flask, request, redirect, url_for, session, jsonify, make_response, abort, send_file,
+                   stream_with_context, has_request_context, g)
+from markupsafe import escape
+from werkzeug.local import LocalProxy
+from werkzeug.utils import send_file as send_file_from
 import json
 import random
+import time
 
-app = Flask(__name__)
-app.secret_key = os.environ.get('SECRET_KEY', 'profit-tracker-secret-2024')
-
-# Enhanced data storage
-users = {'admin': 'admin123'}
-documents = []
-jobs = []
-uploaded_files = []  # Store uploaded file metadata
-
-# Sample data for testing - as requested by user
-def init_sample_data():
-    global jobs, documents
-    
-    # Sample jobs with realistic data
-    jobs = [
-        {
-            'id': 1,
-            'number': 'JOB-2024-001',
-            'customer': 'Thompson Kitchen Remodel',
-            'description': 'Complete kitchen renovation including cabinets, countertops, backsplash, and appliances',
-            'quoted_price': 32500,
-            'status': 'In Progress',
-            'start_date': '2024-01-08',
-            'estimated_end': '2024-02-20',
-            'progress': 75,
-            'health': 'healthy',
-            'notes': 'Cabinets installed, countertops arriving next week'
-        },
-        {
-            'id': 2,
-            'number': 'JOB-2024-002',
-            'customer': 'Martinez Bathroom',
-            'description': 'Master bathroom remodel - full gut renovation with luxury fixtures',
-            'quoted_price': 18500,
-            'status': 'In Progress',
-            'start_date': '2024-01-15',
-            'estimated_end': '2024-02-10',
-            'progress': 40,
-            'health': 'warning',
-            'notes': 'Plumbing rough-in complete, waiting on special order vanity'
-        },
-        {
-            'id': 3,
-            'number': 'JOB-2023-087',
-            'customer': 'Wilson Deck Project',
-            'description': 'Build 16x20 composite deck with pergola and built-in seating',
-            'quoted_price': 22000,
-            'status': 'Completed',
-            'start_date': '2023-11-01',
-            'estimated_end': '2023-11-30',
-            'progress': 100,
-            'health': 'healthy',
-            'notes': 'Project completed on time, customer very happy'
-        },
-        {
-            'id': 4,
-            'number': 'JOB-2024-003',
-            'customer': 'Chen Basement Finishing',
-            'description': 'Finish 1200 sq ft basement with bedroom, bathroom, and rec room',
-            'quoted_price': 45000,
-            'status': 'Quoted',
-            'start_date': '2024-02-01',
-            'estimated_end': '2024-03-15',
-            'progress': 0,
-            'health': 'healthy',
-            'notes': 'Waiting for permit approval'
-        }
-    ]
-    
-    # Sample documents with realistic data
-    documents = [
-        # Thompson Kitchen expenses
-        {'id': 1, 'type': 'expense', 'job_id': '1', 'vendor': 'Home Depot', 'amount': 4250, 'date': '2024-01-10', 'description': 'Kitchen cabinets - shaker white', 'category': 'Materials'},
-        {'id': 2, 'type': 'expense', 'job_id': '1', 'vendor': 'Ferguson', 'amount': 2800, 'date': '2024-01-12', 'description': 'Kohler sink and faucet package', 'category': 'Materials'},
-        {'id': 3, 'type': 'income', 'job_id': '1', 'vendor': 'Thompson Kitchen Remodel', 'amount': 16250, 'date': '2024-01-08', 'description': '50% deposit', 'category': 'Payment'},
-        {'id': 4, 'type': 'expense', 'job_id': '1', 'vendor': 'Mike Rodriguez', 'amount': 2400, 'date': '2024-01-18', 'description': 'Cabinet installation labor', 'category': 'Labor'},
-        
-        # Martinez Bathroom expenses
-        {'id': 5, 'type': 'expense', 'job_id': '2', 'vendor': 'Tile Shop', 'amount': 1850, 'date': '2024-01-16', 'description': 'Porcelain tile and grout', 'category': 'Materials'},
-        {'id': 6, 'type': 'expense', 'job_id': '2', 'vendor': 'ProPlumb LLC', 'amount': 3200, 'date': '2024-01-20', 'description': 'Plumbing rough-in and fixtures', 'category': 'Subcontractor'},
-        {'id': 7, 'type': 'income', 'job_id': '2', 'vendor': 'Martinez Bathroom', 'amount': 9250, 'date': '2024-01-15', 'description': '50% deposit', 'category': 'Payment'},
-        
-        # Wilson Deck (completed)
-        {'id': 8, 'type': 'expense', 'job_id': '3', 'vendor': 'Lumber Liquidators', 'amount': 8500, 'date': '2023-11-02', 'description': 'Composite decking and framing lumber', 'category': 'Materials'},
-        {'id': 9, 'type': 'expense', 'job_id': '3', 'vendor': 'County Permits', 'amount': 350, 'date': '2023-10-28', 'description': 'Building permit', 'category': 'Permits'},
-        {'id': 10, 'type': 'income', 'job_id': '3', 'vendor': 'Wilson Deck Project', 'amount': 22000, 'date': '2023-11-30', 'description': 'Final payment', 'category': 'Payment'},
-        
-        # General expenses not tied to specific jobs
-        {'id': 11, 'type': 'expense', 'job_id': '', 'vendor': 'State Farm', 'amount': 450, 'date': '2024-01-01', 'description': 'Monthly liability insurance', 'category': 'Other'},
-        {'id': 12, 'type': 'expense', 'job_id': '', 'vendor': 'DeWalt Tools', 'amount': 899, 'date': '2024-01-05', 'description': 'New miter saw', 'category': 'Equipment'},
-    ]
-
-init_sample_data()
-
-def create_base_template(title, content, show_nav=True, page_type='default'):
-    nav_html = f'''
-        <nav class="main-nav">
-            <a href="/dashboard" class="nav-link {'active' if page_type == 'dashboard' else ''}">
-                <svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
-                    <rect x="3" y="3" width="7" height="7"></rect>
-                    <rect x="14" y="3" width="7" height="7"></rect>
-                    <rect x="14" y="14" width="7" height="7"></rect>
-                    <rect x="3" y="14" width="7" height="7"></rect>
-                </svg>
-                <span>Dashboard</span>
-            </a>
-            <a href="/jobs" class="nav-link {'active' if page_type == 'jobs' else ''}">
-                <svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
-                    <path d="M20 7h-9a2 2 0 0 0-2 2v10a2 2 0 0 0 2 2h9a2 2 0 0 0 2-2V9a2 2 0 0 0-2-2z"></path>
-                    <path d="M5 3h9a2 2 0 0 1 2 2v2H7a2 2 0 0 0-2 2v8H3a1 1 0 0 1-1-1V5a2 2 0 0 1 2-2z"></path>
-                </svg>
-                <span>Jobs</span>
-            </a>
-            <a href="/invoices" class="nav-link {'active' if page_type == 'invoices' else ''}">
-                <svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
-                    <path d="M14 2H6a2 2 0 0 0-2 2v16a2 2 0 0 0 2 2h12a2 2 0 0 0 2-2V8z"></path>
-                    <path d="M14 2v6h6"></path>
-                    <line x1="16" y1="13" x2="8" y2="13"></line>
-                    <line x1="16" y1="17" x2="8" y2="17"></line>
-                    <line x1="10" y1="9" x2="8" y2="9"></line>
-                </svg>
-                <span>Invoices</span>
-            </a>
-            <a href="/expenses" class="nav-link {'active' if page_type == 'expenses' else ''}">
-                <svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
-                    <rect x="2" y="7" width="20" height="14" rx="2" ry="2"></rect>
-                    <path d="M16 3h-8v4h8z"></path>
-                </svg>
-                <span>Expenses</span>
-            </a>
-            <a href="/reports" class="nav-link {'active' if page_type == 'reports' else ''}">
-                <svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
-                    <path d="M21.21 15.89A10 10 0 1 1 8 2.83"></path>
-                    <path d="M22 12A10 10 0 0 0 12 2v10z"></path>
-                </svg>
-                <span>Analytics</span>
-            </a>
-        </nav>
-        <div class="header-actions">
-            <button class="quick-add-btn" onclick="showQuickAdd()">
-                <svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
-                    <circle cx="12" cy="12" r="10"></circle>
-                    <line x1="12" y1="8" x2="12" y2="16"></line>
-                    <line x1="8" y1="12" x2="16" y2="12"></line>
-                </svg>
-                Quick Add
-            </button>
-            <div class="user-menu">
-                <div class="avatar">{session.get('username', 'U')[0].upper()}</div>
-                <span class="username">{session.get('username', 'User')}</span>
-                <a href="/logout" class="logout-btn">
-                    <svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
-                        <path d="M9 21H5a2 2 0 0 1-2-2V5a2 2 0 0 1 2-2h4"></path>
-                        <polyline points="16 17 21 12 16 7"></polyline>
-                        <line x1="21" y1="12" x2="9" y2="12"></line>
-                    </svg>
-                </a>
-            </div>
-        </div>
-    ''' if show_nav else ''
-    
-    return f'''
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{title} - Profit Tracker AI</title>
-    <link rel="preconnect" href="https://fonts.googleapis.com">
-    <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
-    <link href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap" rel="stylesheet">
-    <style>
-        :root {{
-            --primary: #5E3AEE;
-            --primary-dark: #4829CC;
-            --primary-light: #F0EBFF;
-            --secondary: #6B7280;
-            --success: #10B981;
-            --danger: #EF4444;
-            --warning: #F59E0B;
-            --info: #3B82F6;
-            --dark: #111827;
-            --light: #F9FAFB;
-            --white: #FFFFFF;
-            --border: #E5E7EB;
-            --shadow-sm: 0 1px 2px 0 rgba(0, 0, 0, 0.05);
-            --shadow: 0 1px 3px 0 rgba(0, 0, 0, 0.1), 0 1px 2px 0 rgba(0, 0, 0, 0.06);
-            --shadow-md: 0 4px 6px -1px rgba(0, 0, 0, 0.1), 0 2px 4px -1px rgba(0, 0, 0, 0.06);
-            --shadow-lg: 0 10px 15px -3px rgba(0, 0, 0, 0.1), 0 4px 6px -2px rgba(0, 0, 0, 0.05);
-            --shadow-xl: 0 20px 25px -5px rgba(0, 0, 0, 0.1), 0 10px 10px -5px rgba(0, 0, 0, 0.04);
-            --transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
-        }}
-        
-        * {{
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }}
-        
-        body {{
-            font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif;
-            background: #FAFBFC;
-            color: var(--dark);
-            line-height: 1.6;
-            -webkit-font-smoothing: antialiased;
-            -moz-osx-font-smoothing: grayscale;
-        }}
-        
-        /* Professional Header */
-        .header {{
-            background: var(--white);
-            box-shadow: var(--shadow-sm);
-            position: sticky;
-            top: 0;
-            z-index: 100;
-            backdrop-filter: blur(10px);
-            background: rgba(255, 255, 255, 0.95);
-        }}
-        
-        .header-content {{
-            max-width: 1400px;
-            margin: 0 auto;
-            padding: 0 2rem;
-            height: 72px;
-            display: flex;
-            align-items: center;
-            justify-content: space-between;
-        }}
-        
-        .logo {{
-            font-size: 1.5rem;
-            font-weight: 700;
-            color: var(--primary);
-            text-decoration: none;
-            display: flex;
-            align-items: center;
-            gap: 0.75rem;
-            letter-spacing: -0.02em;
-        }}
-        
-        .logo-icon {{
-            width: 40px;
-            height: 40px;
-            background: linear-gradient(135deg, var(--primary) 0%, var(--primary-dark) 100%);
-            border-radius: 12px;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            color: white;
-            font-weight: 700;
-            font-size: 1.125rem;
-        }}
-        
-        /* Modern Navigation */
-        .main-nav {{
-            display: flex;
-            gap: 0.5rem;
-            align-items: center;
-        }}
-        
-        .nav-link {{
-            padding: 0.625rem 1rem;
-            color: var(--secondary);
-            text-decoration: none;
-            border-radius: 0.75rem;
-            transition: var(--transition);
-            display: flex;
-            align-items: center;
-            gap: 0.625rem;
-            font-weight: 500;
-            font-size: 0.9375rem;
-            position: relative;
-        }}
-        
-        .nav-link:hover {{
-            color: var(--primary);
-            background: var(--primary-light);
-        }}
-        
-        .nav-link.active {{
-            color: var(--primary);
-            background: var(--primary-light);
-        }}
-        
-        .nav-link svg {{
-            width: 20px;
-            height: 20px;
-            stroke-width: 2.5;
-        }}
-        
-        /* Header Actions */
-        .header-actions {{
-            display: flex;
-            align-items: center;
-            gap: 1.5rem;
-        }}
-        
-        .quick-add-btn {{
-            padding: 0.625rem 1.25rem;
-            background: var(--primary);
-            color: white;
-            border: none;
-            border-radius: 0.75rem;
-            font-weight: 600;
-            font-size: 0.9375rem;
-            cursor: pointer;
-            transition: var(--transition);
-            display: flex;
-            align-items: center;
-            gap: 0.5rem;
-            box-shadow: var(--shadow);
-        }}
-        
-        .quick-add-btn:hover {{
-            background: var(--primary-dark);
-            transform: translateY(-1px);
-            box-shadow: var(--shadow-md);
-        }}
-        
-        .user-menu {{
-            display: flex;
-            align-items: center;
-            gap: 0.75rem;
-        }}
-        
-        .avatar {{
-            width: 36px;
-            height: 36px;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            border-radius: 50%;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            font-weight: 600;
-            font-size: 0.875rem;
-        }}
-        
-        .username {{
-            font-weight: 500;
-            color: var(--dark);
-        }}
-        
-        .logout-btn {{
-            padding: 0.5rem;
-            color: var(--secondary);
-            text-decoration: none;
-            border-radius: 0.5rem;
-            transition: var(--transition);
-        }}
-        
-        .logout-btn:hover {{
-            color: var(--danger);
-            background: rgba(239, 68, 68, 0.1);
-        }}
-        
-        /* Main Content */
-        .container {{
-            max-width: 1400px;
-            margin: 0 auto;
-            padding: 2rem;
-        }}
-        
-        /* Modern Cards */
-        .card {{
-            background: var(--white);
-            border-radius: 1rem;
-            box-shadow: var(--shadow);
-            overflow: hidden;
-            margin-bottom: 1.5rem;
-            transition: var(--transition);
-        }}
-        
-        .card:hover {{
-            box-shadow: var(--shadow-md);
-        }}
-        
-        .card-header {{
-            padding: 1.5rem 2rem;
-            border-bottom: 1px solid var(--border);
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-        }}
-        
-        .card-body {{
-            padding: 2rem;
-        }}
-        
-        .card-title {{
-            font-size: 1.125rem;
-            font-weight: 600;
-            color: var(--dark);
-            letter-spacing: -0.01em;
-        }}
-        
-        /* Stats Cards with Gradients */
-        .stats-grid {{
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(280px, 1fr));
-            gap: 1.5rem;
-            margin-bottom: 2rem;
-        }}
-        
-        .stat-card {{
-            position: relative;
-            overflow: hidden;
-            padding: 1.75rem;
-            border-radius: 1rem;
-            color: white;
-            transition: var(--transition);
-        }}
-        
-        .stat-card::before {{
-            content: '';
-            position: absolute;
-            top: 0;
-            right: 0;
-            bottom: 0;
-            left: 0;
-            background: linear-gradient(135deg, rgba(255,255,255,0.1) 0%, rgba(255,255,255,0) 100%);
-            pointer-events: none;
-        }}
-        
-        .stat-card:hover {{
-            transform: translateY(-2px);
-            box-shadow: var(--shadow-lg);
-        }}
-        
-        .stat-card.revenue {{
-            background: linear-gradient(135deg, #10B981 0%, #059669 100%);
-        }}
-        
-        .stat-card.expenses {{
-            background: linear-gradient(135deg, #EF4444 0%, #DC2626 100%);
-        }}
-        
-        .stat-card.profit {{
-            background: linear-gradient(135deg, #5E3AEE 0%, #4829CC 100%);
-        }}
-        
-        .stat-card.jobs {{
-            background: linear-gradient(135deg, #3B82F6 0%, #2563EB 100%);
-        }}
-        
-        .stat-label {{
-            font-size: 0.875rem;
-            font-weight: 500;
-            opacity: 0.9;
-            margin-bottom: 0.5rem;
-            text-transform: uppercase;
-            letter-spacing: 0.05em;
-        }}
-        
-        .stat-value {{
-            font-size: 2rem;
-            font-weight: 700;
-            margin-bottom: 0.5rem;
-            line-height: 1;
-        }}
-        
-        .stat-change {{
-            font-size: 0.875rem;
-            display: flex;
-            align-items: center;
-            gap: 0.25rem;
-        }}
-        
-        .stat-icon {{
-            position: absolute;
-            right: 1.5rem;
-            bottom: 1.5rem;
-            opacity: 0.2;
-        }}
-        
-        /* Modern Tables */
-        .table-container {{
-            overflow-x: auto;
-            border-radius: 0.75rem;
-        }}
-        
-        table {{
-            width: 100%;
-            border-collapse: collapse;
-        }}
-        
-        th {{
-            background: #F9FAFB;
-            padding: 1rem 1.5rem;
-            text-align: left;
-            font-weight: 600;
-            font-size: 0.75rem;
-            color: var(--secondary);
-            text-transform: uppercase;
-            letter-spacing: 0.05em;
-            border-bottom: 1px solid var(--border);
-        }}
-        
-        td {{
-            padding: 1rem 1.5rem;
-            border-bottom: 1px solid var(--border);
-            font-size: 0.9375rem;
-        }}
-        
-        tr:hover {{
-            background: #FAFBFC;
-        }}
-        
-        /* Modern Badges */
-        .badge {{
-            padding: 0.375rem 0.875rem;
-            border-radius: 9999px;
-            font-size: 0.75rem;
-            font-weight: 600;
-            display: inline-block;
-            text-transform: uppercase;
-            letter-spacing: 0.025em;
-        }}
-        
-        .badge-success {{
-            background: #D1FAE5;
-            color: #065F46;
-        }}
-        
-        .badge-warning {{
-            background: #FEF3C7;
-            color: #92400E;
-        }}
-        
-        .badge-danger {{
-            background: #FEE2E2;
-            color: #991B1B;
-        }}
-        
-        .badge-info {{
-            background: #DBEAFE;
-            color: #1E40AF;
-        }}
-        
-        /* Progress Indicators */
-        .progress-bar {{
-            width: 100%;
-            height: 6px;
-            background: #E5E7EB;
-            border-radius: 9999px;
-            overflow: hidden;
-            position: relative;
-        }}
-        
-        .progress-fill {{
-            height: 100%;
-            background: linear-gradient(90deg, var(--primary) 0%, var(--primary-dark) 100%);
-            border-radius: 9999px;
-            transition: width 0.5s cubic-bezier(0.4, 0, 0.2, 1);
-            position: relative;
-        }}
-        
-        .progress-fill::after {{
-            content: '';
-            position: absolute;
-            top: 0;
-            right: 0;
-            bottom: 0;
-            left: 0;
-            background: linear-gradient(90deg, transparent 0%, rgba(255,255,255,0.3) 50%, transparent 100%);
-            animation: shimmer 2s infinite;
-        }}
-        
-        @keyframes shimmer {{
-            0% {{ transform: translateX(-100%); }}
-            100% {{ transform: translateX(100%); }}
-        }}
-        
-        /* Modern Buttons */
-        .btn {{
-            padding: 0.625rem 1.25rem;
-            border: none;
-            border-radius: 0.75rem;
-            font-size: 0.9375rem;
-            font-weight: 600;
-            cursor: pointer;
-            text-decoration: none;
-            display: inline-flex;
-            align-items: center;
-            gap: 0.5rem;
-            transition: var(--transition);
-            position: relative;
-            overflow: hidden;
-        }}
-        
-        .btn::before {{
-            content: '';
-            position: absolute;
-            top: 0;
-            left: 0;
-            width: 100%;
-            height: 100%;
-            background: rgba(255,255,255,0.1);
-            transform: translateX(-100%);
-            transition: transform 0.3s;
-        }}
-        
-        .btn:hover::before {{
-            transform: translateX(0);
-        }}
-        
-        .btn-primary {{
-            background: var(--primary);
-            color: white;
-            box-shadow: var(--shadow);
-        }}
-        
-        .btn-primary:hover {{
-            background: var(--primary-dark);
-            transform: translateY(-1px);
-            box-shadow: var(--shadow-md);
-        }}
-        
-        .btn-secondary {{
-            background: #F3F4F6;
-            color: var(--dark);
-        }}
-        
-        .btn-secondary:hover {{
-            background: #E5E7EB;
-        }}
-        
-        /* Action Grid */
-        .action-grid {{
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(240px, 1fr));
-            gap: 1.5rem;
-            margin-bottom: 2rem;
-        }}
-        
-        .action-card {{
-            background: var(--white);
-            border-radius: 1rem;
-            padding: 2rem;
-            text-align: center;
-            text-decoration: none;
-            color: var(--dark);
-            transition: var(--transition);
-            border: 2px solid transparent;
-            position: relative;
-            overflow: hidden;
-        }}
-        
-        .action-card::before {{
-            content: '';
-            position: absolute;
-            top: 0;
-            left: 0;
-            right: 0;
-            height: 4px;
-            background: linear-gradient(90deg, var(--primary) 0%, var(--primary-dark) 100%);
-            transform: scaleX(0);
-            transition: transform 0.3s;
-        }}
-        
-        .action-card:hover {{
-            border-color: var(--primary-light);
-            transform: translateY(-4px);
-            box-shadow: var(--shadow-lg);
-        }}
-        
-        .action-card:hover::before {{
-            transform: scaleX(1);
-        }}
-        
-        .action-icon {{
-            width: 56px;
-            height: 56px;
-            background: var(--primary-light);
-            color: var(--primary);
-            border-radius: 1rem;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            margin: 0 auto 1rem;
-            transition: var(--transition);
-        }}
-        
-        .action-card:hover .action-icon {{
-            transform: scale(1.1);
-            background: var(--primary);
-            color: white;
-        }}
-        
-        .action-title {{
-            font-weight: 600;
-            font-size: 1.125rem;
-            margin-bottom: 0.5rem;
-        }}
-        
-        .action-desc {{
-            font-size: 0.875rem;
-            color: var(--secondary);
-        }}
-        
-        /* Charts */
-        .chart-container {{
-            background: var(--white);
-            padding: 2rem;
-            border-radius: 1rem;
-            box-shadow: var(--shadow);
-            height: 400px;
-            position: relative;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-        }}
-        
-        /* Health Indicators */
-        .health-indicator {{
-            width: 12px;
-            height: 12px;
-            border-radius: 50%;
-            display: inline-block;
-            animation: pulse 2s infinite;
-        }}
-        
-        .health-indicator.healthy {{
-            background: var(--success);
-        }}
-        
-        .health-indicator.warning {{
-            background: var(--warning);
-        }}
-        
-        .health-indicator.critical {{
-            background: var(--danger);
-        }}
-        
-        @keyframes pulse {{
-            0% {{ opacity: 1; transform: scale(1); }}
-            50% {{ opacity: 0.6; transform: scale(1.2); }}
-            100% {{ opacity: 1; transform: scale(1); }}
-        }}
-        
-        /* Forms */
-        .form-group {{
-            margin-bottom: 1.5rem;
-        }}
-        
-        label {{
-            display: block;
-            margin-bottom: 0.5rem;
-            font-weight: 500;
-            color: var(--dark);
-            font-size: 0.875rem;
-        }}
-        
-        input, select, textarea {{
-            width: 100%;
-            padding: 0.75rem 1rem;
-            border: 2px solid var(--border);
-            border-radius: 0.75rem;
-            font-size: 0.9375rem;
-            transition: var(--transition);
-            background: var(--white);
-        }}
-        
-        input:focus, select:focus, textarea:focus {{
-            outline: none;
-            border-color: var(--primary);
-            box-shadow: 0 0 0 3px rgba(94, 58, 238, 0.1);
-        }}
-        
-        /* AI Insights Panel */
-        .ai-insights {{
-            background: linear-gradient(135deg, var(--primary-light) 0%, rgba(94, 58, 238, 0.05) 100%);
-            border: 1px solid rgba(94, 58, 238, 0.1);
-            border-radius: 1rem;
-            padding: 1.5rem;
-            margin-bottom: 2rem;
-        }}
-        
-        .ai-insights-header {{
-            display: flex;
-            align-items: center;
-            gap: 0.75rem;
-            margin-bottom: 1rem;
-        }}
-        
-        .ai-icon {{
-            width: 32px;
-            height: 32px;
-            background: var(--primary);
-            color: white;
-            border-radius: 0.5rem;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-        }}
-        
-        .ai-insights-title {{
-            font-weight: 600;
-            color: var(--primary);
-        }}
-        
-        .ai-insights-content {{
-            font-size: 0.9375rem;
-            color: var(--dark);
-            line-height: 1.6;
-        }}
-        
-        /* Responsive */
-        @media (max-width: 768px) {{
-            .header-content {{
-                padding: 0 1rem;
-            }}
-            
-            .main-nav {{
-                display: none;
-            }}
-            
-            .container {{
-                padding: 1rem;
-            }}
-            
-            .stats-grid {{
-                grid-template-columns: 1fr;
-            }}
-            
-            .action-grid {{
-                grid-template-columns: 1fr;
-            }}
-        }}
-        
-        /* Loading States */
-        .skeleton {{
-            background: linear-gradient(90deg, #f0f0f0 25%, #e0e0e0 50%, #f0f0f0 75%);
-            background-size: 200% 100%;
-            animation: loading 1.5s infinite;
-        }}
+import api
+from blobstore import BlobStore, is_digest
+from cache import DEFAULT_MAX_BYTES, ResponseCache
+import exporter
+from importer import detect_format, import_documents, read_rows
+from layout import PageShell
+from ledger import date_key, decode_cursor, encode_cursor
+from money import format_cents, to_cents
+from performance import job_performance, top_jobs_by_margin
+from profiling import RequestProfiler
+from records import Document, Extraction, Job, UploadedFile, parse_date, parse_id
+from taskqueue import open_queue
+from tenants import DEFAULT_COMPANY, TenantRouter, company_id, parse_shards
+
+app = Flask(__name__)
+app.secret_key = os.environ.get('SECRET_KEY', 'profit-tracker-secret-2024')
+# Static assets are linked with a content fingerprint, so they can be cached for a year
+app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 31536000
+
+# Enhanced data storage
+users = {'admin': 'admin123'}
+# Company of each user; users signing up get a company of their own
+user_companies = {'admin': DEFAULT_COMPANY}
+# One ledger of indexed documents and jobs per company, persisted when DATABASE_URL is set
+tenants = TenantRouter(os.environ.get('DATABASE_URL'), parse_shards(os.environ.get('TENANT_SHARDS')))
+
+def current_company():
+    """Company of the logged-in user; the default company outside requests and for visitors"""
+    if not has_request_context():
+        return DEFAULT_COMPANY
+    username = session.get('username')
+    if not username:
+        return DEFAULT_COMPANY
+    return user_companies.get(username) or company_id(username)
+
+def current_store():
+    """Ledger of the current company, looked up once per request and kept for the rest of it"""
+    if not has_request_context():
+        return tenants.store_for(DEFAULT_COMPANY)
+    if 'store' not in g:
+        g.store = tenants.store_for(current_company())
+    return g.store
+
+# The current company's ledger; routes use it as if it were the only one
+store = LocalProxy(current_store)
+blob_store = BlobStore(os.path.join(app.root_path, os.environ.get('UPLOAD_FOLDER', 'uploads')))
+# Behind nginx, its internal location for the upload folder (e.g. /uploads); receipts are then
+# sent by nginx through X-Accel-Redirect once the app has checked the login and company
+UPLOAD_ACCEL_REDIRECT = os.environ.get('UPLOAD_ACCEL_REDIRECT', '').rstrip('/')
+page_shell = PageShell(app.static_folder, app.static_url_path)
+# Receipt extraction runs off the request path; see taskqueue.open_queue for TASK_QUEUE values
+task_queue = open_queue(os.environ.get('TASK_QUEUE'), tenants)
+# Per-route request metrics for /metrics; sampled requests are timed by phase (see profiling.py)
+profiler = RequestProfiler(
+    sample_rate=float(os.environ.get('PROFILE_SAMPLE_RATE', 0)),
+    token=os.environ.get('PROFILE_TOKEN'),
+    profile_dir=os.environ.get('PROFILE_DIR'),
+    profiler=os.environ.get('PROFILER', 'cprofile')
+)
+# Rendered pages per user, invalidated by the ledger version
+response_cache = ResponseCache(int(os.environ.get('RESPONSE_CACHE_BYTES', DEFAULT_MAX_BYTES)))
+
+# Sample data for testing - as requested by user
+def init_sample_data():
+    # Sample jobs with realistic data
+    sample_jobs = [
+        Job(
+            id=1,
+            number='JOB-2024-001',
+            customer='Thompson Kitchen Remodel',
+            description='Complete kitchen renovation including cabinets, countertops, backsplash, and appliances',
+            quoted_price=32500,
+            status='In Progress',
+            start_date='2024-01-08',
+            estimated_end='2024-02-20',
+            progress=75,
+            health='healthy',
+            notes='Cabinets installed, countertops arriving next week'
+        ),
+        Job(
+            id=2,
+            number='JOB-2024-002',
+            customer='Martinez Bathroom',
+            description='Master bathroom remodel - full gut renovation with luxury fixtures',
+            quoted_price=18500,
+            status='In Progress',
+            start_date='2024-01-15',
+            estimated_end='2024-02-10',
+            progress=40,
+            health='warning',
+            notes='Plumbing rough-in complete, waiting on special order vanity'
+        ),
+        Job(
+            id=3,
+            number='JOB-2023-087',
+            customer='Wilson Deck Project',
+            description='Build 16x20 composite deck with pergola and built-in seating',
+            quoted_price=22000,
+            status='Completed',
+            start_date='2023-11-01',
+            estimated_end='2023-11-30',
+            progress=100,
+            health='healthy',
+            notes='Project completed on time, customer very happy'
+        ),
+        Job(
+            id=4,
+            number='JOB-2024-003',
+            customer='Chen Basement Finishing',
+            description='Finish 1200 sq ft basement with bedroom, bathroom, and rec room',
+            quoted_price=45000,
+            status='Quoted',
+            start_date='2024-02-01',
+            estimated_end='2024-03-15',
+            progress=0,
+            health='healthy',
+            notes='Waiting for permit approval'
+        )
+    ]
+    
+    # Sample documents with realistic data
+    sample_documents = [
+        # Thompson Kitchen expenses
+        Document(id=1, type='expense', job_id=1, vendor='Home Depot', amount=4250, date='2024-01-10', description='Kitchen cabinets - shaker white', category='Materials'),
+        Document(id=2, type='expense', job_id=1, vendor='Ferguson', amount=2800, date='2024-01-12', description='Kohler sink and faucet package', category='Materials'),
+        Document(id=3, type='income', job_id=1, vendor='Thompson Kitchen Remodel', amount=16250, date='2024-01-08', description='50% deposit', category='Payment'),
+        Document(id=4, type='expense', job_id=1, vendor='Mike Rodriguez', amount=2400, date='2024-01-18', description='Cabinet installation labor', category='Labor'),
         
-        @keyframes loading {{
-            0% {{ background-position: 200% 0; }}
-            100% {{ background-position: -200% 0; }}
-        }}
+        # Martinez Bathroom expenses
+        Document(id=5, type='expense', job_id=2, vendor='Tile Shop', amount=1850, date='2024-01-16', description='Porcelain tile and grout', category='Materials'),
+        Document(id=6, type='expense', job_id=2, vendor='ProPlumb LLC', amount=3200, date='2024-01-20', description='Plumbing rough-in and fixtures', category='Subcontractor'),
+        Document(id=7, type='income', job_id=2, vendor='Martinez Bathroom', amount=9250, date='2024-01-15', description='50% deposit', category='Payment'),
         
-        /* Tooltips */
-        [data-tooltip] {{
-            position: relative;
-            cursor: help;
-        }}
+        # Wilson Deck (completed)
+        Document(id=8, type='expense', job_id=3, vendor='Lumber Liquidators', amount=8500, date='2023-11-02', description='Composite decking and framing lumber', category='Materials'),
+        Document(id=9, type='expense', job_id=3, vendor='County Permits', amount=350, date='2023-10-28', description='Building permit', category='Permits'),
+        Document(id=10, type='income', job_id=3, vendor='Wilson Deck Project', amount=22000, date='2023-11-30', description='Final payment', category='Payment'),
         
-        [data-tooltip]:hover::after {{
-            content: attr(data-tooltip);
-            position: absolute;
-            bottom: 100%;
-            left: 50%;
-            transform: translateX(-50%);
-            padding: 0.5rem 0.75rem;
-            background: var(--dark);
-            color: white;
-            font-size: 0.75rem;
-            border-radius: 0.375rem;
-            white-space: nowrap;
-            z-index: 1000;
-            margin-bottom: 0.5rem;
-        }}
-    </style>
-</head>
-<body>
-    <header class="header">
-        <div class="header-content">
-            <a href="/" class="logo">
-                <div class="logo-icon">PT</div>
-                <span>Profit Tracker</span>
-            </a>
-            {nav_html}
-        </div>
-    </header>
-    
-    <div class="container">
-        {content}
-    </div>
+        # General expenses not tied to specific jobs
+        Document(id=11, type='expense', job_id=None, vendor='State Farm', amount=450, date='2024-01-01', description='Monthly liability insurance', category='Other'),
+        Document(id=12, type='expense', job_id=None, vendor='DeWalt Tools', amount=899, date='2024-01-05', description='New miter saw', category='Equipment'),
+    ]
     
-    <!-- Quick Add Modal -->
-    <div id="quickAddModal" style="display: none; position: fixed; top: 0; left: 0; right: 0; bottom: 0; background: rgba(0,0,0,0.5); z-index: 1000; align-items: center; justify-content: center;">
-        <div style="background: white; padding: 2rem; border-radius: 1rem; max-width: 600px; width: 90%; max-height: 90vh; overflow-y: auto; position: relative;">
-            <button onclick="closeQuickAdd()" style="position: absolute; top: 1rem; right: 1rem; background: none; border: none; font-size: 1.5rem; cursor: pointer; color: var(--secondary);">&times;</button>
-            
-            <h2 style="margin-bottom: 1.5rem;">Quick Add</h2>
-            
-            <div style="display: grid; grid-template-columns: repeat(auto-fit, minmax(150px, 1fr)); gap: 1rem; margin-bottom: 2rem;">
-                <a href="/upload?type=expense" class="action-card" style="padding: 1.5rem; text-decoration: none;">
-                    <div class="action-icon">
-                        <svg width="24" height="24" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
-                            <rect x="2" y="7" width="20" height="14" rx="2" ry="2"></rect>
-                            <path d="M16 3h-8v4h8z"></path>
-                        </svg>
-                    </div>
-                    <h3 class="action-title">Add Expense</h3>
-                    <p class="action-desc">Record a cost</p>
-                </a>
-                
-                <a href="/upload?type=income" class="action-card" style="padding: 1.5rem; text-decoration: none;">
-                    <div class="action-icon">
-                        <svg width="24" height="24" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
-                            <path d="M12 2v20M17 5H9.5a3.5 3.5 0 0 0 0 7h5a3.5 3.5 0 0 1 0 7H6"/>
-                        </svg>
-                    </div>
-                    <h3 class="action-title">Add Income</h3>
-                    <p class="action-desc">Record payment</p>
-                </a>
-                
-                <a href="/jobs/new" class="action-card" style="padding: 1.5rem; text-decoration: none;">
-                    <div class="action-icon">
-                        <svg width="24" height="24" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
-                            <path d="M20 7h-9a2 2 0 0 0-2 2v10a2 2 0 0 0 2 2h9a2 2 0 0 0 2-2V9a2 2 0 0 0-2-2z"></path>
-                            <path d="M5 3h9a2 2 0 0 1 2 2v2H7a2 2 0 0 0-2 2v8H3a1 1 0 0 1-1-1V5a2 2 0 0 1 2-2z"></path>
-                        </svg>
-                    </div>
-                    <h3 class="action-title">New Job</h3>
-                    <p class="action-desc">Start project</p>
-                </a>
-            </div>
-            
-            <div style="border-top: 1px solid var(--border); padding-top: 1.5rem;">
-                <h3 style="margin-bottom: 1rem;">Quick Expense Entry</h3>
-                <form id="quickAddForm" onsubmit="quickAddSubmit(event)" method="POST" action="/api/quick-add">
-                    <div style="display: grid; grid-template-columns: 1fr 1fr; gap: 1rem;">
-                        <div class="form-group">
-                            <label>Type</label>
-                            <select name="type" required>
-                                <option value="expense">Expense</option>
-                                <option value="income">Income</option>
-                            </select>
-                        </div>
-                        
-                        <div class="form-group">
-                            <label>Amount</label>
-                            <input type="number" name="amount" step="0.01" required placeholder="0.00">
-                        </div>
-                        
-                        <div class="form-group">
-                            <label>Vendor/Customer</label>
-                            <input type="text" name="vendor" required placeholder="e.g., Home Depot">
-                        </div>
-                        
-                        <div class="form-group">
-                            <label>Category</label>
-                            <select name="category" required>
-                                <option value="Materials">Materials</option>
-                                <option value="Labor">Labor</option>
-                                <option value="Equipment">Equipment</option>
-                                <option value="Other">Other</option>
-                            </select>
-                        </div>
-                    </div>
-                    
-                    <div class="form-group">
-                        <label>Description (Optional)</label>
-                        <input type="text" name="description" placeholder="Quick note...">
-                    </div>
-                    
-                    <button type="submit" class="btn btn-primary" style="width: 100%;">Save Quick Entry</button>
-                </form>
-            </div>
+    if store.backend is not None:
+        store.sync()
+        if store.job_count() or store.document_count():
+            return  # Never seed over a persisted ledger
+    store.clear()
+    store.seed(sample_jobs, sample_documents)
+
+init_sample_data()
+
+# Probes must answer even when the database is down; readiness syncs itself
+UNSYNCED_ENDPOINTS = {'health', 'health_ready', 'metrics'}
+
+@app.before_request
+def sync_ledger():
+    # Pick up documents and jobs written by other workers
+    if request.endpoint not in UNSYNCED_ENDPOINTS:
+        store.sync()
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+def page_size():
+    try:
+        limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        limit = DEFAULT_PAGE_SIZE
+    return min(max(limit, 1), MAX_PAGE_SIZE)
+
+def job_ids():
+    return {job.id for job in store.all_jobs()}
+
+TREND_POINTS = {
+    'up': ('23 6 13.5 15.5 8.5 10.5 1 18', '17 6 23 6 23 12'),
+    'down': ('23 18 13.5 8.5 8.5 13.5 1 6', '17 18 23 18 23 12'),
+}
+
+def month_change_html(change):
+    """Trend arrow and '+12% from last month' for a store.month_change() result"""
+    current, previous, percent = change
+    line, head = TREND_POINTS['down' if percent is not None and percent < 0 else 'up']
+    label = f'{percent:+.0f}% from last month' if percent is not None else 'No activity last month'
+    return f'''<svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
+                    <polyline points="{line}"></polyline>
+                    <polyline points="{head}"></polyline>
+                </svg>
+                <span>{label}</span>'''
+
+def cached_page(view):
+    """Serve a logged-in user's page from response_cache until the ledger changes"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        username = session.get('username')
+        if not username:
+            return view(*args, **kwargs)
+        key = (username, request.full_path)
+        version = store.version()
+        entry = response_cache.get(key, version)
+        status = 'HIT'
+        if entry is None:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            entry = response_cache.put(key, version, response.get_data(), response.mimetype)
+            status = 'MISS'
+        response = make_response(entry.body)
+        response.mimetype = entry.mimetype
+        response.set_etag(entry.etag)
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        response.headers['X-Cache'] = status
+        return response.make_conditional(request)
+    return wrapper
+
+def create_base_template(title, content, show_nav=True, page_type='default'):
+    username = session.get('username', '') if show_nav else None
+    return page_shell.render(title, content, username, page_type)
+
+def form_error(title, message, status=400):
+    """Error page for a form that could not be saved, e.g. with a malformed date or amount"""
+    content = f'''
+    <div class="card" style="max-width: 800px; margin: 0 auto;">
+        <div class="card-header">
+            <h2 class="card-title">{title}</h2>
+        </div>
+        <div class="card-body">
+            <p>{escape(message)}</p>
+            <a href="{request.path}" class="btn btn-secondary">Back</a>
         </div>
     </div>
-    
-    <script>
-        // Add smooth transitions
-        document.addEventListener('DOMContentLoaded', function() {{
-            // Animate numbers on load
-            const animateValue = (element, start, end, duration) => {{
-                let startTimestamp = null;
-                const step = (timestamp) => {{
-                    if (!startTimestamp) startTimestamp = timestamp;
-                    const progress = Math.min((timestamp - startTimestamp) / duration, 1);
-                    element.textContent = '$' + Math.floor(progress * (end - start) + start).toLocaleString();
-                    if (progress < 1) {{
-                        window.requestAnimationFrame(step);
-                    }}
-                }};
-                window.requestAnimationFrame(step);
-            }};
-            
-            // Animate stat values
-            document.querySelectorAll('.stat-value').forEach(el => {{
-                const finalValue = parseInt(el.textContent.replace(/[^0-9]/g, ''));
-                if (!isNaN(finalValue)) {{
-                    animateValue(el, 0, finalValue, 1000);
-                }}
-            }});
-        }});
-        
-        function showQuickAdd() {{
-            const modal = document.getElementById('quickAddModal');
-            modal.style.display = 'flex';
-        }}
-        
-        function closeQuickAdd() {{
-            const modal = document.getElementById('quickAddModal');
-            modal.style.display = 'none';
-            document.getElementById('quickAddForm').reset();
-        }}
-        
-        // Quick Add form submission
-        function quickAddSubmit(e) {{
-            e.preventDefault();
-            const form = e.target;
-            const formData = new FormData(form);
-            
-            fetch('/api/quick-add', {{
-                method: 'POST',
-                body: formData
-            }})
-            .then(response => response.json())
-            .then(data => {{
-                if (data.success) {{
-                    closeQuickAdd();
-                    window.location.reload();
-                }} else {{
-                    alert('Error: ' + data.message);
-                }}
-            }})
-            .catch(error => {{
-                alert('Error saving entry');
-            }});
-        }}
-    </script>
-</body>
-</html>
     '''
+    return create_base_template(title, content), status
 
 @app.route('/')
 def index():
@@ -1965,11 +1176,12 @@ def signup():
             error = 'All fields are required'
         elif password != confirm_password:
             error = 'Passwords do not match'
-        elif username in users:
+        elif username in users or company_id(username) in user_companies.values():
             error = 'Username already exists'
         else:
             # Create new user
             users[username] = password
+            user_companies[username] = company_id(username)
             session['username'] = username
             return redirect(url_for('dashboard'))
     
@@ -2213,18 +1425,25 @@ def signup():
     '''
 
 @app.route('/dashboard')
+@cached_page
 def dashboard():
     if not session.get('username'):
         return redirect(url_for('login'))
     
-    # Calculate metrics
-    total_revenue = sum(d['amount'] for d in documents if d['type'] == 'income')
-    total_expenses = sum(d['amount'] for d in documents if d['type'] == 'expense')
-    net_profit = total_revenue - total_expenses
-    profit_margin = (net_profit / total_revenue * 100) if total_revenue > 0 else 0
+    # Read everything the page shows from one consistent view of the ledger
+    with store.reading():
+        totals = store.totals()
+        active_jobs = store.jobs_with_status('In Progress')
+        active_job_rows = job_performance(store, active_jobs[:3])
+        recent_docs = store.recent_documents(4)
+        revenue_change = store.month_change('income')
+        expense_change = store.month_change('expense')
     
-    # Active jobs
-    active_jobs = [j for j in jobs if j['status'] == 'In Progress']
+    # Calculate metrics
+    total_revenue = totals.revenue
+    total_expenses = totals.expenses
+    net_profit = totals.net_profit
+    profit_margin = totals.profit_margin
     
     # AI Insights
     insights = []
@@ -2254,13 +1473,9 @@ def dashboard():
     <div class="stats-grid">
         <div class="stat-card revenue">
             <div class="stat-label">Total Revenue</div>
-            <div class="stat-value">${total_revenue:,.0f}</div>
+            <div class="stat-value">${format_cents(total_revenue, 0)}</div>
             <div class="stat-change">
-                <svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
-                    <polyline points="23 6 13.5 15.5 8.5 10.5 1 18"></polyline>
-                    <polyline points="17 6 23 6 23 12"></polyline>
-                </svg>
-                <span>12% from last month</span>
+                {month_change_html(revenue_change)}
             </div>
             <svg class="stat-icon" width="48" height="48" viewBox="0 0 24 24" fill="currentColor" opacity="0.2">
                 <path d="M12 2v20M17 5H9.5a3.5 3.5 0 0 0 0 7h5a3.5 3.5 0 0 1 0 7H6"/>
@@ -2269,13 +1484,9 @@ def dashboard():
         
         <div class="stat-card expenses">
             <div class="stat-label">Total Expenses</div>
-            <div class="stat-value">${total_expenses:,.0f}</div>
+            <div class="stat-value">${format_cents(total_expenses, 0)}</div>
             <div class="stat-change">
-                <svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
-                    <polyline points="23 18 13.5 8.5 8.5 13.5 1 6"></polyline>
-                    <polyline points="17 18 23 18 23 12"></polyline>
-                </svg>
-                <span>5% from last month</span>
+                {month_change_html(expense_change)}
             </div>
             <svg class="stat-icon" width="48" height="48" viewBox="0 0 24 24" fill="currentColor" opacity="0.2">
                 <rect x="1" y="4" width="22" height="16" rx="2" ry="2"></rect>
@@ -2285,7 +1496,7 @@ def dashboard():
         
         <div class="stat-card profit">
             <div class="stat-label">Net Profit</div>
-            <div class="stat-value">${net_profit:,.0f}</div>
+            <div class="stat-value">${format_cents(net_profit, 0)}</div>
             <div class="stat-change">
                 <svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
                     <polyline points="23 6 13.5 15.5 8.5 10.5 1 18"></polyline>
@@ -2386,11 +1597,10 @@ def dashboard():
                         <tbody>
     '''
     
-    for job in active_jobs[:3]:
-        job_expenses = sum(d['amount'] for d in documents if d['type'] == 'expense' and d.get('job_id') == str(job['id']))
-        job_revenue = sum(d['amount'] for d in documents if d['type'] == 'income' and d.get('job_id') == str(job['id']))
-        job_profit = job_revenue - job_expenses
-        job_margin = (job_profit / job['quoted_price'] * 100) if job['quoted_price'] > 0 else 0
+    for perf in active_job_rows:
+        job = perf['job']
+        job_profit = perf['profit']
+        job_margin = perf['margin']
         
         # Determine health status
         health_status = 'healthy'
@@ -2401,14 +1611,14 @@ def dashboard():
         
         content += f'''
                             <tr>
-                                <td style="font-weight: 600;">{job['number']}</td>
-                                <td>{job['customer']}</td>
+                                <td style="font-weight: 600;">{job.number}</td>
+                                <td>{job.customer}</td>
                                 <td>
                                     <div style="display: flex; align-items: center; gap: 0.75rem;">
                                         <div class="progress-bar" style="width: 120px;">
-                                            <div class="progress-fill" style="width: {job['progress']}%;"></div>
+                                            <div class="progress-fill" style="width: {job.progress}%;"></div>
                                         </div>
-                                        <span style="font-size: 0.875rem; font-weight: 500;">{job['progress']}%</span>
+                                        <span style="font-size: 0.875rem; font-weight: 500;">{job.progress}%</span>
                                     </div>
                                 </td>
                                 <td>
@@ -2416,7 +1626,7 @@ def dashboard():
                                     <span style="font-size: 0.875rem; text-transform: capitalize;">{health_status}</span>
                                 </td>
                                 <td style="font-weight: 600; color: {'var(--success)' if job_profit >= 0 else 'var(--danger)'};">
-                                    ${job_profit:,.0f}
+                                    ${format_cents(job_profit, 0)}
                                     <span style="font-size: 0.75rem; color: var(--secondary); font-weight: 400;">({job_margin:.0f}%)</span>
                                 </td>
                             </tr>
@@ -2439,21 +1649,20 @@ def dashboard():
     '''
     
     # Recent activity items
-    recent_docs = sorted(documents, key=lambda x: x['date'], reverse=True)[:4]
     for doc in recent_docs:
-        icon = '📥' if doc['type'] == 'income' else '📤'
-        color = 'var(--success)' if doc['type'] == 'income' else 'var(--danger)'
-        sign = '+' if doc['type'] == 'income' else '-'
+        icon = '📥' if doc.type == 'income' else '📤'
+        color = 'var(--success)' if doc.type == 'income' else 'var(--danger)'
+        sign = '+' if doc.type == 'income' else '-'
         
         content += f'''
                     <div style="display: flex; align-items: center; gap: 1rem; padding: 0.75rem; background: #FAFBFC; border-radius: 0.75rem;">
                         <div style="font-size: 1.25rem;">{icon}</div>
                         <div style="flex: 1;">
-                            <div style="font-weight: 500;">{doc['vendor']}</div>
-                            <div style="font-size: 0.75rem; color: var(--secondary);">{doc['description']}</div>
+                            <div style="font-weight: 500;">{doc.vendor}</div>
+                            <div style="font-size: 0.75rem; color: var(--secondary);">{doc.description}</div>
                         </div>
                         <div style="font-weight: 600; color: {color};">
-                            {sign}${doc['amount']:,.0f}
+                            {sign}${format_cents(doc.amount_cents, 0)}
                         </div>
                     </div>
         '''
@@ -2492,43 +1701,67 @@ def dashboard():
 # Continue with all other routes (jobs, expenses, invoices, reports, etc.)...
 # I'll include just the key routes to show the pattern
 
+def save_receipt_file(file):
+    """Store an uploaded receipt; None if the same file is already on record"""
+    # Stream to the blob store in chunks; never read the whole file into memory
+    blob = blob_store.put_stream(file.stream)
+    if store.blob_refcount(blob.digest):
+        return None
+    file_info = UploadedFile(
+        filename=file.filename,
+        size=blob.size,
+        type=file.content_type,
+        sha256=blob.digest,
+        path=blob_store.relative_path(blob.digest)
+    )
+    return file_info
+
+def queue_extraction(doc):
+    """Read vendor, amount and line items off the receipt image in the background"""
+    task_queue.submit('extract_receipt', {
+        'document_id': doc.id,
+        'path': blob_store.path(doc.file_info.sha256),
+        'media_type': doc.file_info.type,
+        'sha256': doc.file_info.sha256,
+        'company': current_company(),
+    })
+
 @app.route('/upload', methods=['GET', 'POST'])
 def upload():
     if not session.get('username'):
         return redirect(url_for('login'))
     
     if request.method == 'POST':
+        # Check the form before storing the file
+        try:
+            doc = Document(
+                type=request.form.get('doc_type'),
+                vendor=request.form.get('vendor'),
+                amount_cents=to_cents(request.form.get('amount', 0)),
+                date=request.form.get('date'),
+                description=request.form.get('description'),
+                category=request.form.get('category'),
+                job_id=request.form.get('job_id')
+            )
+        except ValueError as e:
+            return form_error('Upload Document', str(e))
+        
         # Handle file upload
-        file_info = None
-        if 'receipt_file' in request.files:
-            file = request.files['receipt_file']
-            if file and file.filename:
-                # Store file metadata (in production, you'd save the actual file)
-                file_info = {
-                    'filename': file.filename,
-                    'size': len(file.read()),
-                    'type': file.content_type
-                }
-                file.seek(0)  # Reset file pointer
-                uploaded_files.append(file_info)
-        
-        doc = {
-            'id': len(documents) + 1,
-            'type': request.form.get('doc_type'),
-            'vendor': request.form.get('vendor'),
-            'amount': float(request.form.get('amount', 0)),
-            'date': request.form.get('date'),
-            'description': request.form.get('description'),
-            'category': request.form.get('category'),
-            'job_id': request.form.get('job_id'),
-            'file_info': file_info
-        }
-        documents.append(doc)
+        file = request.files.get('receipt_file')
+        if file and file.filename:
+            file_info = save_receipt_file(file)
+            if file_info is None:
+                # Same receipt is already on file; don't record or process it twice
+                return form_error('Upload Document', 'This receipt is already on file, so nothing was saved.', 409)
+            doc = doc.replace(file_info=file_info, extraction=Extraction())
+        store.add_document(doc)
+        if doc.file_info:
+            queue_extraction(doc)
         return redirect(url_for('dashboard'))
     
     job_options = ''
-    for job in jobs:
-        job_options += f'<option value="{job["id"]}">{job["number"]} - {job["customer"]}</option>'
+    for job in store.all_jobs():
+        job_options += f'<option value="{job.id}">{job.number} - {job.customer}</option>'
     
     content = f'''
     <style>
@@ -2802,7 +2035,33 @@ def upload():
     
     return create_base_template('Capture Receipt', content, page_type='expenses')
 
+@app.route('/receipts/<digest>')
+def receipt_file(digest):
+    if not session.get('username'):
+        return redirect(url_for('login'))
+    
+    docs = store.documents_with_blob(digest) if is_digest(digest) else []
+    if not docs:
+        abort(404)
+    
+    file_info = docs[0].file_info
+    if UPLOAD_ACCEL_REDIRECT:
+        # Headers only; nginx sends the file from its internal location and handles ranges
+        response = send_file_from(blob_store.path(digest), request.environ, mimetype=file_info.type or None,
+                                  download_name=file_info.filename, etag=digest, use_x_sendfile=True)
+        del response.headers['X-Sendfile']
+        del response.headers['Content-Length']
+        response.headers['X-Accel-Redirect'] = f'{UPLOAD_ACCEL_REDIRECT}/{blob_store.relative_path(digest)}'
+    else:
+        # send_file hands the open file to the server's wsgi.file_wrapper (sendfile under gunicorn)
+        response = send_file(blob_store.path(digest), mimetype=file_info.type or None,
+                             download_name=file_info.filename, etag=digest, conditional=True)
+    response.cache_control.public = False
+    response.cache_control.private = True
+    return response
+
 @app.route('/jobs')
+@cached_page
 def jobs_page():
     if not session.get('username'):
         return redirect(url_for('login'))
@@ -2838,17 +2097,15 @@ def jobs_page():
                     <tbody>
     '''
     
-    for job in jobs:
-        job_expenses = sum(d['amount'] for d in documents if d['type'] == 'expense' and d.get('job_id') == str(job['id']))
-        job_revenue = sum(d['amount'] for d in documents if d['type'] == 'income' and d.get('job_id') == str(job['id']))
-        job_profit = job_revenue - job_expenses
-        profit_margin = (job_profit / job['quoted_price'] * 100) if job['quoted_price'] > 0 else 0
+    for perf in job_performance(store):
+        job = perf['job']
+        profit_margin = perf['margin']
         
         status_class = {
             'Quoted': 'badge-info',
             'In Progress': 'badge-warning',
             'Completed': 'badge-success'
-        }.get(job['status'], 'badge-secondary')
+        }.get(job.status, 'badge-secondary')
         
         health_color = 'healthy'
         if profit_margin < 10:
@@ -2858,16 +2115,16 @@ def jobs_page():
         
         content += f'''
                     <tr>
-                        <td style="font-weight: 600;">{job['number']}</td>
-                        <td>{job['customer']}</td>
-                        <td style="max-width: 300px; overflow: hidden; text-overflow: ellipsis; white-space: nowrap;">{job['description']}</td>
-                        <td><span class="badge {status_class}">{job['status']}</span></td>
+                        <td style="font-weight: 600;">{job.number}</td>
+                        <td>{job.customer}</td>
+                        <td style="max-width: 300px; overflow: hidden; text-overflow: ellipsis; white-space: nowrap;">{job.description}</td>
+                        <td><span class="badge {status_class}">{job.status}</span></td>
                         <td>
                             <div style="display: flex; align-items: center; gap: 0.5rem;">
                                 <div class="progress-bar" style="width: 80px;">
-                                    <div class="progress-fill" style="width: {job['progress']}%;"></div>
+                                    <div class="progress-fill" style="width: {job.progress}%;"></div>
                                 </div>
-                                <span style="font-size: 0.75rem;">{job['progress']}%</span>
+                                <span style="font-size: 0.75rem;">{job.progress}%</span>
                             </div>
                         </td>
                         <td>
@@ -2877,7 +2134,7 @@ def jobs_page():
                             {profit_margin:.1f}%
                         </td>
                         <td>
-                            <a href="/jobs/{job['id']}" class="btn btn-secondary" style="padding: 0.375rem 0.875rem; font-size: 0.875rem;">
+                            <a href="/jobs/{job.id}" class="btn btn-secondary" style="padding: 0.375rem 0.875rem; font-size: 0.875rem;">
                                 View Details
                             </a>
                         </td>
@@ -2900,20 +2157,22 @@ def new_job():
         return redirect(url_for('login'))
     
     if request.method == 'POST':
-        job = {
-            'id': len(jobs) + 1,
-            'number': request.form.get('number'),
-            'customer': request.form.get('customer'),
-            'description': request.form.get('description'),
-            'quoted_price': float(request.form.get('quoted_price', 0)),
-            'start_date': request.form.get('start_date'),
-            'estimated_end': request.form.get('estimated_end'),
-            'status': 'Quoted',
-            'progress': 0,
-            'health': 'healthy',
-            'notes': request.form.get('notes', '')
-        }
-        jobs.append(job)
+        try:
+            job = Job(
+                number=request.form.get('number'),
+                customer=request.form.get('customer'),
+                description=request.form.get('description'),
+                quoted_price_cents=to_cents(request.form.get('quoted_price', 0)),
+                start_date=request.form.get('start_date'),
+                estimated_end=request.form.get('estimated_end'),
+                status='Quoted',
+                progress=0,
+                health='healthy',
+                notes=request.form.get('notes', '')
+            )
+        except ValueError as e:
+            return form_error('Create New Job', str(e))
+        store.add_job(job)
         return redirect(url_for('jobs_page'))
     
     content = '''
@@ -2990,23 +2249,23 @@ def job_detail(job_id):
     if not session.get('username'):
         return redirect(url_for('login'))
     
-    job = next((j for j in jobs if j['id'] == job_id), None)
+    job = store.get_job(job_id)
     if not job:
         return redirect(url_for('jobs_page'))
     
     # Calculate job financials
-    job_expenses = sum(d['amount'] for d in documents if d['type'] == 'expense' and d.get('job_id') == str(job_id))
-    job_revenue = sum(d['amount'] for d in documents if d['type'] == 'income' and d.get('job_id') == str(job_id))
-    job_profit = job_revenue - job_expenses
-    profit_margin = (job_profit / job['quoted_price'] * 100) if job['quoted_price'] > 0 else 0
+    job_totals = store.job_totals(job_id)
+    job_expenses = job_totals.expenses
+    job_profit = job_totals.net_profit
+    profit_margin = (job_profit / job.quoted_price_cents * 100) if job.quoted_price_cents > 0 else 0
     
     # Get job documents
-    job_docs = [d for d in documents if d.get('job_id') == str(job_id)]
+    job_docs = store.documents_for_job(job_id)
     
     content = f'''
     <div class="card">
         <div class="card-header">
-            <h2 class="card-title">Job {job['number']} - {job['customer']}</h2>
+            <h2 class="card-title">Job {job.number} - {job.customer}</h2>
             <div style="display: flex; gap: 1rem;">
                 <a href="/upload?job_id={job_id}" class="btn btn-primary">Add Document</a>
                 <a href="/jobs" class="btn btn-secondary">Back to Jobs</a>
@@ -3016,22 +2275,22 @@ def job_detail(job_id):
             <div class="stats-grid" style="margin-bottom: 2rem;">
                 <div class="stat-card revenue">
                     <div class="stat-label">Quoted Price</div>
-                    <div class="stat-value">${job['quoted_price']:,.0f}</div>
+                    <div class="stat-value">${format_cents(job.quoted_price_cents, 0)}</div>
                 </div>
                 <div class="stat-card expenses">
                     <div class="stat-label">Total Expenses</div>
-                    <div class="stat-value">${job_expenses:,.0f}</div>
+                    <div class="stat-value">${format_cents(job_expenses, 0)}</div>
                 </div>
                 <div class="stat-card profit">
                     <div class="stat-label">Current Profit</div>
-                    <div class="stat-value">${job_profit:,.0f}</div>
+                    <div class="stat-value">${format_cents(job_profit, 0)}</div>
                     <div class="stat-change">{profit_margin:.1f}% margin</div>
                 </div>
                 <div class="stat-card jobs">
                     <div class="stat-label">Progress</div>
-                    <div class="stat-value">{job['progress']}%</div>
+                    <div class="stat-value">{job.progress}%</div>
                     <div class="progress-bar" style="margin-top: 0.5rem;">
-                        <div class="progress-fill" style="width: {job['progress']}%;"></div>
+                        <div class="progress-fill" style="width: {job.progress}%;"></div>
                     </div>
                 </div>
             </div>
@@ -3039,14 +2298,14 @@ def job_detail(job_id):
             <h3 style="margin-bottom: 1rem;">Job Details</h3>
             <div style="display: grid; grid-template-columns: 1fr 1fr; gap: 2rem; margin-bottom: 2rem;">
                 <div>
-                    <p><strong>Description:</strong> {job['description']}</p>
-                    <p><strong>Start Date:</strong> {job['start_date']}</p>
-                    <p><strong>Estimated End:</strong> {job['estimated_end']}</p>
+                    <p><strong>Description:</strong> {job.description}</p>
+                    <p><strong>Start Date:</strong> {job.start_date}</p>
+                    <p><strong>Estimated End:</strong> {job.estimated_end}</p>
                 </div>
                 <div>
-                    <p><strong>Status:</strong> <span class="badge badge-{'success' if job['status'] == 'Completed' else 'warning' if job['status'] == 'In Progress' else 'info'}">{job['status']}</span></p>
-                    <p><strong>Health:</strong> <span class="health-indicator {job['health']}"></span> {job['health'].title()}</p>
-                    <p><strong>Notes:</strong> {job.get('notes', 'No notes')}</p>
+                    <p><strong>Status:</strong> <span class="badge badge-{'success' if job.status == 'Completed' else 'warning' if job.status == 'In Progress' else 'info'}">{job.status}</span></p>
+                    <p><strong>Health:</strong> <span class="health-indicator {job.health}"></span> {job.health.title()}</p>
+                    <p><strong>Notes:</strong> {job.notes or 'No notes'}</p>
                 </div>
             </div>
             
@@ -3067,17 +2326,17 @@ def job_detail(job_id):
     '''
     
     if job_docs:
-        for doc in sorted(job_docs, key=lambda x: x['date'], reverse=True):
-            color = 'var(--success)' if doc['type'] == 'income' else 'var(--danger)'
-            sign = '+' if doc['type'] == 'income' else '-'
+        for doc in sorted(job_docs, key=date_key, reverse=True):
+            color = 'var(--success)' if doc.type == 'income' else 'var(--danger)'
+            sign = '+' if doc.type == 'income' else '-'
             content += f'''
                         <tr>
-                            <td>{doc['date']}</td>
-                            <td><span class="badge badge-{'success' if doc['type'] == 'income' else 'danger'}">{doc['type'].title()}</span></td>
-                            <td>{doc['vendor']}</td>
-                            <td>{doc.get('category', '-')}</td>
-                            <td>{doc.get('description', '-')}</td>
-                            <td style="color: {color}; font-weight: 600;">{sign}${doc['amount']:,.2f}</td>
+                            <td>{doc.date}</td>
+                            <td><span class="badge badge-{'success' if doc.type == 'income' else 'danger'}">{doc.type.title()}</span></td>
+                            <td>{doc.vendor}</td>
+                            <td>{doc.category or '-'}</td>
+                            <td>{doc.description or '-'}</td>
+                            <td style="color: {color}; font-weight: 600;">{sign}${format_cents(doc.amount_cents)}</td>
                         </tr>
             '''
     else:
@@ -3091,15 +2350,16 @@ def job_detail(job_id):
     </div>
     '''
     
-    return create_base_template(f'Job {job["number"]}', content, page_type='jobs')
+    return create_base_template(f'Job {job.number}', content, page_type='jobs')
 
 @app.route('/invoices')
+@cached_page
 def invoices():
     if not session.get('username'):
         return redirect(url_for('login'))
     
     # Get all income documents (invoices)
-    invoices = [d for d in documents if d['type'] == 'income']
+    invoices = store.documents_by_type('income')
     
     content = '''
     <div class="card">
@@ -3131,16 +2391,16 @@ def invoices():
     '''
     
     if invoices:
-        for inv in sorted(invoices, key=lambda x: x['date'], reverse=True):
-            job = next((j for j in jobs if str(j['id']) == inv.get('job_id')), None)
-            job_info = f"{job['number']} - {job['customer']}" if job else "No job assigned"
+        for inv in sorted(invoices, key=date_key, reverse=True):
+            job = store.get_job(inv.job_id)
+            job_info = f"{job.number} - {job.customer}" if job else "No job assigned"
             content += f'''
                         <tr>
-                            <td>{inv['date']}</td>
-                            <td>{inv['vendor']}</td>
+                            <td>{inv.date}</td>
+                            <td>{inv.vendor}</td>
                             <td>{job_info}</td>
-                            <td>{inv.get('description', '-')}</td>
-                            <td style="color: var(--success); font-weight: 600;">${inv['amount']:,.2f}</td>
+                            <td>{inv.description or '-'}</td>
+                            <td style="color: var(--success); font-weight: 600;">${format_cents(inv.amount_cents)}</td>
                             <td><span class="badge badge-success">Paid</span></td>
                         </tr>
             '''
@@ -3163,22 +2423,24 @@ def new_invoice():
         return redirect(url_for('login'))
     
     if request.method == 'POST':
-        invoice = {
-            'id': len(documents) + 1,
-            'type': 'income',
-            'vendor': request.form.get('customer'),
-            'amount': float(request.form.get('amount', 0)),
-            'date': request.form.get('date'),
-            'description': request.form.get('description'),
-            'category': 'Payment',
-            'job_id': request.form.get('job_id')
-        }
-        documents.append(invoice)
+        try:
+            invoice = Document(
+                type='income',
+                vendor=request.form.get('customer'),
+                amount_cents=to_cents(request.form.get('amount', 0)),
+                date=request.form.get('date'),
+                description=request.form.get('description'),
+                category='Payment',
+                job_id=request.form.get('job_id')
+            )
+        except ValueError as e:
+            return form_error('Create Invoice', str(e))
+        store.add_document(invoice)
         return redirect(url_for('invoices'))
     
     job_options = ''
-    for job in jobs:
-        job_options += f'<option value="{job["id"]}">{job["number"]} - {job["customer"]} (${job["quoted_price"]:,.2f})</option>'
+    for job in store.all_jobs():
+        job_options += f'<option value="{job.id}">{job.number} - {job.customer} (${format_cents(job.quoted_price_cents)})</option>'
     
     content = f'''
     <div class="card" style="max-width: 800px; margin: 0 auto;">
@@ -3243,18 +2505,27 @@ def new_invoice():
     return create_base_template('New Invoice', content, page_type='invoices')
 
 @app.route('/expenses')
+@cached_page
 def expenses():
     if not session.get('username'):
         return redirect(url_for('login'))
     
-    # Get all expense documents
-    expenses_list = [d for d in documents if d['type'] == 'expense']
-    
-    # Group by category
-    category_totals = {}
-    for exp in expenses_list:
-        cat = exp.get('category', 'Other')
-        category_totals[cat] = category_totals.get(cat, 0) + exp['amount']
+    # Optional date range, e.g. /expenses?start=2024-01-01&end=2024-03-31
+    try:
+        start = parse_date(request.args.get('start'))
+        end = parse_date(request.args.get('end'))
+    except ValueError:
+        abort(400)
+    if start or end:
+        with store.reading():
+            expenses_list = [d for d in store.documents_between(start, end) if d.type == 'expense']
+            category_totals = store.period_breakdown('expense', 'category', start, end)
+    else:
+        # Get all expense documents
+        expenses_list = store.documents_by_type('expense')
+        
+        # Group by category
+        category_totals = store.expense_category_totals()
     
     content = '''
     <div class="stats-grid" style="margin-bottom: 2rem;">
@@ -3264,7 +2535,7 @@ def expenses():
         content += f'''
         <div class="stat-card expenses">
             <div class="stat-label">{category}</div>
-            <div class="stat-value">${total:,.0f}</div>
+            <div class="stat-value">${format_cents(total, 0)}</div>
         </div>
         '''
     
@@ -3300,17 +2571,17 @@ def expenses():
     '''
     
     if expenses_list:
-        for exp in sorted(expenses_list, key=lambda x: x['date'], reverse=True):
-            job = next((j for j in jobs if str(j['id']) == exp.get('job_id')), None)
-            job_info = f"{job['number']}" if job else "-"
+        for exp in sorted(expenses_list, key=date_key, reverse=True):
+            job = store.get_job(exp.job_id)
+            job_info = f"{job.number}" if job else "-"
             content += f'''
                         <tr>
-                            <td>{exp['date']}</td>
-                            <td>{exp['vendor']}</td>
-                            <td><span class="badge badge-info">{exp.get('category', 'Other')}</span></td>
+                            <td>{exp.date}</td>
+                            <td>{exp.vendor}</td>
+                            <td><span class="badge badge-info">{exp.category or 'Other'}</span></td>
                             <td>{job_info}</td>
-                            <td>{exp.get('description', '-')}</td>
-                            <td style="color: var(--danger); font-weight: 600;">-${exp['amount']:,.2f}</td>
+                            <td>{exp.description or '-'}</td>
+                            <td style="color: var(--danger); font-weight: 600;">-${format_cents(exp.amount_cents)}</td>
                         </tr>
             '''
     else:
@@ -3327,33 +2598,22 @@ def expenses():
     return create_base_template('Expenses', content, page_type='expenses')
 
 @app.route('/reports')
+@cached_page
 def reports():
     if not session.get('username'):
         return redirect(url_for('login'))
     
+    with store.reading():
+        totals = store.totals()
+        job_count = store.job_count()
+        # Top 5 jobs by profit margin
+        top_jobs = top_jobs_by_margin(store, 5)
+    
     # Calculate metrics
-    total_revenue = sum(d['amount'] for d in documents if d['type'] == 'income')
-    total_expenses = sum(d['amount'] for d in documents if d['type'] == 'expense')
-    net_profit = total_revenue - total_expenses
-    profit_margin = (net_profit / total_revenue * 100) if total_revenue > 0 else 0
-    
-    # Calculate job performance
-    job_performance = []
-    for job in jobs:
-        job_expenses = sum(d['amount'] for d in documents if d['type'] == 'expense' and d.get('job_id') == str(job['id']))
-        job_revenue = sum(d['amount'] for d in documents if d['type'] == 'income' and d.get('job_id') == str(job['id']))
-        job_profit = job_revenue - job_expenses
-        job_margin = (job_profit / job['quoted_price'] * 100) if job['quoted_price'] > 0 else 0
-        job_performance.append({
-            'job': job,
-            'revenue': job_revenue,
-            'expenses': job_expenses,
-            'profit': job_profit,
-            'margin': job_margin
-        })
-    
-    # Sort by profit margin
-    job_performance.sort(key=lambda x: x['margin'], reverse=True)
+    total_revenue = totals.revenue
+    total_expenses = totals.expenses
+    net_profit = totals.net_profit
+    profit_margin = totals.profit_margin
     
     content = f'''
     <div class="ai-insights" style="margin-bottom: 2rem;">
@@ -3374,7 +2634,7 @@ def reports():
     <div class="stats-grid">
         <div class="stat-card revenue">
             <div class="stat-label">Total Revenue</div>
-            <div class="stat-value">${total_revenue:,.0f}</div>
+            <div class="stat-value">${format_cents(total_revenue, 0)}</div>
             <div class="stat-change">
                 <svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
                     <polyline points="23 6 13.5 15.5 8.5 10.5 1 18"></polyline>
@@ -3385,7 +2645,7 @@ def reports():
         
         <div class="stat-card expenses">
             <div class="stat-label">Total Expenses</div>
-            <div class="stat-value">${total_expenses:,.0f}</div>
+            <div class="stat-value">${format_cents(total_expenses, 0)}</div>
             <div class="stat-change">
                 <span>{(total_expenses/total_revenue*100) if total_revenue > 0 else 0:.1f}% of revenue</span>
             </div>
@@ -3393,7 +2653,7 @@ def reports():
         
         <div class="stat-card profit">
             <div class="stat-label">Net Profit</div>
-            <div class="stat-value">${net_profit:,.0f}</div>
+            <div class="stat-value">${format_cents(net_profit, 0)}</div>
             <div class="stat-change">
                 <span>{profit_margin:.1f}% margin</span>
             </div>
@@ -3401,7 +2661,7 @@ def reports():
         
         <div class="stat-card jobs">
             <div class="stat-label">Avg Job Profit</div>
-            <div class="stat-value">${net_profit/len(jobs) if jobs else 0:,.0f}</div>
+            <div class="stat-value">${format_cents(net_profit / job_count if job_count else 0, 0)}</div>
         </div>
     </div>
     
@@ -3425,14 +2685,14 @@ def reports():
                         <tbody>
     '''
     
-    for perf in job_performance[:5]:  # Top 5 jobs
+    for perf in top_jobs:
         color = 'var(--success)' if perf['margin'] > 20 else 'var(--warning)' if perf['margin'] > 10 else 'var(--danger)'
         content += f'''
                             <tr>
-                                <td>{perf['job']['number']}</td>
-                                <td>${perf['revenue']:,.0f}</td>
-                                <td>${perf['expenses']:,.0f}</td>
-                                <td style="color: {color}; font-weight: 600;">${perf['profit']:,.0f}</td>
+                                <td>{perf['job'].number}</td>
+                                <td>${format_cents(perf['revenue'], 0)}</td>
+                                <td>${format_cents(perf['expenses'], 0)}</td>
+                                <td style="color: {color}; font-weight: 600;">${format_cents(perf['profit'], 0)}</td>
                                 <td style="color: {color}; font-weight: 600;">{perf['margin']:.1f}%</td>
                             </tr>
         '''
@@ -3518,17 +2778,16 @@ def quick_add_api():
         return jsonify({'success': False, 'message': 'Not authenticated'}), 401
     
     try:
-        doc = {
-            'id': len(documents) + 1,
-            'type': request.form.get('type'),
-            'vendor': request.form.get('vendor'),
-            'amount': float(request.form.get('amount', 0)),
-            'date': datetime.now().strftime('%Y-%m-%d'),
-            'description': request.form.get('description', ''),
-            'category': request.form.get('category'),
-            'job_id': None
-        }
-        documents.append(doc)
+        doc = Document(
+            type=request.form.get('type'),
+            vendor=request.form.get('vendor'),
+            amount_cents=to_cents(request.form.get('amount', 0)),
+            date=date.today(),
+            description=request.form.get('description', ''),
+            category=request.form.get('category'),
+            job_id=None
+        )
+        store.add_document(doc)
         return jsonify({'success': True, 'message': 'Entry added successfully'})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 400
@@ -3538,7 +2797,8 @@ def documents_page():
     if not session.get('username'):
         return redirect(url_for('login'))
     
-    all_docs = sorted(documents, key=lambda x: x['date'], reverse=True)
+    cursor = decode_cursor(request.args.get('cursor'))
+    all_docs, next_cursor = store.documents_page(cursor, page_size())
     
     content = '''
     <div class="card">
@@ -3572,21 +2832,21 @@ def documents_page():
     
     if all_docs:
         for doc in all_docs:
-            job = next((j for j in jobs if str(j['id']) == doc.get('job_id')), None)
-            job_info = f"{job['number']}" if job else "-"
-            color = 'var(--success)' if doc['type'] == 'income' else 'var(--danger)'
-            sign = '+' if doc['type'] == 'income' else '-'
-            badge_class = 'badge-success' if doc['type'] == 'income' else 'badge-danger'
+            job = store.get_job(doc.job_id)
+            job_info = f"{job.number}" if job else "-"
+            color = 'var(--success)' if doc.type == 'income' else 'var(--danger)'
+            sign = '+' if doc.type == 'income' else '-'
+            badge_class = 'badge-success' if doc.type == 'income' else 'badge-danger'
             
             content += f'''
                         <tr>
-                            <td>{doc['date']}</td>
-                            <td><span class="badge {badge_class}">{doc['type'].title()}</span></td>
-                            <td>{doc['vendor']}</td>
-                            <td>{doc.get('category', '-')}</td>
+                            <td>{doc.date}</td>
+                            <td><span class="badge {badge_class}">{doc.type.title()}</span></td>
+                            <td>{doc.vendor}</td>
+                            <td>{doc.category or '-'}</td>
                             <td>{job_info}</td>
-                            <td>{doc.get('description', '-')}</td>
-                            <td style="color: {color}; font-weight: 600;">{sign}${doc['amount']:,.2f}</td>
+                            <td>{doc.description or '-'}</td>
+                            <td style="color: {color}; font-weight: 600;">{sign}${format_cents(doc.amount_cents)}</td>
                         </tr>
             '''
     else:
@@ -3596,25 +2856,321 @@ def documents_page():
                     </tbody>
                 </table>
             </div>
+    '''
+    
+    if next_cursor:
+        content += f'''
+            <div style="display: flex; justify-content: flex-end; margin-top: 1rem;">
+                <a href="/documents?cursor={encode_cursor(next_cursor)}" class="btn btn-secondary">Older Documents</a>
+            </div>
+        '''
+    
+    content += '''
         </div>
     </div>
     '''
     
     return create_base_template('Documents', content, page_type='expenses')
 
+@app.route('/api/documents')
+def documents_api():
+    if not session.get('username'):
+        return jsonify({'success': False, 'message': 'Not authenticated'}), 401
+    
+    fields = api.parse_fields(request.args.get('fields'), Document)
+    cursor = decode_cursor(request.args.get('cursor'))
+    docs, next_cursor = store.documents_page(cursor, page_size())
+    return jsonify({
+        'documents': [doc.to_dict(fields) for doc in docs],
+        'next_cursor': encode_cursor(next_cursor) if next_cursor else None
+    })
+
+@app.route('/api/documents/import', methods=['POST'])
+def import_documents_api():
+    if not session.get('username'):
+        return jsonify({'success': False, 'message': 'Not authenticated'}), 401
+    
+    # Either a multipart upload in `file` or the raw CSV/NDJSON request body
+    upload = request.files.get('file')
+    if upload:
+        stream, fmt = upload.stream, detect_format(upload.filename, upload.content_type)
+    else:
+        stream, fmt = request.stream, detect_format(content_type=request.content_type)
+    fmt = request.args.get('format', fmt)
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({'success': False, 'message': f'Unsupported format: {fmt}'}), 400
+    
+    result = import_documents(read_rows(stream, fmt), store.add_documents, job_ids())
+    return jsonify({'success': True, **result.to_dict()})
+
+# JSON API (docs/API.md): sparse fieldsets, pagination and batch writes
+
+@app.errorhandler(api.ApiError)
+def api_error(error):
+    return jsonify(error.to_dict()), error.status
+
+def api_login_required(view):
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not session.get('username'):
+            return jsonify({'error': 'Authentication required'}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+def json_body():
+    body = request.get_json(silent=True)
+    if body is None:
+        raise api.ApiError('Expected a JSON request body')
+    return body
+
+@app.route('/api/jobs')
+@api_login_required
+def jobs_api():
+    fields = api.parse_fields(request.args.get('fields'), Job)
+    status = request.args.get('status')
+    search = (request.args.get('search') or '').strip().lower()
+    jobs = store.jobs_with_status(status) if status else store.all_jobs()
+    if search:
+        jobs = [job for job in jobs
+                if any(search in (value or '').lower() for value in (job.number, job.customer, job.description))]
+    page, meta = api.paginate(jobs, request.args.get('page'), request.args.get('per_page'))
+    return jsonify({'jobs': [job.to_dict(fields) for job in page], **meta})
+
+@app.route('/api/jobs', methods=['POST'])
+@api_login_required
+def create_jobs_api():
+    items, is_batch = api.batch_items(json_body())
+    jobs = store.add_jobs(api.new_records(Job, items))
+    if is_batch:
+        return jsonify({'jobs': [job.to_dict() for job in jobs]}), 201
+    return jsonify({'job': jobs[0].to_dict()}), 201
+
+@app.route('/api/jobs/<int:job_id>')
+@api_login_required
+def job_api(job_id):
+    job = store.get_job(job_id)
+    if job is None:
+        raise api.ApiError('Resource not found', status=404)
+    return jsonify({'job': job.to_dict(api.parse_fields(request.args.get('fields'), Job))})
+
+@app.route('/api/jobs/<int:job_id>/update', methods=['POST'])
+@api_login_required
+def update_job_api(job_id):
+    items, _ = api.batch_items(json_body())
+    if len(items) != 1:
+        raise api.ApiError('Expected a JSON object')
+    jobs = store.update_jobs(api.updated_records(items, store.get_job, ids=[job_id]))
+    return jsonify({'job': jobs[0].to_dict()})
+
+@app.route('/api/jobs/update', methods=['POST'])
+@api_login_required
+def update_jobs_api():
+    items, _ = api.batch_items(json_body())
+    jobs = store.update_jobs(api.updated_records(items, store.get_job))
+    return jsonify({'jobs': [job.to_dict() for job in jobs]})
+
+@app.route('/api/receipts', methods=['POST'])
+@api_login_required
+def create_receipts_api():
+    items, is_batch = api.batch_items(json_body())
+    docs = store.add_documents(api.new_records(Document, items, job_ids()))
+    if is_batch:
+        return jsonify({'receipts': [doc.to_dict() for doc in docs]}), 201
+    return jsonify({'receipt': docs[0].to_dict()}), 201
+
+@app.route('/api/upload', methods=['POST'])
+@api_login_required
+def upload_receipt_api():
+    file = request.files.get('image')
+    if not file or not file.filename:
+        raise api.ApiError('Expected a receipt image in `image`')
+    job_id = None
+    job_number = request.form.get('job_number')
+    if job_number:
+        job = next((job for job in store.all_jobs() if job.number == job_number), None)
+        if job is None:
+            raise api.ApiError(f'Unknown job_number {job_number}')
+        job_id = job.id
+    file_info = save_receipt_file(file)
+    if file_info is None:
+        raise api.ApiError('This receipt has already been uploaded', status=409)
+    doc = store.add_document(Document(type='expense', job_id=job_id, file_info=file_info,
+                                      extraction=Extraction()))
+    queue_extraction(doc)
+    # Extraction finishes later; poll GET /api/receipts/<id> for the result
+    return jsonify({'success': True, 'receipt_id': doc.id, 'status': doc.extraction.status}), 202
+
+@app.route('/api/receipts/<int:receipt_id>')
+@api_login_required
+def receipt_api(receipt_id):
+    doc = store.get_document(receipt_id)
+    if doc is None:
+        raise api.ApiError('Resource not found', status=404)
+    return jsonify({'receipt': doc.to_dict(api.parse_fields(request.args.get('fields'), Document))})
+
+@app.route('/api/receipts/<int:receipt_id>/update', methods=['POST'])
+@api_login_required
+def update_receipt_api(receipt_id):
+    items, _ = api.batch_items(json_body())
+    if len(items) != 1:
+        raise api.ApiError('Expected a JSON object')
+    docs = api.updated_records(items, store.get_document, job_ids(), ids=[receipt_id])
+    return jsonify({'receipt': store.update_documents(docs)[0].to_dict()})
+
+@app.route('/api/receipts/update', methods=['POST'])
+@api_login_required
+def update_receipts_api():
+    items, _ = api.batch_items(json_body())
+    docs = store.update_documents(api.updated_records(items, store.get_document, job_ids()))
+    return jsonify({'receipts': [doc.to_dict() for doc in docs]})
+
+EXPORTS = {
+    'documents': (exporter.DOCUMENT_COLUMNS, exporter.document_rows, ('start', 'end', 'job_id', 'category')),
+    'jobs': (exporter.JOB_COLUMNS, exporter.job_rows, ('job_id',)),
+    'report': (exporter.REPORT_COLUMNS, exporter.report_rows, ('start', 'end', 'job_id')),
+}
+
+@app.route('/api/export/<kind>')
+def export_api(kind):
+    """Stream documents, jobs or the job report as CSV (default) or XLSX.
+
+    Filters: start/end (YYYY-MM-DD), job_id, category. CSV is gzipped on
+    the fly for clients that send Accept-Encoding: gzip.
+    """
+    if not session.get('username'):
+        return jsonify({'success': False, 'message': 'Not authenticated'}), 401
+    if kind not in EXPORTS:
+        abort(404)
+    columns, make_rows, allowed = EXPORTS[kind]
+    fmt = request.args.get('format', 'csv')
+    if fmt not in exporter.formats():
+        return jsonify({'success': False, 'message': f'Unsupported format: {fmt}'}), 400
+    try:
+        filters = {
+            'start': parse_date(request.args.get('start')),
+            'end': parse_date(request.args.get('end')),
+            'job_id': parse_id(request.args.get('job_id')),
+            'category': request.args.get('category') or None,
+        }
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Invalid filter'}), 400
+    filters = {name: value for name, value in filters.items() if name in allowed and value is not None}
+
+    rows = make_rows(store, **filters)
+    if fmt == 'xlsx':
+        chunks = exporter.xlsx_chunks(columns, rows, title=kind)
+    else:
+        chunks = exporter.csv_chunks(columns, rows)
+    gzipped = fmt == 'csv' and bool(request.accept_encodings['gzip'])
+    if gzipped:
+        chunks = exporter.gzip_chunks(chunks)
+    response = app.response_class(stream_with_context(chunks), mimetype=exporter.MIMETYPES[fmt])
+    if gzipped:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    response.headers['Content-Disposition'] = f'attachment; filename={kind}.{fmt}'
+    response.cache_control.private = True
+    response.cache_control.no_store = True
+    return response
+
 @app.route('/logout')
 def logout():
     session.pop('username', None)
     return redirect(url_for('index'))
 
+# Readiness limits: request threads per worker (gunicorn --threads) and background backlog
+WEB_THREADS = int(os.environ.get('WEB_THREADS', 4))
+TASK_QUEUE_MAX_DEPTH = int(os.environ.get('TASK_QUEUE_MAX_DEPTH', 100))
+
+def isoformat(timestamp):
+    return datetime.fromtimestamp(timestamp).isoformat() if timestamp is not None else None
+
 @app.route('/health')
+@app.route('/health/live')
 def health():
-    return jsonify({'status': 'healthy', 'timestamp': datetime.now().isoformat()})
+    """Liveness: the process is up and serving requests"""
+    return jsonify({
+        'status': 'healthy',
+        'timestamp': datetime.now().isoformat(),
+        'pid': os.getpid(),
+        'uptime_seconds': round(time.time() - profiler.started, 1)
+    })
+
+@app.route('/health/ready')
+def health_ready():
+    """Readiness: 503 when the database is unreachable or every other request thread is busy"""
+    status, problems = 'ready', []
+    try:
+        store.sync()
+    except Exception as e:
+        status = 'unavailable'
+        problems.append(f'database: {type(e).__name__}: {e}')
+    # This request holds one of the threads, so the worker is saturated when all the others are busy
+    busy = max(profiler.in_flight - 1, 0)
+    others = WEB_THREADS - 1
+    saturation = busy / others if others else 0.0
+    if others and busy >= others and status == 'ready':
+        status = 'saturated'
+        problems.append(f'all {others} other request threads busy')
+    try:
+        depth = task_queue.depth()
+    except Exception as e:
+        depth = None
+        problems.append(f'task queue: {type(e).__name__}: {e}')
+    if status == 'ready' and (depth is None or depth > TASK_QUEUE_MAX_DEPTH):
+        # Still serving; background extraction is only falling behind
+        status = 'degraded'
+        if depth is not None:
+            problems.append(f'{depth} queued tasks (limit {TASK_QUEUE_MAX_DEPTH})')
+    with store.reading():
+        ledger = {
+            'backend': type(store.backend).__name__ if store.backend else 'memory',
+            'documents': store.document_count(),
+            'jobs': store.job_count(),
+            'version': store.version(),
+            'last_write': isoformat(store.last_write()),
+            'companies': len(tenants.companies())
+        }
+    body = {
+        'status': status,
+        'problems': problems,
+        'timestamp': datetime.now().isoformat(),
+        'pid': os.getpid(),
+        'store': ledger,
+        'task_queue': {
+            'backend': type(task_queue).__name__,
+            'depth': depth,
+            'max_depth': TASK_QUEUE_MAX_DEPTH,
+            'completed': task_queue.completed,
+            'failed': task_queue.failed
+        },
+        'requests': {
+            'in_flight': busy,
+            'threads': WEB_THREADS,
+            'saturation': round(saturation, 2)
+        }
+    }
+    response = jsonify(body)
+    if status in ('unavailable', 'saturated'):
+        response.status_code = 503
+        response.headers['Retry-After'] = '1'
+    response.cache_control.no_store = True
+    return response
+
+@app.route('/metrics')
+def metrics():
+    response = make_response(profiler.metrics_text())
+    response.mimetype = 'text/plain'
+    response.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+    return response
 
 @app.route('/test')
 def test():
     return 'App is working!'
 
+# After every route is registered, so each view is timed
+profiler.init_app(app)
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     print(f"Starting Premium Profit Tracker AI on port {port}")
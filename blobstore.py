@@ -0,0 +1,76 @@
+"""
+Content-addressed storage for uploaded receipt files.
+
+Uploads are streamed to disk in fixed-size chunks while their SHA-256 is
+computed, so a request never holds the whole file in memory. Each blob
+is stored once under uploads/<aa>/<bb>/<sha256>; uploading the same bytes
+again reuses the existing blob. References are counted by the ledger's
+blob index (LedgerStore.blob_refcount).
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+from collections import namedtuple
+
+CHUNK_SIZE = 64 * 1024
+
+Blob = namedtuple('Blob', 'digest size created')
+
+_DIGEST = re.compile(r'^[0-9a-f]{64}$')
+
+
+def is_digest(value):
+    return bool(_DIGEST.match(value or ''))
+
+
+class BlobStore:
+    """Receipt files on disk, addressed by the SHA-256 of their content"""
+
+    def __init__(self, root, chunk_size=CHUNK_SIZE):
+        self.root = root
+        self.chunk_size = chunk_size
+        self._tmp = os.path.join(root, 'tmp')
+        os.makedirs(self._tmp, exist_ok=True)
+
+    def relative_path(self, digest):
+        return os.path.join(digest[:2], digest[2:4], digest)
+
+    def path(self, digest):
+        return os.path.join(self.root, self.relative_path(digest))
+
+    def exists(self, digest):
+        return os.path.exists(self.path(digest))
+
+    def put_stream(self, stream):
+        """Copy a file-like object into the store; returns a Blob.
+
+        Blob.created is False when identical content was already stored.
+        """
+        sha256 = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self._tmp)
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                while True:
+                    chunk = stream.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    sha256.update(chunk)
+                    size += len(chunk)
+                    out.write(chunk)
+            digest = sha256.hexdigest()
+            final_path = self.path(digest)
+            created = not os.path.exists(final_path)
+            if created:
+                os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                # Atomic; a concurrent upload of the same bytes just overwrites itself
+                os.replace(tmp_path, final_path)
+            else:
+                os.remove(tmp_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return Blob(digest, size, created)
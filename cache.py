@@ -0,0 +1,67 @@
+"""
+Rendered-page cache for the authenticated pages.
+
+Pages are cached per user and URL together with the ledger version they
+were rendered from. Any write to the ledger (including rows synced from
+other workers) bumps the version, so a stale entry is simply never hit
+again and is dropped on its next lookup or by LRU eviction. The cache is
+bounded by the total size of the cached bodies.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+CachedPage = namedtuple('CachedPage', 'version body etag mimetype')
+
+
+class ResponseCache:
+    """Thread-safe LRU of rendered pages, capped at max_bytes of body"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, version):
+        """The page cached under `key` if it was rendered at `version`"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.version != version:
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, version, body, mimetype='text/html'):
+        """Cache a rendered body and return its entry (with a content ETag)"""
+        entry = CachedPage(version, body, hashlib.sha1(body).hexdigest(), mimetype)
+        if len(body) > self.max_bytes:
+            return entry  # Would evict everything else; serve it uncached
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _remove(self, key):
+        self.size -= len(self._entries.pop(key).body)
@@ -0,0 +1,139 @@
+"""
+Streaming CSV/XLSX exports of documents, jobs and the job report.
+
+Rows come from generators and are encoded in chunks of about 64 KiB, so
+an export never builds the whole file in the worker. Documents are read
+from the ledger in keyset batches (LedgerStore.documents_after), each
+under its own short read lock, so a slow download never holds up writes.
+
+XLSX needs openpyxl, which is optional. A workbook is a zip archive that
+can only be written out once complete, so it is built row by row in
+openpyxl's write-only mode into a temporary file and streamed from there.
+"""
+
+import csv
+import io
+import tempfile
+import zlib
+
+from ledger import category_key, date_key
+from money import to_dollars
+from performance import job_performance, period_performance
+from records import parse_date
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+BATCH_SIZE = 1000
+CHUNK_SIZE = 64 * 1024
+MIMETYPES = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+DOCUMENT_COLUMNS = ('id', 'date', 'type', 'vendor', 'amount', 'category', 'job_id', 'job_number',
+                    'description')
+JOB_COLUMNS = ('id', 'number', 'customer', 'description', 'status', 'quoted_price', 'start_date',
+               'estimated_end', 'progress', 'health')
+REPORT_COLUMNS = ('job_id', 'job_number', 'customer', 'status', 'quoted_price', 'revenue',
+                  'expenses', 'profit', 'margin')
+
+
+def formats():
+    """Export formats available in this install"""
+    return ('csv', 'xlsx') if openpyxl is not None else ('csv',)
+
+
+def iter_documents(store, start=None, end=None, job_id=None, category=None, batch_size=BATCH_SIZE):
+    """Documents dated within [start, end] oldest first, optionally for one job/category"""
+    start = parse_date(start)
+    key = (start,) if start else None
+    while True:
+        docs = store.documents_after(key, end, batch_size)
+        if not docs:
+            return
+        for doc in docs:
+            if job_id is not None and doc.job_id != job_id:
+                continue
+            if category is not None and category_key(doc) != category:
+                continue
+            yield doc
+        key = date_key(docs[-1])
+
+
+def document_rows(store, **filters):
+    job_numbers = {job.id: job.number for job in store.all_jobs()}
+    for doc in iter_documents(store, **filters):
+        yield (doc.id, doc.date, doc.type, doc.vendor, to_dollars(doc.amount_cents), doc.category,
+               doc.job_id, job_numbers.get(doc.job_id), doc.description)
+
+
+def job_rows(store, job_id=None):
+    for job in store.all_jobs():
+        if job_id is None or job.id == job_id:
+            yield (job.id, job.number, job.customer, job.description, job.status,
+                   to_dollars(job.quoted_price_cents), job.start_date, job.estimated_end,
+                   job.progress, job.health)
+
+
+def report_rows(store, start=None, end=None, job_id=None):
+    """Per-job revenue, expenses, profit and margin, best margin first.
+
+    With a date range the amounts come from the ledger's period breakdown
+    by job instead of the all-time per-job totals.
+    """
+    jobs = [job for job in store.all_jobs() if job_id is None or job.id == job_id]
+    if start or end:
+        rows = period_performance(store, start, end, jobs)
+    else:
+        rows = job_performance(store, jobs)
+    for row in sorted(rows, key=lambda row: row['margin'], reverse=True):
+        job = row['job']
+        yield (job.id, job.number, job.customer, job.status, to_dollars(job.quoted_price_cents),
+               to_dollars(row['revenue']), to_dollars(row['expenses']), to_dollars(row['profit']),
+               round(row['margin'], 2))
+
+
+def csv_chunks(columns, rows, chunk_size=CHUNK_SIZE):
+    """UTF-8 CSV (header first) in chunks of about chunk_size bytes"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+def xlsx_chunks(columns, rows, title='Export', chunk_size=CHUNK_SIZE):
+    """An XLSX workbook with one sheet, built in a temporary file and read back in chunks"""
+    if openpyxl is None:
+        raise RuntimeError('XLSX export needs openpyxl')
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet(title)
+    sheet.append(columns)
+    for row in rows:
+        sheet.append(row)
+    with tempfile.TemporaryFile() as spool:
+        workbook.save(spool)
+        spool.seek(0)
+        while True:
+            chunk = spool.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def gzip_chunks(chunks, level=6):
+    """Gzip-compress a stream of byte chunks on the fly"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
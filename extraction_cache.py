@@ -0,0 +1,122 @@
+"""
+Persistent cache of receipt extraction results.
+
+Reading a receipt with the vision model takes seconds and costs an API
+call, and the same image comes back through retries, failed saves and
+re-uploads. Results are cached in a small SQLite file keyed by the
+image's SHA-256 and receipt_processor.EXTRACTION_VERSION (model, prompt
+and token limit), so changing any of those starts from a clean slate.
+
+Entries expire `ttl` seconds after they were stored. The cache is capped
+at max_bytes of stored JSON; least recently used entries go first. The
+file is shared by every process that mounts it (web workers, process
+pools and the scheduler).
+"""
+
+import json
+import sqlite3
+import threading
+import time
+
+DEFAULT_TTL = 30 * 24 * 3600
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class ExtractionCache:
+    """Extraction results (JSON-serializable dicts) by key, in an SQLite file"""
+
+    SCHEMA = (
+        '''CREATE TABLE IF NOT EXISTS extractions (
+            key TEXT PRIMARY KEY,
+            data TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created REAL NOT NULL,
+            used REAL NOT NULL
+        )''',
+        'CREATE INDEX IF NOT EXISTS extractions_used ON extractions (used)',
+    )
+
+    def __init__(self, path, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES, clock=time.time):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._local = threading.local()
+        self._counts = threading.Lock()
+        conn = self.connection()
+        for statement in self.SCHEMA:
+            conn.execute(statement)
+
+    def __len__(self):
+        return self.connection().execute('SELECT COUNT(*) FROM extractions').fetchone()[0]
+
+    def connection(self):
+        """One connection per thread, as in storage.SQLiteStorage"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        """The result cached under `key`; None if missing or expired"""
+        now = self._clock()
+        conn = self.connection()
+        row = conn.execute('SELECT data, created FROM extractions WHERE key = ?', (key,)).fetchone()
+        if row is not None and row[1] + self.ttl <= now:
+            conn.execute('DELETE FROM extractions WHERE key = ?', (key,))
+            row = None
+        if row is None:
+            self._count(False)
+            return None
+        conn.execute('UPDATE extractions SET used = ? WHERE key = ?', (now, key))
+        self._count(True)
+        return json.loads(row[0])
+
+    def put(self, key, data):
+        """Cache `data` under `key`, evicting expired and least recently used entries"""
+        body = json.dumps(data)
+        if len(body) > self.max_bytes:
+            return  # Would evict everything else
+        now = self._clock()
+        conn = self.connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('INSERT OR REPLACE INTO extractions (key, data, size, created, used) '
+                         'VALUES (?, ?, ?, ?, ?)', (key, body, len(body), now, now))
+            conn.execute('DELETE FROM extractions WHERE created <= ?', (now - self.ttl,))
+            self._evict(conn)
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def _evict(self, conn):
+        excess = conn.execute('SELECT COALESCE(SUM(size), 0) FROM extractions').fetchone()[0] - self.max_bytes
+        if excess <= 0:
+            return
+        evicted = []
+        for key, size in conn.execute('SELECT key, size FROM extractions ORDER BY used, key'):
+            evicted.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany('DELETE FROM extractions WHERE key = ?', evicted)
+
+    def _count(self, hit):
+        with self._counts:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
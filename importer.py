@@ -0,0 +1,202 @@
+"""
+Bulk import of historical documents from CSV or NDJSON.
+
+Rows are parsed one at a time from the input stream, validated, and
+written in batches: each batch is one database transaction and one index
+and aggregate update in the ledger. Invalid rows are skipped and reported
+by line number; they never abort the import.
+
+Columns / keys: type (income|expense), date (YYYY-MM-DD), amount (dollars)
+or amount_cents, vendor, description, category, job_id.
+
+Command line, writing straight to the configured database:
+
+    python -m importer receipts.csv
+    python -m importer history.ndjson --database sqlite:///instance/ledger.db
+    python -m importer acme.csv --company acme
+
+--company picks the company's ledger the way the app does (its
+TENANT_SHARDS entry, else its part of the database; see tenants.py).
+"""
+
+import argparse
+import codecs
+import csv
+import json
+import os
+import sys
+
+from records import DOCUMENT_TYPES, Document
+
+DEFAULT_BATCH_SIZE = 5000
+READ_SIZE = 64 * 1024
+MAX_REPORTED_ERRORS = 100
+
+
+class RowError(ValueError):
+    """A row that cannot be imported"""
+
+
+class ImportResult:
+    """Counts and the first few row errors of one import"""
+
+    def __init__(self):
+        self.imported = 0
+        self.rejected = 0
+        self.errors = []
+
+    def reject(self, line, message):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': message})
+
+    def to_dict(self):
+        return {'imported': self.imported, 'rejected': self.rejected, 'errors': self.errors}
+
+
+def detect_format(filename=None, content_type=None):
+    """'csv' or 'ndjson' from a file extension or MIME type; CSV by default"""
+    name = (filename or '').lower()
+    mimetype = (content_type or '').split(';')[0].strip().lower()
+    if name.endswith(('.ndjson', '.jsonl', '.json')) or mimetype in (
+            'application/x-ndjson', 'application/ndjson', 'application/jsonl', 'application/json'):
+        return 'ndjson'
+    return 'csv'
+
+
+def iter_lines(stream, read_size=READ_SIZE):
+    """Decoded lines (with their '\n') from a binary stream, read in large chunks.
+
+    Iterating a request stream directly reads it a few bytes at a time.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    pending = ''
+    while True:
+        chunk = stream.read(read_size)
+        if not chunk:
+            break
+        lines = (pending + decoder.decode(chunk)).split('\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line + '\n'
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        yield pending
+
+
+def read_rows(stream, fmt):
+    """Yield (line number, dict) from a binary stream without reading it all"""
+    lines = iter_lines(stream)
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'ndjson':
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield number, RowError(f'Invalid JSON: {e}')
+                continue
+            yield number, row if isinstance(row, dict) else RowError('Expected a JSON object')
+    else:
+        raise ValueError(f'Unknown import format: {fmt}')
+
+
+def _value(row, field):
+    value = row.get(field)
+    if isinstance(value, str):
+        value = value.strip()
+    return None if value == '' else value
+
+
+def parse_row(row, job_ids=None):
+    """Document for one input row; raises RowError with the reason"""
+    if isinstance(row, RowError):
+        raise row
+    doc_type = (_value(row, 'type') or '').lower()
+    if doc_type not in DOCUMENT_TYPES:
+        raise RowError(f'type must be income or expense, got {row.get("type")!r}')
+    if _value(row, 'date') is None:
+        raise RowError('date is required')
+    try:
+        doc = Document(
+            type=doc_type,
+            vendor=_value(row, 'vendor'),
+            amount=_value(row, 'amount'),
+            amount_cents=_value(row, 'amount_cents'),
+            date=_value(row, 'date'),
+            description=_value(row, 'description'),
+            category=_value(row, 'category'),
+            job_id=_value(row, 'job_id')
+        )
+    except (TypeError, ValueError) as e:
+        raise RowError(str(e))
+    if doc.job_id is not None and job_ids is not None and doc.job_id not in job_ids:
+        raise RowError(f'unknown job_id {doc.job_id}')
+    return doc
+
+
+def import_documents(rows, write, job_ids=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Validate (line, row) pairs and pass batches of Documents to `write`.
+
+    `write` is LedgerStore.add_documents inside the app, or a storage
+    backend's insert_documents from the command line.
+    """
+    result = ImportResult()
+    batch = []
+    for line, row in rows:
+        try:
+            batch.append(parse_row(row, job_ids))
+        except RowError as e:
+            result.reject(line, str(e))
+            continue
+        if len(batch) >= batch_size:
+            write(batch)
+            result.imported += len(batch)
+            batch = []
+    if batch:
+        write(batch)
+        result.imported += len(batch)
+    return result
+
+
+def main(argv=None):
+    from tenants import DEFAULT_COMPANY, open_tenant, parse_shards
+
+    parser = argparse.ArgumentParser(description='Bulk import documents from CSV or NDJSON')
+    parser.add_argument('path', help="input file, or '-' for stdin")
+    parser.add_argument('--format', choices=('csv', 'ndjson'), help='default: from the file extension')
+    parser.add_argument('--database', default=os.environ.get('DATABASE_URL'),
+                        help='database URL (default: $DATABASE_URL)')
+    parser.add_argument('--company', default=DEFAULT_COMPANY, help=f'company id (default: {DEFAULT_COMPANY})')
+    parser.add_argument('--shards', default=os.environ.get('TENANT_SHARDS'),
+                        help='JSON object of company id to database URL (default: $TENANT_SHARDS)')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    try:
+        backend = open_tenant(args.database, args.company, parse_shards(args.shards))
+    except ValueError as e:
+        parser.error(str(e))
+    if backend is None:
+        parser.error('a database is required (--database or DATABASE_URL)')
+    job_ids = {job.id for job in backend.load_jobs()}
+    fmt = args.format or detect_format(args.path)
+    stream = sys.stdin.buffer if args.path == '-' else open(args.path, 'rb')
+    try:
+        result = import_documents(read_rows(stream, fmt), backend.insert_documents, job_ids,
+                                  args.batch_size)
+    finally:
+        if stream is not sys.stdin.buffer:
+            stream.close()
+        backend.close()
+    json.dump(result.to_dict(), sys.stdout, indent=2)
+    print()
+    return 1 if result.rejected else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
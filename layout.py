@@ -0,0 +1,239 @@
+"""
+Page shell for the authenticated pages.
+
+The shell (head, header, nav and quick-add modal) is compiled once at
+startup; rendering a page only splices the title, nav and body into the
+precompiled chunks. CSS and JS live under static/ and are linked with a
+content fingerprint so browsers can cache them indefinitely.
+"""
+
+import hashlib
+import os
+import re
+
+NAV_PAGES = ('dashboard', 'jobs', 'invoices', 'expenses', 'reports')
+
+PAGE_TEMPLATE = '''
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{title} - Profit Tracker AI</title>
+    <link rel="preconnect" href="https://fonts.googleapis.com">
+    <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
+    <link href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap" rel="stylesheet">
+    <link href="{stylesheet}" rel="stylesheet">
+</head>
+<body>
+    <header class="header">
+        <div class="header-content">
+            <a href="/" class="logo">
+                <div class="logo-icon">PT</div>
+                <span>Profit Tracker</span>
+            </a>
+            {nav}
+        </div>
+    </header>
+    
+    <div class="container">
+        {content}
+    </div>
+    
+    <!-- Quick Add Modal -->
+    <div id="quickAddModal" style="display: none; position: fixed; top: 0; left: 0; right: 0; bottom: 0; background: rgba(0,0,0,0.5); z-index: 1000; align-items: center; justify-content: center;">
+        <div style="background: white; padding: 2rem; border-radius: 1rem; max-width: 600px; width: 90%; max-height: 90vh; overflow-y: auto; position: relative;">
+            <button onclick="closeQuickAdd()" style="position: absolute; top: 1rem; right: 1rem; background: none; border: none; font-size: 1.5rem; cursor: pointer; color: var(--secondary);">&times;</button>
+            
+            <h2 style="margin-bottom: 1.5rem;">Quick Add</h2>
+            
+            <div style="display: grid; grid-template-columns: repeat(auto-fit, minmax(150px, 1fr)); gap: 1rem; margin-bottom: 2rem;">
+                <a href="/upload?type=expense" class="action-card" style="padding: 1.5rem; text-decoration: none;">
+                    <div class="action-icon">
+                        <svg width="24" height="24" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
+                            <rect x="2" y="7" width="20" height="14" rx="2" ry="2"></rect>
+                            <path d="M16 3h-8v4h8z"></path>
+                        </svg>
+                    </div>
+                    <h3 class="action-title">Add Expense</h3>
+                    <p class="action-desc">Record a cost</p>
+                </a>
+                
+                <a href="/upload?type=income" class="action-card" style="padding: 1.5rem; text-decoration: none;">
+                    <div class="action-icon">
+                        <svg width="24" height="24" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
+                            <path d="M12 2v20M17 5H9.5a3.5 3.5 0 0 0 0 7h5a3.5 3.5 0 0 1 0 7H6"/>
+                        </svg>
+                    </div>
+                    <h3 class="action-title">Add Income</h3>
+                    <p class="action-desc">Record payment</p>
+                </a>
+                
+                <a href="/jobs/new" class="action-card" style="padding: 1.5rem; text-decoration: none;">
+                    <div class="action-icon">
+                        <svg width="24" height="24" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
+                            <path d="M20 7h-9a2 2 0 0 0-2 2v10a2 2 0 0 0 2 2h9a2 2 0 0 0 2-2V9a2 2 0 0 0-2-2z"></path>
+                            <path d="M5 3h9a2 2 0 0 1 2 2v2H7a2 2 0 0 0-2 2v8H3a1 1 0 0 1-1-1V5a2 2 0 0 1 2-2z"></path>
+                        </svg>
+                    </div>
+                    <h3 class="action-title">New Job</h3>
+                    <p class="action-desc">Start project</p>
+                </a>
+            </div>
+            
+            <div style="border-top: 1px solid var(--border); padding-top: 1.5rem;">
+                <h3 style="margin-bottom: 1rem;">Quick Expense Entry</h3>
+                <form id="quickAddForm" onsubmit="quickAddSubmit(event)" method="POST" action="/api/quick-add">
+                    <div style="display: grid; grid-template-columns: 1fr 1fr; gap: 1rem;">
+                        <div class="form-group">
+                            <label>Type</label>
+                            <select name="type" required>
+                                <option value="expense">Expense</option>
+                                <option value="income">Income</option>
+                            </select>
+                        </div>
+                        
+                        <div class="form-group">
+                            <label>Amount</label>
+                            <input type="number" name="amount" step="0.01" required placeholder="0.00">
+                        </div>
+                        
+                        <div class="form-group">
+                            <label>Vendor/Customer</label>
+                            <input type="text" name="vendor" required placeholder="e.g., Home Depot">
+                        </div>
+                        
+                        <div class="form-group">
+                            <label>Category</label>
+                            <select name="category" required>
+                                <option value="Materials">Materials</option>
+                                <option value="Labor">Labor</option>
+                                <option value="Equipment">Equipment</option>
+                                <option value="Other">Other</option>
+                            </select>
+                        </div>
+                    </div>
+                    
+                    <div class="form-group">
+                        <label>Description (Optional)</label>
+                        <input type="text" name="description" placeholder="Quick note...">
+                    </div>
+                    
+                    <button type="submit" class="btn btn-primary" style="width: 100%;">Save Quick Entry</button>
+                </form>
+            </div>
+        </div>
+    </div>
+    
+    <script src="{script}"></script>
+</body>
+</html>
+'''
+
+NAV_TEMPLATE = '''
+            <nav class="main-nav">
+                <a href="/dashboard" class="nav-link {dashboard}">
+                    <svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
+                        <rect x="3" y="3" width="7" height="7"></rect>
+                        <rect x="14" y="3" width="7" height="7"></rect>
+                        <rect x="14" y="14" width="7" height="7"></rect>
+                        <rect x="3" y="14" width="7" height="7"></rect>
+                    </svg>
+                    <span>Dashboard</span>
+                </a>
+                <a href="/jobs" class="nav-link {jobs}">
+                    <svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
+                        <path d="M20 7h-9a2 2 0 0 0-2 2v10a2 2 0 0 0 2 2h9a2 2 0 0 0 2-2V9a2 2 0 0 0-2-2z"></path>
+                        <path d="M5 3h9a2 2 0 0 1 2 2v2H7a2 2 0 0 0-2 2v8H3a1 1 0 0 1-1-1V5a2 2 0 0 1 2-2z"></path>
+                    </svg>
+                    <span>Jobs</span>
+                </a>
+                <a href="/invoices" class="nav-link {invoices}">
+                    <svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
+                        <path d="M14 2H6a2 2 0 0 0-2 2v16a2 2 0 0 0 2 2h12a2 2 0 0 0 2-2V8z"></path>
+                        <path d="M14 2v6h6"></path>
+                        <line x1="16" y1="13" x2="8" y2="13"></line>
+                        <line x1="16" y1="17" x2="8" y2="17"></line>
+                        <line x1="10" y1="9" x2="8" y2="9"></line>
+                    </svg>
+                    <span>Invoices</span>
+                </a>
+                <a href="/expenses" class="nav-link {expenses}">
+                    <svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
+                        <rect x="2" y="7" width="20" height="14" rx="2" ry="2"></rect>
+                        <path d="M16 3h-8v4h8z"></path>
+                    </svg>
+                    <span>Expenses</span>
+                </a>
+                <a href="/reports" class="nav-link {reports}">
+                    <svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
+                        <path d="M21.21 15.89A10 10 0 1 1 8 2.83"></path>
+                        <path d="M22 12A10 10 0 0 0 12 2v10z"></path>
+                    </svg>
+                    <span>Analytics</span>
+                </a>
+            </nav>
+            <div class="header-actions">
+                <button class="quick-add-btn" onclick="showQuickAdd()">
+                    <svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
+                        <circle cx="12" cy="12" r="10"></circle>
+                        <line x1="12" y1="8" x2="12" y2="16"></line>
+                        <line x1="8" y1="12" x2="16" y2="12"></line>
+                    </svg>
+                    Quick Add
+                </button>
+                <div class="user-menu">
+                    <div class="avatar">{initial}</div>
+                    <span class="username">{username}</span>
+                    <a href="/logout" class="logout-btn">
+                        <svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
+                            <path d="M9 21H5a2 2 0 0 1-2-2V5a2 2 0 0 1 2-2h4"></path>
+                            <polyline points="16 17 21 12 16 7"></polyline>
+                            <line x1="21" y1="12" x2="9" y2="12"></line>
+                        </svg>
+                    </a>
+                </div>
+            </div>
+'''
+
+_SLOT = re.compile(r'\{(\w+)\}')
+
+
+def compile_template(template, **static):
+    """Fill static slots now and split the rest into (chunk, slot, chunk, ...)"""
+    filled = _SLOT.sub(lambda m: static.get(m.group(1), m.group(0)), template)
+    return _SLOT.split(filled)
+
+
+def render_compiled(parts, values):
+    return ''.join(values[part] if i % 2 else part for i, part in enumerate(parts))
+
+
+def fingerprint(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()[:12]
+
+
+class PageShell:
+    """Precompiled page chrome; render() does the per-request splicing"""
+
+    def __init__(self, static_folder, static_url_path='/static'):
+        def asset_url(name):
+            return f'{static_url_path}/{name}?v={fingerprint(os.path.join(static_folder, name))}'
+
+        self._page = compile_template(PAGE_TEMPLATE,
+                                      stylesheet=asset_url('css/app.css'),
+                                      script=asset_url('js/app.js'))
+        self._navs = {}
+        for page_type in NAV_PAGES + ('default',):
+            active = {name: 'active' if name == page_type else '' for name in NAV_PAGES}
+            self._navs[page_type] = compile_template(NAV_TEMPLATE, **active)
+
+    def render(self, title, content, username=None, page_type='default'):
+        """Full page HTML; pass username=None to omit the nav"""
+        nav = ''
+        if username is not None:
+            parts = self._navs.get(page_type, self._navs['default'])
+            nav = render_compiled(parts, {'initial': (username or 'U')[0].upper(),
+                                          'username': username or 'User'})
+        return render_compiled(self._page, {'title': title, 'nav': nav, 'content': content})
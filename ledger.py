@@ -0,0 +1,593 @@
+"""
+In-memory ledger store for Profit Tracker AI.
+
+Keeps documents and jobs (records.Document / records.Job) together with
+secondary indexes so routes can look records up directly instead of
+scanning the whole ledger. With a
+storage backend (see storage.py) writes go to the database first and
+sync() pulls in rows written by other workers.
+
+All access goes through a readers-writer lock, so request threads can
+read concurrently while writes are applied one at a time. Lookups return
+copies, and `with store.reading():` groups several lookups into one
+consistent view.
+"""
+
+import functools
+import threading
+import time
+from collections import defaultdict
+from datetime import date
+from operator import itemgetter
+
+import analytics
+from concurrency import ReadWriteLock
+from profiling import phase
+from records import parse_date
+from rollup import RollupCube
+from sortedindex import SortedIndex
+
+
+def date_key(doc):
+    """Sort key of the date-ordered index: (date, id); undated documents sort first"""
+    return (doc.date or date.min, doc.id)
+
+
+def encode_cursor(key):
+    return f'{key[0].isoformat()}_{key[1]}'
+
+
+def decode_cursor(cursor):
+    """'2024-01-10_12' -> (date(2024, 1, 10), 12); None for a missing/garbled cursor"""
+    try:
+        day, doc_id = cursor.rsplit('_', 1)
+        return (date.fromisoformat(day), int(doc_id))
+    except (AttributeError, ValueError):
+        return None
+
+
+def category_key(doc):
+    return doc.category or 'Other'
+
+
+def group_key(doc, by):
+    """Group label used by period breakdowns; matches analytics.DocumentTable"""
+    if by == 'category':
+        return category_key(doc)
+    if by == 'month':
+        return month_key(doc.date)
+    if by == 'day':
+        return doc.date.isoformat() if doc.date else None
+    if by == 'job':
+        return doc.job_id
+    raise ValueError(f'Unknown grouping: {by}')
+
+
+def month_key(day):
+    """date(2024, 1, 15) -> '2024-01'"""
+    return '%04d-%02d' % (day.year, day.month) if day else None
+
+
+class IdSequence:
+    """Thread-safe monotonic id allocator"""
+
+    def __init__(self, start=1):
+        self._lock = threading.Lock()
+        self._next = start
+
+    def next(self):
+        with self._lock:
+            value = self._next
+            self._next += 1
+            return value
+
+    def advance_past(self, value):
+        """Never hand out `value` or anything below it (after loading fixed ids)"""
+        with self._lock:
+            self._next = max(self._next, value + 1)
+
+
+class Totals:
+    """Running revenue/expense sums (integer cents) for one slice of the ledger"""
+
+    __slots__ = ('revenue', 'expenses', 'income_count', 'expense_count')
+
+    def __init__(self):
+        self.revenue = 0
+        self.expenses = 0
+        self.income_count = 0
+        self.expense_count = 0
+
+    def copy(self):
+        snapshot = Totals()
+        snapshot.revenue = self.revenue
+        snapshot.expenses = self.expenses
+        snapshot.income_count = self.income_count
+        snapshot.expense_count = self.expense_count
+        return snapshot
+
+    def add(self, doc, sign=1):
+        if doc.type == 'income':
+            self.revenue += sign * doc.amount_cents
+            self.income_count += sign
+        elif doc.type == 'expense':
+            self.expenses += sign * doc.amount_cents
+            self.expense_count += sign
+
+    def remove(self, doc):
+        self.add(doc, -1)
+
+    @property
+    def net_profit(self):
+        return self.revenue - self.expenses
+
+    @property
+    def profit_margin(self):
+        return (self.net_profit / self.revenue * 100) if self.revenue > 0 else 0
+
+
+class LedgerAggregates:
+    """Totals maintained incrementally as documents are added (or replaced)"""
+
+    def __init__(self):
+        self.total = Totals()
+        self.by_job = defaultdict(Totals)
+        self.by_category = defaultdict(Totals)
+        self.by_month = defaultdict(Totals)
+        self.cube = RollupCube()
+
+    def add(self, doc, sign=1):
+        self.total.add(doc, sign)
+        self.by_job[doc.job_id].add(doc, sign)
+        self.by_category[category_key(doc)].add(doc, sign)
+        self.by_month[month_key(doc.date)].add(doc, sign)
+        self.cube.add(month_key(doc.date), doc.job_id, category_key(doc), doc.type,
+                      sign * doc.amount_cents, sign)
+
+    def remove(self, doc):
+        self.add(doc, -1)
+
+
+def _reads(method):
+    @functools.wraps(method)
+    def locked(self, *args, **kwargs):
+        # Counted as aggregation time in sampled request profiles
+        with phase('aggregate'), self._lock.read():
+            return method(self, *args, **kwargs)
+    return locked
+
+
+def _writes(method):
+    @functools.wraps(method)
+    def locked(self, *args, **kwargs):
+        with self._lock.write():
+            return method(self, *args, **kwargs)
+    return locked
+
+
+class LedgerStore:
+    """Documents and jobs with secondary indexes on the common lookups"""
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self._lock = ReadWriteLock()
+        self._version = 0
+        self.clear()
+        self._last_write = None
+
+    def reading(self):
+        """Hold the read lock across several lookups for a consistent view"""
+        return self._lock.read()
+
+    @_writes
+    def clear(self):
+        self._document_ids = IdSequence()
+        self._job_ids = IdSequence()
+        self._documents_by_id = {}
+        self._jobs_by_id = {}
+        # {key: {id: document}}; dicts keep insertion order and make removal O(1)
+        self._by_job = defaultdict(dict)
+        self._by_type = defaultdict(dict)
+        self._by_category = defaultdict(dict)
+        self._by_vendor = defaultdict(dict)
+        self._by_date = defaultdict(dict)
+        self._by_blob = defaultdict(dict)
+        # Documents ordered by (date, id) for ranges and keyset pagination
+        self._by_date_order = SortedIndex()
+        self.aggregates = LedgerAggregates()
+        self.table = analytics.DocumentTable() if analytics.available() else None
+        self._last_document_id = 0
+        self._last_job_id = 0
+        self._last_document_revision = 0
+        self._last_job_revision = 0
+        self._changed()
+
+    # Writes
+
+    def add_document(self, doc):
+        """Store a new document and assign its id"""
+        if self.backend is None:
+            with self._lock.write():
+                doc.id = self._document_ids.next()
+                self._add_document(doc)
+            return doc
+        # The database allocates the id so it is unique across workers;
+        # readers are only blocked while sync() indexes the new row
+        doc.id = self.backend.insert_documents([doc])[0]
+        self.sync()
+        return doc
+
+    def add_documents(self, docs):
+        """Store a batch of new documents in one transaction and assign their ids.
+
+        Indexes, aggregates and the ledger version are updated once for the
+        whole batch rather than per document.
+        """
+        if not docs:
+            return docs
+        if self.backend is None:
+            with self._lock.write():
+                for doc in docs:
+                    doc.id = self._document_ids.next()
+                self._add_documents(docs)
+            return docs
+        for doc, doc_id in zip(docs, self.backend.insert_documents(docs)):
+            doc.id = doc_id
+        self.sync()
+        return docs
+
+    def add_job(self, job):
+        """Store a new job and assign its id"""
+        if self.backend is None:
+            with self._lock.write():
+                job.id = self._job_ids.next()
+                self._add_job(job)
+            return job
+        job.id = self.backend.insert_jobs([job])[0]
+        self.sync()
+        return job
+
+    def add_jobs(self, jobs):
+        """Store a batch of new jobs in one transaction and assign their ids"""
+        if not jobs:
+            return jobs
+        if self.backend is None:
+            with self._lock.write():
+                for job in jobs:
+                    job.id = self._job_ids.next()
+                    self._add_job(job)
+            return jobs
+        for job, job_id in zip(jobs, self.backend.insert_jobs(jobs)):
+            job.id = job_id
+        self.sync()
+        return jobs
+
+    def update_documents(self, docs):
+        """Replace stored documents with new versions (matched by id) in one transaction.
+
+        Returns the documents that were updated; ids not in the ledger are skipped.
+        """
+        if self.backend is None:
+            with self._lock.write():
+                return self._replace_documents(docs)
+        updated = set(self.backend.update_documents(docs))
+        self.sync()
+        return [doc for doc in docs if doc.id in updated]
+
+    def update_jobs(self, jobs):
+        """Replace stored jobs with new versions (matched by id); returns the ones updated"""
+        if self.backend is None:
+            with self._lock.write():
+                return self._replace_jobs(jobs)
+        updated = set(self.backend.update_jobs(jobs))
+        self.sync()
+        return [job for job in jobs if job.id in updated]
+
+    def seed(self, jobs, documents):
+        """Load records with fixed ids, e.g. sample data; existing ids are kept"""
+        if self.backend is None:
+            with self._lock.write():
+                for job in jobs:
+                    self._add_job(job)
+                self._add_documents(documents)
+            return
+        self.backend.insert_jobs(jobs, keep_ids=True)
+        self.backend.insert_documents(documents, keep_ids=True)
+        self.sync()
+
+    def sync(self):
+        """Index rows other workers have written since the last sync"""
+        if self.backend is None:
+            return
+        # Query without the lock so readers carry on during the round-trips;
+        # the write lock is only taken when there is something to apply
+        jobs = self.backend.load_jobs(self._last_job_id)
+        docs = self.backend.load_documents(self._last_document_id)
+        job_updates = self.backend.load_job_updates(self._last_job_revision)
+        doc_updates = self.backend.load_document_updates(self._last_document_revision)
+        if not (jobs or docs or job_updates or doc_updates):
+            return
+        with self._lock.write():
+            # Another thread may have applied some of these rows in the meantime
+            for job in jobs:
+                if job.id not in self._jobs_by_id:
+                    self._add_job(job)
+            self._add_documents([doc for doc in docs if doc.id not in self._documents_by_id])
+            # Then rows updated since the last sync (new rows above already
+            # carry their latest values, so replacing them again is harmless)
+            job_updates = [(revision, job) for revision, job in job_updates if revision > self._last_job_revision]
+            if job_updates:
+                self._replace_jobs([job for _, job in job_updates])
+                self._last_job_revision = job_updates[-1][0]
+            doc_updates = [(revision, doc) for revision, doc in doc_updates
+                           if revision > self._last_document_revision]
+            if doc_updates:
+                self._replace_documents([doc for _, doc in doc_updates])
+                self._last_document_revision = doc_updates[-1][0]
+
+    def _add_document(self, doc):
+        self._add_documents([doc])
+
+    def _add_documents(self, docs):
+        if not docs:
+            return
+        # The table is the step that can still reject a row, so it goes first
+        if self.table is not None:
+            self.table.extend(docs)
+        for doc in docs:
+            self._documents_by_id[doc.id] = doc
+            self._index_document(doc)
+            self.aggregates.add(doc)
+        self._index_dates(docs)
+        last_id = max(doc.id for doc in docs)
+        self._last_document_id = max(self._last_document_id, last_id)
+        self._document_ids.advance_past(last_id)
+        self._changed()
+
+    def _add_job(self, job):
+        self._jobs_by_id[job.id] = job
+        self._last_job_id = max(self._last_job_id, job.id)
+        self._changed()
+        self._job_ids.advance_past(job.id)
+
+    def _indexes(self, doc):
+        """The secondary indexes holding `doc`"""
+        yield self._by_job[doc.job_id]
+        yield self._by_type[doc.type]
+        yield self._by_category[doc.category]
+        yield self._by_vendor[doc.vendor]
+        yield self._by_date[doc.date]
+        if doc.file_info and doc.file_info.sha256:
+            yield self._by_blob[doc.file_info.sha256]
+
+    def _index_document(self, doc):
+        self._by_job[doc.job_id][doc.id] = doc
+        self._by_type[doc.type][doc.id] = doc
+        self._by_category[doc.category][doc.id] = doc
+        self._by_vendor[doc.vendor][doc.id] = doc
+        self._by_date[doc.date][doc.id] = doc
+        if doc.file_info and doc.file_info.sha256:
+            self._by_blob[doc.file_info.sha256][doc.id] = doc
+
+    def _replace_documents(self, docs):
+        """Swap stored documents for new versions with the same ids; unknown ids are skipped"""
+        replaced = []
+        for doc in docs:
+            old = self._documents_by_id.get(doc.id)
+            if old is None:
+                continue
+            if old is doc:
+                raise ValueError('update_documents needs a new record, not the stored one')
+            for index in self._indexes(old):
+                del index[old.id]
+            self.aggregates.remove(old)
+            self._by_date_order.remove(date_key(old))
+            self._documents_by_id[doc.id] = doc
+            self._index_document(doc)
+            self.aggregates.add(doc)
+            self._by_date_order.insert(date_key(doc), doc)
+            replaced.append(doc)
+        if replaced:
+            if self.table is not None:
+                self.table.update(replaced)
+            self._changed()
+        return replaced
+
+    def _replace_jobs(self, jobs):
+        replaced = [job for job in jobs if job.id in self._jobs_by_id]
+        for job in replaced:
+            self._jobs_by_id[job.id] = job
+        if replaced:
+            self._changed()
+        return replaced
+
+    def _index_dates(self, docs):
+        """Add documents to the (date, id) ordered index"""
+        self._by_date_order.update(sorted(((date_key(doc), doc) for doc in docs), key=itemgetter(0)))
+
+    def _changed(self):
+        self._version += 1
+        self._last_write = time.time()
+
+    # Lookups
+
+    @_reads
+    def version(self):
+        """Counter bumped by every change; equal versions mean identical contents"""
+        return self._version
+
+    @_reads
+    def last_write(self):
+        """Unix time of the last change (including rows synced from other workers); None if unchanged"""
+        return self._last_write
+
+    @_reads
+    def document_count(self):
+        return len(self._documents_by_id)
+
+    @_reads
+    def job_count(self):
+        return len(self._jobs_by_id)
+
+    @_reads
+    def get_job(self, job_id):
+        try:
+            return self._jobs_by_id.get(int(job_id))
+        except (TypeError, ValueError):
+            return None
+
+    @_reads
+    def get_document(self, doc_id):
+        try:
+            return self._documents_by_id.get(int(doc_id))
+        except (TypeError, ValueError):
+            return None
+
+    @_reads
+    def documents_for_job(self, job_id, doc_type=None):
+        docs = self._by_job.get(job_id, {}).values()
+        if doc_type is not None:
+            return [d for d in docs if d.type == doc_type]
+        return list(docs)
+
+    @_reads
+    def documents_by_type(self, doc_type):
+        return list(self._by_type.get(doc_type, {}).values())
+
+    @_reads
+    def documents_by_category(self, category):
+        return list(self._by_category.get(category, {}).values())
+
+    @_reads
+    def documents_by_vendor(self, vendor):
+        return list(self._by_vendor.get(vendor, {}).values())
+
+    @_reads
+    def documents_on(self, day):
+        return list(self._by_date.get(parse_date(day), {}).values())
+
+    @_reads
+    def documents_with_blob(self, digest):
+        return list(self._by_blob.get(digest, {}).values())
+
+    @_reads
+    def blob_refcount(self, digest):
+        """Number of documents backed by an uploaded file"""
+        return len(self._by_blob.get(digest, ()))
+
+    @_reads
+    def totals(self):
+        return self.aggregates.total.copy()
+
+    @_reads
+    def job_totals(self, job_id):
+        totals = self.aggregates.by_job.get(job_id)
+        return totals.copy() if totals else Totals()
+
+    @_reads
+    def month_totals(self, month):
+        totals = self.aggregates.by_month.get(month)
+        return totals.copy() if totals else Totals()
+
+    @_reads
+    def expense_category_totals(self):
+        """{category: expense total in cents} for every category with expenses"""
+        return {category: t.expenses for category, t in self.aggregates.by_category.items()
+                if t.expense_count}
+
+    # Period metrics from the rollup cube. `month` is 'YYYY-MM' and defaults
+    # to the latest month with documents; filters are job_id= and category=.
+
+    def _month(self, month):
+        return month or self.aggregates.cube.latest_month()
+
+    @_reads
+    def month_change(self, doc_type, month=None, **filters):
+        """(this month, previous month, % change or None), amounts in cents"""
+        month = self._month(month)
+        if month is None:
+            return 0, 0, None
+        return self.aggregates.cube.change(month, doc_type, **filters)
+
+    @_reads
+    def monthly_trend(self, doc_type, month=None, count=12, **filters):
+        """[(month, cents)] for the `count` months ending with `month`"""
+        month = self._month(month)
+        if month is None:
+            return []
+        return self.aggregates.cube.trailing(month, doc_type, count, **filters)
+
+    @_reads
+    def year_to_date(self, doc_type, month=None, **filters):
+        """Cents from January through `month` of the same year"""
+        month = self._month(month)
+        if month is None:
+            return 0
+        return self.aggregates.cube.year_to_date(month, doc_type, **filters)
+
+    @_reads
+    def documents_between(self, start=None, end=None):
+        """Documents dated within [start, end] (either may be None), oldest first"""
+        start, end = parse_date(start), parse_date(end)
+        index = self._by_date_order
+        low = index.bisect_left((start,)) if start else 0
+        high = index.bisect_right((end, float('inf'))) if end else len(index)
+        return index.values(low, high)
+
+    @_reads
+    def documents_after(self, key=None, end=None, limit=1000):
+        """Up to `limit` documents oldest first with a (date, id) key after `key`, dated up to `end`.
+
+        Walk a range in batches by passing the key of the last document
+        returned; each batch holds the read lock only while it is copied.
+        """
+        index = self._by_date_order
+        low = 0 if key is None else index.bisect_right(key)
+        high = index.bisect_right((parse_date(end), float('inf'))) if end else len(index)
+        return index.values(low, min(low + limit, high))
+
+    @_reads
+    def period_breakdown(self, doc_type, by='category', start=None, end=None):
+        """{group: amount in cents} for one type over an inclusive date range.
+
+        `by` is 'category', 'month', 'day' or 'job'. Vectorized over the
+        columnar table when NumPy is installed, otherwise a walk over the
+        date-ordered index limited to the range.
+        """
+        start, end = parse_date(start), parse_date(end)
+        if self.table is not None:
+            return self.table.breakdown(doc_type, by, start, end)
+        breakdown = {}
+        for doc in self.documents_between(start, end):
+            if doc.type == doc_type:
+                key = group_key(doc, by)
+                breakdown[key] = breakdown.get(key, 0) + doc.amount_cents
+        return breakdown
+
+    @_reads
+    def recent_documents(self, limit=None):
+        """Documents newest first (by date, then id)"""
+        start = 0 if limit is None else max(len(self._by_date_order) - limit, 0)
+        return self._by_date_order.values(start)[::-1]
+
+    @_reads
+    def documents_page(self, cursor=None, limit=50):
+        """One page of documents newest first, after `cursor` (a (date, id) key).
+
+        Returns (documents, next_cursor); next_cursor is None on the last page.
+        Cost is O(log n + limit) regardless of how deep the page is.
+        """
+        index = self._by_date_order
+        end = len(index) if cursor is None else index.bisect_left(cursor)
+        start = max(end - limit, 0)
+        page = index.values(start, end)[::-1]
+        next_cursor = index.key_at(start) if start > 0 else None
+        return page, next_cursor
+
+    @_reads
+    def all_jobs(self):
+        return list(self._jobs_by_id.values())
+
+    @_reads
+    def jobs_with_status(self, status):
+        return [j for j in self._jobs_by_id.values() if j.status == status]
@@ -0,0 +1,55 @@
+"""
+Money helpers.
+
+Amounts are stored and summed as integer cents so totals are exact no
+matter how many documents are added up; they are only turned back into
+dollars when a page or export is rendered.
+"""
+
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+_CENT = Decimal('0.01')
+_DOLLAR = Decimal('1')
+# Cents are stored as 64-bit integers (BIGINT columns, the int64 analytics table)
+MAX_CENTS = 2 ** 63 - 1
+MIN_CENTS = -2 ** 63
+
+
+def to_cents(value):
+    """Dollar amount ('1,234.50', '$12', 12.5, Decimal, int) -> integer cents.
+
+    Half a cent rounds away from zero. Raises ValueError for anything that
+    is not a finite number or does not fit in 64-bit cents.
+    """
+    if value is None or value == '':
+        return 0
+    if isinstance(value, float):
+        # repr() is the shortest round-tripping form, so 0.1 -> '0.1', not 0.1000000000000000055...
+        value = repr(value)
+    try:
+        dollars = Decimal(str(value).strip().replace(',', '').replace('$', ''))
+        cents = int(dollars.quantize(_CENT, ROUND_HALF_UP).scaleb(2))
+    except (InvalidOperation, ValueError):
+        raise ValueError(f'Invalid amount: {value!r}')
+    return check_cents(cents)
+
+
+def check_cents(cents):
+    """Integer cents, or ValueError when they do not fit in 64 bits"""
+    cents = int(cents)
+    if not MIN_CENTS <= cents <= MAX_CENTS:
+        raise ValueError(f'Amount out of range: {cents} cents')
+    return cents
+
+
+def to_dollars(cents):
+    """Integer cents -> exact Decimal dollars"""
+    return Decimal(int(cents)).scaleb(-2)
+
+
+def format_cents(cents, places=2):
+    """123456 -> '1,234.56'; with places=0 -> '1,235'"""
+    dollars = to_dollars(round(cents))
+    if places == 0:
+        dollars = dollars.quantize(_DOLLAR, ROUND_HALF_UP)
+    return f'{dollars:,.{places}f}'
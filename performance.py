@@ -0,0 +1,59 @@
+"""
+Job performance engine for the reports and jobs pages.
+
+Reads revenue and expenses from the ledger's per-job rollup, so building
+the table is linear in the number of jobs regardless of ledger size.
+"""
+
+import heapq
+
+from ledger import Totals
+
+
+def _margin(row):
+    return row['margin']
+
+
+def job_row(job, totals):
+    """Revenue, expenses, profit (cents) and margin (against the quote) for one job"""
+    profit = totals.net_profit
+    return {
+        'job': job,
+        'revenue': totals.revenue,
+        'expenses': totals.expenses,
+        'profit': profit,
+        'margin': (profit / job.quoted_price_cents * 100) if job.quoted_price_cents > 0 else 0
+    }
+
+
+def job_performance(store, jobs=None):
+    """Performance rows for `jobs` (default: every job) in their given order"""
+    with store.reading():
+        if jobs is None:
+            jobs = store.all_jobs()
+        return [job_row(job, store.job_totals(job.id)) for job in jobs]
+
+
+def period_performance(store, start=None, end=None, jobs=None):
+    """Performance rows over an inclusive date range, from the ledger's period breakdown by job"""
+    with store.reading():
+        if jobs is None:
+            jobs = store.all_jobs()
+        revenue = store.period_breakdown('income', 'job', start, end)
+        expenses = store.period_breakdown('expense', 'job', start, end)
+    rows = []
+    for job in jobs:
+        totals = Totals()
+        totals.revenue = revenue.get(job.id, 0)
+        totals.expenses = expenses.get(job.id, 0)
+        rows.append(job_row(job, totals))
+    return rows
+
+
+def top_jobs_by_margin(store, limit=None):
+    """Jobs ranked by margin, best first; a heap keeps top-N at O(jobs log N)"""
+    with store.reading():
+        rows = (job_row(job, store.job_totals(job.id)) for job in store.all_jobs())
+        if limit is None:
+            return sorted(rows, key=_margin, reverse=True)
+        return heapq.nlargest(limit, rows, key=_margin)
@@ -0,0 +1,362 @@
+"""
+Request metrics and on-demand profiling for the Flask app.
+
+RequestProfiler wraps app.wsgi_app. For every request it counts wall
+time, CPU time (of the serving thread) and response bytes per route
+(the Flask endpoint name), including time spent streaming the body.
+File responses are handed to the server unwrapped, so it can still send
+them with sendfile; their bytes are taken from Content-Length.
+Sampled requests additionally get a breakdown of where the time went:
+
+    aggregate  ledger lookups (LedgerStore read methods)
+    render     building the page in the view function
+    serialize  JSON encoding and streamed bodies (exports)
+    other      everything else: routing, sessions, cache lookups, sync
+
+Phases are exclusive: a ledger lookup inside a view counts as aggregate,
+not render. A request is sampled with probability PROFILE_SAMPLE_RATE,
+or when it sends `X-Profile: <PROFILE_TOKEN>`. With PROFILE_DIR set,
+sampled requests are also profiled (cProfile, or pyinstrument with
+PROFILER=pyinstrument) and the profile is written to that directory.
+
+metrics_text() renders everything in the Prometheus text format for
+GET /metrics. Counters are per process, so with several gunicorn
+workers each scrape sees the worker that answered it.
+"""
+
+import cProfile
+import functools
+import os
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import pyinstrument
+except ImportError:
+    pyinstrument = None
+
+# Request duration histogram buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PHASES = ('aggregate', 'render', 'serialize', 'other')
+PROFILE_HEADER = 'X-Profile'
+METRIC_PREFIX = 'profit_tracker'
+_PROFILE_ENVIRON = 'HTTP_' + PROFILE_HEADER.upper().replace('-', '_')
+
+_current = ContextVar('profiling_timer', default=None)
+
+
+class PhaseTimer:
+    """Exclusive time per phase for one sampled request"""
+
+    def __init__(self):
+        self.phases = defaultdict(float)
+        self._stack = []
+        self._started = 0.0
+
+    def enter(self, name):
+        now = time.perf_counter()
+        if self._stack:
+            self.phases[self._stack[-1]] += now - self._started
+        self._stack.append(name)
+        self._started = now
+
+    def exit(self):
+        now = time.perf_counter()
+        self.phases[self._stack.pop()] += now - self._started
+        self._started = now
+
+
+class phase:
+    """`with phase('aggregate'):` attributes the block to a phase; free when not sampling"""
+
+    __slots__ = ('name', 'timer')
+
+    def __init__(self, name):
+        self.name = name
+        self.timer = None
+
+    def __enter__(self):
+        self.timer = _current.get()
+        if self.timer is not None:
+            self.timer.enter(self.name)
+
+    def __exit__(self, *exc):
+        if self.timer is not None:
+            self.timer.exit()
+
+
+def timed(name):
+    """Decorator form of phase()"""
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider with encoding counted as serialize time"""
+
+    def dumps(self, obj, **kwargs):
+        with phase('serialize'):
+            return super().dumps(obj, **kwargs)
+
+
+class RouteStats:
+    __slots__ = ('requests', 'statuses', 'wall', 'cpu', 'bytes', 'buckets', 'sampled', 'phases')
+
+    def __init__(self):
+        self.requests = 0
+        self.statuses = defaultdict(int)
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.bytes = 0
+        self.buckets = [0] * len(BUCKETS)
+        self.sampled = 0
+        self.phases = defaultdict(float)
+
+
+class _Body:
+    """Response iterable that counts bytes and records the request when closed"""
+
+    def __init__(self, profiler, state, app_iter):
+        self._profiler = profiler
+        self._state = state
+        self._iter = app_iter
+        self._chunks = None
+
+    def __iter__(self):
+        self._chunks = self._generate()
+        return self._chunks
+
+    def _generate(self):
+        state = self._state
+        token = _current.set(state.timer) if state.timer is not None else None
+        try:
+            # Streamed bodies (exports) are generated here, after the view returned
+            with phase('serialize'):
+                for chunk in self._iter:
+                    state.bytes += len(chunk)
+                    yield chunk
+        finally:
+            if token is not None:
+                _current.reset(token)
+
+    def close(self):
+        try:
+            if self._chunks is not None:
+                self._chunks.close()
+            if hasattr(self._iter, 'close'):
+                self._iter.close()
+        finally:
+            self._profiler.finish(self._state)
+
+
+class _RequestState:
+    __slots__ = ('route', 'status', 'length', 'wall', 'cpu', 'bytes', 'timer', 'profile')
+
+    def __init__(self):
+        self.route = 'unmatched'
+        self.status = '000'
+        self.length = 0  # Content-Length, for bodies that are not iterated here
+        self.wall = time.perf_counter()
+        self.cpu = time.thread_time()
+        self.bytes = 0
+        self.timer = None
+        self.profile = None
+
+
+class RequestProfiler:
+    """WSGI middleware collecting per-route metrics, with sampled phase timings and profiles"""
+
+    def __init__(self, sample_rate=0.0, token=None, profile_dir=None, profiler='cprofile'):
+        self.sample_rate = sample_rate
+        self.token = token
+        self.profile_dir = profile_dir
+        self.profiler = profiler
+        self.started = time.time()
+        self.in_flight = 0  # Requests started and not yet finished, in this process
+        self._routes = defaultdict(RouteStats)
+        self._lock = threading.Lock()
+        self._profiling = threading.Lock()  # One profile at a time
+        self.wsgi_app = None
+
+    def init_app(self, app):
+        self.wsgi_app = app.wsgi_app
+        app.wsgi_app = self
+        app.json = TimedJSONProvider(app)
+        app.before_request(self._label_route)
+        # Everything a view does outside ledger lookups and serialization is rendering
+        for endpoint, view in list(app.view_functions.items()):
+            if endpoint != 'static':
+                app.view_functions[endpoint] = timed('render')(view)
+
+    @staticmethod
+    def _label_route():
+        state = request.environ.get('profiling.state')
+        if state is not None:
+            state.route = request.endpoint or 'unmatched'
+
+    def _sampled(self, environ):
+        if self.token and environ.get(_PROFILE_ENVIRON) == self.token:
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def __call__(self, environ, start_response):
+        state = _RequestState()
+        environ['profiling.state'] = state
+        with self._lock:
+            self.in_flight += 1
+        if self._sampled(environ):
+            state.timer = PhaseTimer()
+            state.timer.enter('other')
+            if self.profile_dir and self._profiling.acquire(blocking=False):
+                state.profile = self._start_profile()
+
+        def recording_start_response(status, headers, exc_info=None):
+            state.status = status.split(' ', 1)[0]
+            for name, value in headers:
+                if name.lower() == 'content-length' and value.isdigit():
+                    state.length = int(value)
+            return start_response(status, headers, exc_info)
+
+        token = _current.set(state.timer)
+        try:
+            app_iter = self.wsgi_app(environ, recording_start_response)
+        except BaseException:
+            self.finish(state)
+            raise
+        finally:
+            _current.reset(token)
+        file_wrapper = environ.get('wsgi.file_wrapper')
+        if isinstance(file_wrapper, type) and isinstance(app_iter, file_wrapper):
+            # Wrapping the server's own file wrapper would stop it using sendfile
+            return self._finish_on_close(state, app_iter)
+        return _Body(self, state, app_iter)
+
+    def _finish_on_close(self, state, app_iter):
+        """Record the request when the server closes `app_iter`, counting its Content-Length"""
+        state.bytes = state.length
+        close = getattr(app_iter, 'close', None)
+
+        def finishing_close():
+            try:
+                if close is not None:
+                    close()
+            finally:
+                self.finish(state)
+        app_iter.close = finishing_close
+        return app_iter
+
+    def finish(self, state):
+        wall = time.perf_counter() - state.wall
+        cpu = time.thread_time() - state.cpu
+        if state.timer is not None:
+            state.timer.exit()
+        if state.profile is not None:
+            try:
+                self._stop_profile(state.profile, state.route)
+            finally:
+                self._profiling.release()
+        with self._lock:
+            self.in_flight -= 1
+            stats = self._routes[state.route]
+            stats.requests += 1
+            stats.statuses[state.status] += 1
+            stats.wall += wall
+            stats.cpu += cpu
+            stats.bytes += state.bytes
+            for i, bound in enumerate(BUCKETS):
+                if wall <= bound:
+                    stats.buckets[i] += 1
+            if state.timer is not None:
+                stats.sampled += 1
+                for name, seconds in state.timer.phases.items():
+                    stats.phases[name] += seconds
+
+    def _start_profile(self):
+        if self.profiler == 'pyinstrument' and pyinstrument is not None:
+            profile = pyinstrument.Profiler()
+            profile.start()
+            return profile
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile
+
+    def _stop_profile(self, profile, route):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        name = f'{re.sub(r"[^A-Za-z0-9_.-]", "_", route)}-{time.strftime("%Y%m%dT%H%M%S")}-{os.getpid()}'
+        if isinstance(profile, cProfile.Profile):
+            profile.disable()
+            profile.dump_stats(os.path.join(self.profile_dir, f'{name}.prof'))
+        else:
+            profile.stop()
+            with open(os.path.join(self.profile_dir, f'{name}.html'), 'w', encoding='utf-8') as f:
+                f.write(profile.output_html())
+
+    def snapshot(self):
+        """{route: RouteStats copy} of everything recorded so far"""
+        with self._lock:
+            copies = {}
+            for route, stats in self._routes.items():
+                copy = RouteStats()
+                for field in RouteStats.__slots__:
+                    value = getattr(stats, field)
+                    setattr(copy, field, value.copy() if hasattr(value, 'copy') else value)
+                copies[route] = copy
+            return copies
+
+    def metrics_text(self):
+        """All metrics in the Prometheus text exposition format"""
+        routes = sorted(self.snapshot().items())
+        p = METRIC_PREFIX
+        lines = [
+            f'# HELP {p}_requests_total Requests handled, by route and status.',
+            f'# TYPE {p}_requests_total counter',
+        ]
+        for route, stats in routes:
+            for status, count in sorted(stats.statuses.items()):
+                lines.append(f'{p}_requests_total{{route="{route}",status="{status}"}} {count}')
+        lines += [
+            f'# HELP {p}_request_duration_seconds Wall time from the request to the last body byte.',
+            f'# TYPE {p}_request_duration_seconds histogram',
+        ]
+        for route, stats in routes:
+            for bound, count in zip(BUCKETS, stats.buckets):
+                lines.append(f'{p}_request_duration_seconds_bucket{{route="{route}",le="{bound}"}} {count}')
+            lines.append(f'{p}_request_duration_seconds_bucket{{route="{route}",le="+Inf"}} {stats.requests}')
+            lines.append(f'{p}_request_duration_seconds_sum{{route="{route}"}} {stats.wall:.6f}')
+            lines.append(f'{p}_request_duration_seconds_count{{route="{route}"}} {stats.requests}')
+        for name, help_text, value in (
+                ('request_cpu_seconds_total', 'CPU time of the serving thread.', lambda s: f'{s.cpu:.6f}'),
+                ('response_bytes_total', 'Response body bytes sent.', lambda s: s.bytes),
+                ('sampled_requests_total', 'Requests timed by phase.', lambda s: s.sampled)):
+            lines += [f'# HELP {p}_{name} {help_text}', f'# TYPE {p}_{name} counter']
+            lines += [f'{p}_{name}{{route="{route}"}} {value(stats)}' for route, stats in routes]
+        lines += [
+            f'# HELP {p}_request_phase_seconds_total Time of sampled requests by phase.',
+            f'# TYPE {p}_request_phase_seconds_total counter',
+        ]
+        for route, stats in routes:
+            for name in PHASES:
+                if name in stats.phases:
+                    lines.append(f'{p}_request_phase_seconds_total{{route="{route}",phase="{name}"}} '
+                                 f'{stats.phases[name]:.6f}')
+        lines += [
+            f'# HELP {p}_requests_in_flight Requests being handled by this process.',
+            f'# TYPE {p}_requests_in_flight gauge',
+            f'{p}_requests_in_flight {self.in_flight}',
+            f'# HELP {p}_process_start_time_seconds Start time of this process since the epoch.',
+            f'# TYPE {p}_process_start_time_seconds gauge',
+            f'{p}_process_start_time_seconds {self.started:.3f}',
+        ]
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,212 @@
+"""
+Receipt extraction with Claude's vision API.
+
+process_receipt_image() sends a receipt photo to the model and returns
+the JSON it reads off the receipt (vendor, date, total, line items, tax).
+It is slow (seconds per image), so uploads never call it directly: they
+queue an 'extract_receipt' task (see taskqueue.py) and a worker fills the
+result into the document afterwards.
+
+Results are cached by image hash and EXTRACTION_VERSION (see
+extraction_cache.py), so retries and re-uploads of the same image skip
+the model call. EXTRACTION_CACHE sets the cache file (default
+instance/extractions.db, outside the upload folder so it is never served)
+or turns the cache off.
+
+The anthropic package is optional; without it (or without
+ANTHROPIC_API_KEY) extraction tasks fail and the document keeps the
+values typed into the upload form.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import re
+import threading
+
+from extraction_cache import DEFAULT_MAX_BYTES, DEFAULT_TTL, ExtractionCache
+from money import to_cents
+from records import COMPLETED, FAILED, Extraction, parse_date
+
+try:
+    import anthropic
+except ImportError:
+    anthropic = None
+
+MODEL = os.environ.get('RECEIPT_MODEL', 'claude-3-haiku-20240307')
+MAX_TOKENS = 1024
+MEDIA_TYPES = {
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.gif': 'image/gif',
+    '.webp': 'image/webp',
+}
+
+PROMPT = '''Extract the data from this receipt. Reply with JSON only, in this shape:
+{"vendor_name": "...", "date": "YYYY-MM-DD", "total_amount": 0.00, "subtotal": 0.00, "tax": 0.00,
+ "items": [{"description": "...", "quantity": 1, "price": 0.00}]}
+Use null for anything you cannot read.'''
+
+# Cached results are only reused for the same model, prompt and token limit
+EXTRACTION_VERSION = hashlib.sha256(f'{MODEL}\n{MAX_TOKENS}\n{PROMPT}'.encode()).hexdigest()[:16]
+CACHE_PATH = os.environ.get('EXTRACTION_CACHE') or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'instance', 'extractions.db')
+HASH_CHUNK_SIZE = 64 * 1024
+
+_cache = None
+_cache_lock = threading.Lock()
+
+_FENCED = re.compile(r'```(?:json)?\s*(\{.*?\})\s*```', re.DOTALL)
+_OBJECT = re.compile(r'\{.*\}', re.DOTALL)
+
+
+def parse_receipt_text(text):
+    """The JSON object in a model reply (bare, fenced or embedded in prose); None if there is none"""
+    if not text:
+        return None
+    candidates = [text.strip()]
+    candidates += _FENCED.findall(text)
+    candidates += _OBJECT.findall(text)
+    for candidate in candidates:
+        try:
+            data = json.loads(candidate)
+        except ValueError:
+            continue
+        if isinstance(data, dict):
+            return data
+    return None
+
+
+def _block_text(block):
+    return block['text'] if isinstance(block, dict) else getattr(block, 'text', '')
+
+
+def process_receipt_image(path, media_type=None, client=None):
+    """Extracted receipt data (dict) for an image file, or None if the reply had no JSON"""
+    if anthropic is None and client is None:
+        raise RuntimeError('Receipt extraction requires the anthropic package (pip install anthropic)')
+    with open(path, 'rb') as f:
+        data = base64.standard_b64encode(f.read()).decode('ascii')
+    if not media_type or not media_type.startswith('image/'):
+        media_type = MEDIA_TYPES.get(os.path.splitext(path)[1].lower(), 'image/jpeg')
+    client = client or anthropic.Anthropic()
+    response = client.messages.create(
+        model=MODEL,
+        max_tokens=MAX_TOKENS,
+        messages=[{
+            'role': 'user',
+            'content': [
+                {'type': 'image', 'source': {'type': 'base64', 'media_type': media_type, 'data': data}},
+                {'type': 'text', 'text': PROMPT},
+            ],
+        }],
+    )
+    return parse_receipt_text(''.join(_block_text(block) for block in response.content))
+
+
+def extraction_cache():
+    """The shared ExtractionCache, opened on first use; None when EXTRACTION_CACHE=off"""
+    global _cache
+    if CACHE_PATH == 'off':
+        return None
+    with _cache_lock:
+        if _cache is None:
+            os.makedirs(os.path.dirname(os.path.abspath(CACHE_PATH)), exist_ok=True)
+            _cache = ExtractionCache(
+                CACHE_PATH,
+                ttl=int(os.environ.get('EXTRACTION_CACHE_TTL', DEFAULT_TTL)),
+                max_bytes=int(os.environ.get('EXTRACTION_CACHE_BYTES', DEFAULT_MAX_BYTES)),
+            )
+        return _cache
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cents(value):
+    try:
+        return None if value is None else to_cents(value)
+    except ValueError:
+        return None
+
+
+def extraction_result(data):
+    """Normalize extracted receipt data into Document field values (amounts in cents)"""
+    items = []
+    for item in data.get('items') or []:
+        if isinstance(item, dict):
+            items.append({
+                'description': item.get('description'),
+                'quantity': item.get('quantity'),
+                'price_cents': _cents(item.get('price')),
+            })
+    vendor = data.get('vendor_name')
+    return {
+        'vendor': vendor if isinstance(vendor, str) else None,
+        'amount_cents': _cents(data.get('total_amount')),
+        'date': data.get('date'),
+        'line_items': items,
+        'tax_cents': _cents(data.get('tax')),
+        'subtotal_cents': _cents(data.get('subtotal')),
+    }
+
+
+# The 'extract_receipt' task: extract_receipt() does the slow part and may
+# run in another process; save_extraction() writes the result to the ledger.
+
+def extract_receipt(payload):
+    """Run extraction for {'document_id', 'path', 'media_type', 'sha256'}; never raises.
+
+    The model's reply is cached, so the same image is only sent once per
+    EXTRACTION_VERSION; failures are not cached and are retried next time.
+    """
+    try:
+        key = f"{payload.get('sha256') or file_digest(payload['path'])}:{EXTRACTION_VERSION}"
+        cache = extraction_cache()
+        data = cache.get(key) if cache is not None else None
+        if data is None:
+            data = process_receipt_image(payload['path'], payload.get('media_type'))
+            if data is not None and cache is not None:
+                cache.put(key, data)
+    except Exception as e:
+        return {'error': f'{type(e).__name__}: {e}'}
+    if data is None:
+        return {'error': 'No receipt data found in the model reply'}
+    return extraction_result(data)
+
+
+def apply_extraction(doc, result):
+    """A new version of `doc` with the extraction result filled in.
+
+    Values typed into the upload form win; extraction only fills in the
+    vendor, amount and date left empty.
+    """
+    if 'error' in result:
+        return doc.replace(extraction=Extraction(FAILED, error=result['error']))
+    changes = {
+        'extraction': Extraction(COMPLETED, result['line_items'], result['tax_cents'],
+                                 result['subtotal_cents']),
+    }
+    if not doc.vendor and result['vendor']:
+        changes['vendor'] = result['vendor']
+    if not doc.amount_cents and result['amount_cents']:
+        changes['amount_cents'] = result['amount_cents']
+    if doc.date is None and result['date']:
+        try:
+            changes['date'] = parse_date(result['date'])
+        except (TypeError, ValueError):
+            pass  # Unreadable date; leave it for the user
+    return doc.replace(**changes)
+
+
+def save_extraction(store, payload, result):
+    doc = store.get_document(payload['document_id'])
+    if doc is not None:
+        store.update_documents([apply_extraction(doc, result)])
@@ -0,0 +1,174 @@
+"""
+Record types for the ledger.
+
+Documents, jobs and uploaded-file metadata are slotted classes instead of
+dicts: no per-instance __dict__ or repeated string keys, and fields are
+normalized once on the way in (int job ids, integer-cent amounts,
+datetime.date dates), so indexes and aggregations never re-parse them.
+Money can be passed in dollars (`amount=`, `quoted_price=`) or cents
+(`amount_cents=`, `quoted_price_cents=`); only cents are stored.
+"""
+
+from datetime import date, datetime
+
+from money import check_cents, to_cents
+
+DOCUMENT_TYPES = ('income', 'expense')
+# Extraction statuses
+PENDING = 'pending'
+COMPLETED = 'completed'
+FAILED = 'failed'
+
+
+def parse_id(value):
+    """'1', 1 -> 1; '' or None -> None"""
+    if value is None or value == '':
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'Invalid id: {value!r}')
+
+
+def parse_date(value):
+    """'2024-01-10', date or datetime -> date; '' or None -> None"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(value)
+
+
+def _text(value, name):
+    """Optional text field; other types are rejected before they reach the indexes"""
+    if value is None or isinstance(value, str):
+        return value
+    raise ValueError(f'{name} must be text')
+
+
+def _nested(value, record_type, name):
+    """A nested record given as the record or as its dict"""
+    if value is None or isinstance(value, record_type):
+        return value
+    if isinstance(value, dict):
+        return record_type.from_dict(value)
+    raise ValueError(f'{name} must be an object')
+
+
+def _plain(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Record):
+        return value.to_dict()
+    return value
+
+
+class Record:
+    """Common behaviour for the slotted record types"""
+
+    __slots__ = ()
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{field: data[field] for field in cls.__slots__ if field in data})
+
+    def to_dict(self, fields=None):
+        """JSON-friendly dict of `fields` (default: all); dates become ISO strings"""
+        return {field: _plain(getattr(self, field)) for field in fields or self.__slots__}
+
+    def replace(self, **changes):
+        """A new record with some fields changed; the values are normalized as on creation"""
+        values = {field: getattr(self, field) for field in self.__slots__}
+        values.update(changes)
+        return type(self)(**values)
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, f) == getattr(other, f) for f in self.__slots__)
+
+    def __repr__(self):
+        fields = ', '.join(f'{f}={getattr(self, f)!r}' for f in self.__slots__)
+        return f'{type(self).__name__}({fields})'
+
+
+class UploadedFile(Record):
+    """A receipt file stored in the blob store"""
+
+    __slots__ = ('filename', 'size', 'type', 'sha256', 'path')
+
+    def __init__(self, filename=None, size=0, type=None, sha256=None, path=None):
+        self.filename = _text(filename, 'filename')
+        self.size = int(size or 0)
+        self.type = _text(type, 'type')
+        self.sha256 = _text(sha256, 'sha256')
+        self.path = _text(path, 'path')
+
+
+class Extraction(Record):
+    """State and extra output of reading a receipt image in the background.
+
+    status is 'pending', 'completed' or 'failed'; line_items are dicts of
+    description, quantity and price_cents.
+    """
+
+    __slots__ = ('status', 'line_items', 'tax_cents', 'subtotal_cents', 'error')
+
+    def __init__(self, status=PENDING, line_items=None, tax_cents=None, subtotal_cents=None,
+                 error=None):
+        self.status = _text(status, 'status')
+        if not isinstance(line_items, (list, tuple, type(None))):
+            raise ValueError('line_items must be a list')
+        self.line_items = list(line_items or [])
+        self.tax_cents = None if tax_cents is None else check_cents(tax_cents)
+        self.subtotal_cents = None if subtotal_cents is None else check_cents(subtotal_cents)
+        self.error = _text(error, 'error')
+
+
+class Document(Record):
+    """An income or expense entry"""
+
+    __slots__ = ('id', 'type', 'job_id', 'vendor', 'amount_cents', 'date',
+                 'description', 'category', 'file_info', 'extraction')
+
+    def __init__(self, id=None, type=None, job_id=None, vendor=None, amount=None, date=None,
+                 description=None, category=None, file_info=None, amount_cents=None,
+                 extraction=None):
+        self.id = id
+        self.type = _text(type, 'type')
+        self.job_id = parse_id(job_id)
+        self.vendor = _text(vendor, 'vendor')
+        if amount_cents is None:
+            amount_cents = to_cents(amount)
+        self.amount_cents = check_cents(amount_cents)
+        self.date = parse_date(date)
+        self.description = _text(description, 'description')
+        self.category = _text(category, 'category')
+        self.file_info = _nested(file_info, UploadedFile, 'file_info')
+        self.extraction = _nested(extraction, Extraction, 'extraction')
+
+
+class Job(Record):
+    """A customer job with its quote and schedule"""
+
+    __slots__ = ('id', 'number', 'customer', 'description', 'quoted_price_cents', 'status',
+                 'start_date', 'estimated_end', 'progress', 'health', 'notes')
+
+    def __init__(self, id=None, number=None, customer=None, description=None, quoted_price=None,
+                 status=None, start_date=None, estimated_end=None, progress=0, health=None,
+                 notes=None, quoted_price_cents=None):
+        self.id = id
+        self.number = _text(number, 'number')
+        self.customer = _text(customer, 'customer')
+        self.description = _text(description, 'description')
+        if quoted_price_cents is None:
+            quoted_price_cents = to_cents(quoted_price)
+        self.quoted_price_cents = check_cents(quoted_price_cents)
+        self.status = _text(status, 'status')
+        self.start_date = parse_date(start_date)
+        self.estimated_end = parse_date(estimated_end)
+        self.progress = int(progress or 0)
+        self.health = _text(health, 'health')
+        self.notes = _text(notes, 'notes')
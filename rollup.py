@@ -0,0 +1,97 @@
+"""
+Time-bucketed rollup cube for period metrics.
+
+Each document adds its amount to one cell keyed by (month, job, category,
+type). Cells are grouped by month, so month-over-month changes, trailing
+twelve-month trends and year-to-date totals only touch the cells of the
+months involved, never the documents themselves.
+"""
+
+# Filter value meaning "every job / category / type"
+ANY = object()
+
+
+def shift_month(month, delta):
+    """('2024-01', -1) -> '2023-12'"""
+    index = int(month[:4]) * 12 + int(month[5:7]) - 1 + delta
+    return f'{index // 12:04d}-{index % 12 + 1:02d}'
+
+
+class Cell:
+    """Sum (cents) and document count of one bucket"""
+
+    __slots__ = ('total', 'count')
+
+    def __init__(self, total=0, count=0):
+        self.total = total
+        self.count = count
+
+    def __eq__(self, other):
+        return isinstance(other, Cell) and (self.total, self.count) == (other.total, other.count)
+
+    def __repr__(self):
+        return f'Cell(total={self.total!r}, count={self.count!r})'
+
+
+class RollupCube:
+    """(month, job_id, category, type) -> Cell, updated as documents arrive"""
+
+    def __init__(self):
+        self._months = {}
+
+    def add(self, month, job_id, category, doc_type, cents, count=1):
+        """Add a document to its bucket; count=-1 (with negated cents) takes one out"""
+        if month is None:
+            return  # Undated documents have no period
+        key = (job_id, category, doc_type)
+        cells = self._months.setdefault(month, {})
+        cell = cells.get(key)
+        if cell is None:
+            cell = cells[key] = Cell()
+        cell.total += cents
+        cell.count += count
+        if cell.count == 0:
+            del cells[key]
+            if not cells:
+                del self._months[month]
+
+    def months(self):
+        return sorted(self._months)
+
+    def latest_month(self):
+        return max(self._months) if self._months else None
+
+    def total(self, month, doc_type=ANY, job_id=ANY, category=ANY):
+        """Cell summed over the month's buckets matching the filters"""
+        result = Cell()
+        for (cell_job, cell_category, cell_type), cell in self._months.get(month, {}).items():
+            if ((doc_type is ANY or cell_type == doc_type)
+                    and (job_id is ANY or cell_job == job_id)
+                    and (category is ANY or cell_category == category)):
+                result.total += cell.total
+                result.count += cell.count
+        return result
+
+    def series(self, first, last, doc_type=ANY, **filters):
+        """[(month, cents)] for every month from `first` to `last` inclusive"""
+        months = []
+        month = first
+        while month <= last:
+            months.append((month, self.total(month, doc_type, **filters).total))
+            month = shift_month(month, 1)
+        return months
+
+    def change(self, month, doc_type=ANY, **filters):
+        """(this month, previous month, % change); the change is None without a previous total"""
+        current = self.total(month, doc_type, **filters).total
+        previous = self.total(shift_month(month, -1), doc_type, **filters).total
+        percent = (current - previous) / abs(previous) * 100 if previous else None
+        return current, previous, percent
+
+    def trailing(self, month, doc_type=ANY, count=12, **filters):
+        """Monthly totals for the `count` months ending with `month`"""
+        return self.series(shift_month(month, 1 - count), month, doc_type, **filters)
+
+    def year_to_date(self, month, doc_type=ANY, **filters):
+        """Total from January of `month`'s year through `month`"""
+        return sum(total for _, total in self.series(month[:4] + '-01', month, doc_type, **filters))
@@ -0,0 +1,64 @@
+"""
+Background worker for the Redis task queue.
+
+    TASK_QUEUE=redis://redis:6379 DATABASE_URL=postgresql://... python -m scheduler
+
+Runs queued tasks (receipt extraction) and writes their results to the
+ledger of the task's company (see tenants.py); web workers pick the
+changes up on their next sync. Stops after the current task on SIGTERM
+or SIGINT.
+"""
+
+import argparse
+import logging
+import os
+import signal
+import sys
+import threading
+
+from taskqueue import RedisQueue, open_queue
+from tenants import TenantRouter, parse_shards
+
+log = logging.getLogger('scheduler')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run background tasks from the Redis queue')
+    parser.add_argument('--queue', default=os.environ.get('TASK_QUEUE'),
+                        help='redis:// URL of the task queue (default: $TASK_QUEUE)')
+    parser.add_argument('--database', default=os.environ.get('DATABASE_URL'),
+                        help='database URL (default: $DATABASE_URL)')
+    parser.add_argument('--shards', default=os.environ.get('TENANT_SHARDS'),
+                        help='JSON object of company id to database URL (default: $TENANT_SHARDS)')
+    args = parser.parse_args(argv)
+    if not (args.queue or '').startswith(('redis://', 'rediss://')):
+        parser.error('a redis:// task queue is required (--queue or TASK_QUEUE)')
+    if not args.database:
+        parser.error('a database is required (--database or DATABASE_URL)')
+    try:
+        shards = parse_shards(args.shards)
+    except ValueError as e:
+        parser.error(str(e))
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(levelname)s %(message)s')
+    # Each company's ledger is opened, and synced, by the first task for it
+    tenants = TenantRouter(args.database, shards)
+    task_queue = open_queue(args.queue, tenants)
+    assert isinstance(task_queue, RedisQueue)
+
+    stop = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: stop.set())
+    log.info('Waiting for tasks on %s', task_queue.key)
+    try:
+        task_queue.work(stop)
+    finally:
+        task_queue.close()
+        tenants.close()
+    log.info('Stopped after %d tasks (%d failed)', task_queue.completed + task_queue.failed,
+             task_queue.failed)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
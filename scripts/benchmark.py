@@ -0,0 +1,285 @@
+"""
+Route benchmarks for app.py at production-like ledger sizes.
+
+Seeds the in-memory ledger with generated sample data (see
+generate_sample_data.py) at each requested size, drives the main pages
+through the Flask test client and writes a JSON results file:
+
+    python -m scripts.benchmark --sizes 1000,100000,1000000 --out bench.json
+    python -m scripts.benchmark --sizes 1000 --out new.json --compare bench.json
+
+For every route it records latency percentiles (p50/p95/p99, in ms) over
+--requests requests, the bytes allocated by one request (tracemalloc
+peak, measured in a separate pass because tracing slows everything
+down), and the process's peak RSS afterwards. Cached pages are measured
+cold (response cache cleared before each request) and warm.
+
+--compare prints the change against an earlier results file and exits
+with status 1 when any p50 or p95 regressed by more than --threshold.
+
+Receipt extraction is replaced by a no-op task for the run: uploads never
+call the extraction API, and nothing writes to the ledger in the
+background while requests are being timed.
+"""
+
+import argparse
+import io
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from unittest.mock import patch
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from scripts.generate_sample_data import Settings, generate_chunk
+
+DEFAULT_SIZES = (1000, 100000, 1000000)
+DEFAULT_REQUESTS = 50
+DEFAULT_THRESHOLD = 0.2
+ALLOCATION_REQUESTS = 3
+DOCUMENTS_PER_JOB = 100
+
+# Queued extraction does nothing: no paid API calls, no background ledger writes
+NOOP_TASKS = {'extract_receipt': (lambda payload: None, lambda store, payload, result: None)}
+
+# name: (method, path, whether the page is served through the response cache)
+ROUTES = {
+    'dashboard': ('GET', '/dashboard', True),
+    'reports': ('GET', '/reports', True),
+    'job_detail': ('GET', '/jobs/1', False),
+    'documents_page': ('GET', '/documents', False),
+    'expenses': ('GET', '/expenses', True),
+    'invoices': ('GET', '/invoices', True),
+    'upload': ('GET', '/upload', False),
+    'upload_post': ('POST', '/upload', False),
+}
+
+
+def percentile(samples, p):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def peak_rss():
+    """Peak resident set size of this process in bytes; None where unavailable"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024  # kilobytes on Linux
+
+
+def load_app(upload_folder):
+    """Import app.py with in-memory ledgers, uploads going to `upload_folder` and tasks run inline"""
+    if 'app' not in sys.modules:
+        # seed() replaces the ledger with up to millions of generated rows; never in a real database
+        for name in ('DATABASE_URL', 'TENANT_SHARDS'):
+            os.environ.pop(name, None)
+        os.environ['UPLOAD_FOLDER'] = upload_folder
+        os.environ['TASK_QUEUE'] = 'inline'
+        os.environ['EXTRACTION_CACHE'] = 'off'
+    import app
+    if app.store.backend is not None:
+        raise RuntimeError('app was imported with a database; the benchmark only runs on in-memory ledgers')
+    app.app.config['TESTING'] = True
+    return app
+
+
+def seed(app, documents, seed_value):
+    """Replace the ledger with `documents` generated documents"""
+    settings = Settings(max(1, documents // DOCUMENTS_PER_JOB), documents, seed_value)
+    jobs, docs = [], []
+    for chunk in range(settings.chunks):
+        chunk_jobs, chunk_docs = generate_chunk(settings, chunk)
+        jobs.extend(chunk_jobs)
+        docs.extend(chunk_docs)
+    app.store.clear()
+    app.store.seed(jobs, docs)
+    app.response_cache.clear()
+
+
+class RouteRunner:
+    """Issues one benchmark request for a route"""
+
+    def __init__(self, app, client):
+        self.app = app
+        self.client = client
+        self.uploads = 0
+
+    def request(self, name, cold):
+        # Buffered, so the response is closed as a WSGI server would
+        method, path, _ = ROUTES[name]
+        if cold:
+            self.app.response_cache.clear()
+        if method == 'POST':
+            # A new file every time; identical uploads are deduplicated
+            self.uploads += 1
+            data = {
+                'doc_type': 'expense', 'vendor': 'Benchmark Supply', 'amount': '12.50',
+                'date': '2024-01-21', 'category': 'Materials', 'job_id': '1',
+                'receipt_file': (io.BytesIO(b'receipt %d %f' % (self.uploads, time.time())), 'r.jpg'),
+            }
+            response = self.client.post(path, data=data, content_type='multipart/form-data', buffered=True)
+            expected = 302
+        else:
+            response = self.client.get(path, buffered=True)
+            expected = 200
+        if response.status_code != expected:
+            raise RuntimeError(f'{method} {path} returned {response.status_code}')
+
+
+def measure(runner, name, cold, requests):
+    """Latency percentiles, per-request allocations and peak RSS for one route"""
+    runner.request(name, cold)  # Warm up imports and lazily built state
+    latencies = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        runner.request(name, cold)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    allocations = []
+    tracemalloc.start()
+    try:
+        for _ in range(ALLOCATION_REQUESTS):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            runner.request(name, cold)
+            allocations.append(tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'requests': requests,
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'mean_ms': round(sum(latencies) / len(latencies), 3),
+        'max_ms': round(max(latencies), 3),
+        'alloc_peak_bytes': max(allocations),
+        'peak_rss_bytes': peak_rss(),
+    }
+
+
+def run(sizes=DEFAULT_SIZES, requests=DEFAULT_REQUESTS, routes=None, seed_value=0, upload_folder=None):
+    """Benchmark results for each ledger size, as a JSON-friendly dict"""
+    app = load_app(upload_folder or os.path.join(tempfile.gettempdir(), 'profit-tracker-benchmark'))
+    import taskqueue  # Not at the top: receipt_processor reads its settings when first imported
+    with patch.dict(taskqueue.TASKS, NOOP_TASKS):
+        try:
+            return _run(app, sizes, requests, routes, seed_value)
+        finally:
+            if hasattr(app.task_queue, 'join'):
+                # app was imported before us with a background queue; drain it while the no-op is in place
+                app.task_queue.join()
+
+
+def _run(app, sizes, requests, routes, seed_value):
+    client = app.app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'admin123'}, buffered=True)
+    runner = RouteRunner(app, client)
+    results = {
+        'meta': {
+            'started': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'requests': requests,
+            'seed': seed_value,
+        },
+        'sizes': {},
+    }
+    for size in sizes:
+        started = time.perf_counter()
+        seed(app, size, seed_value)
+        size_result = {
+            'documents': app.store.document_count(),
+            'jobs': app.store.job_count(),
+            'seed_seconds': round(time.perf_counter() - started, 2),
+            'peak_rss_bytes': peak_rss(),
+            'routes': {},
+        }
+        for name in routes or ROUTES:
+            cached = ROUTES[name][2]
+            size_result['routes'][name] = measure(runner, name, cached, requests)
+            if cached:
+                size_result['routes'][f'{name}_warm'] = measure(runner, name, False, requests)
+        results['sizes'][str(size)] = size_result
+    return results
+
+
+def compare(baseline, current):
+    """[(size, route, metric, before, after, change)] for the latencies both runs measured.
+
+    change is the relative difference, e.g. 0.25 for 25% slower.
+    """
+    rows = []
+    for size, result in current['sizes'].items():
+        before_routes = baseline.get('sizes', {}).get(size, {}).get('routes', {})
+        for route, metrics in result['routes'].items():
+            before = before_routes.get(route)
+            if before is None:
+                continue
+            for metric in ('p50_ms', 'p95_ms'):
+                if before[metric]:
+                    change = metrics[metric] / before[metric] - 1
+                    rows.append((size, route, metric, before[metric], metrics[metric], change))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark app.py routes at several ledger sizes')
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help='comma-separated document counts')
+    parser.add_argument('--requests', type=int, default=DEFAULT_REQUESTS, help='timed requests per route')
+    parser.add_argument('--routes', help=f'comma-separated subset of: {", ".join(ROUTES)}')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help='write results to this JSON file (default: stdout)')
+    parser.add_argument('--compare', metavar='BASELINE', help='results file to compare against')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='relative slowdown reported as a regression (default: 0.2)')
+    args = parser.parse_args(argv)
+
+    try:
+        sizes = [int(size) for size in args.sizes.split(',')]
+    except ValueError:
+        parser.error('--sizes must be comma-separated integers')
+    routes = args.routes.split(',') if args.routes else None
+    unknown = [name for name in routes or () if name not in ROUTES]
+    if unknown:
+        parser.error(f'unknown routes: {", ".join(unknown)}')
+    if args.requests < 1:
+        parser.error('--requests must be positive')
+
+    results = run(sizes, args.requests, routes, args.seed)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    if not args.compare:
+        return 0
+    with open(args.compare, encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressed = False
+    for size, route, metric, before, after, change in compare(baseline, results):
+        flag = ''
+        if change > args.threshold:
+            flag = '  REGRESSION'
+            regressed = True
+        print(f'{size:>8} {route:<20} {metric:<7} {before:>10.3f} -> {after:>10.3f} ms  {change:+7.1%}{flag}',
+              file=sys.stderr)
+    return 1 if regressed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,31 +1,67 @@
 """
-Sample data generator for testing the profit tracking dashboard.
-Generates realistic jobs with various profit margins and receipts.
+Sample data generator for load testing the profit tracking dashboard.
+
+Generates realistic jobs with various profit margins, their deposits and
+final payments, and expense receipts, at any scale:
+
+    python -m scripts.generate_sample_data --jobs 100000 --documents 10000000 \\
+        --database sqlite:///instance/ledger.db --workers 8
+    python -m scripts.generate_sample_data --jobs 20 --documents 100 --ndjson fixtures/
+    python -m scripts.generate_sample_data --jobs 100 --documents 5000 --company acme
+
+Work is split into chunks of jobs that worker processes generate
+independently. Each chunk draws from its own generator seeded with
+(seed, chunk number), and ids are derived from the job number, so the
+output depends only on the settings and the seed, never on the number
+of workers. Rows are written with the storage backends' bulk inserts,
+one transaction per batch, keeping their ids, so re-running the same
+settings against a database skips the rows that are already there. A
+database holding other rows (e.g. the app's sample data, or another
+seed's) is refused, since generated documents would attach to unrelated
+jobs; the counts reported under "inserted" are the rows actually written.
+
+--company writes to that company's ledger, found the way the app finds
+it (its TENANT_SHARDS entry, else its part of the database; see
+tenants.py). --ndjson writes jobs.ndjson and documents.ndjson;
+documents.ndjson can be loaded with `python -m importer` or
+POST /api/documents/import.
 """
 
-import random
-from datetime import datetime, timedelta
-from app import app, db
-from models import Job, Receipt, LineItem
+import argparse
 import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+from records import Document, Job
+from tenants import DEFAULT_COMPANY, is_company_id, open_tenant, parse_shards
+
+DEFAULT_SEED = 2024
+DEFAULT_START = '2023-01-01'
+DEFAULT_DAYS = 730
+DEFAULT_BATCH_SIZE = 10000
+CHUNK_JOBS = 1000
 
 # Sample data configurations
 JOB_TYPES = [
-    {'category': 'Plumbing', 'customers': ['Johnson Plumbing', 'Quick Fix Plumbing', 'Davis Water Works', 'Smith Pipe Repair'], 
+    {'category': 'Plumbing', 'customers': ['Johnson Plumbing', 'Quick Fix Plumbing', 'Davis Water Works', 'Smith Pipe Repair'],
      'typical_quote': (500, 5000), 'margin_range': (-20, 35)},
-    {'category': 'Electrical', 'customers': ['Bright Electric', 'PowerUp Solutions', 'Wilson Wiring', 'Lightning Electric'], 
+    {'category': 'Electrical', 'customers': ['Bright Electric', 'PowerUp Solutions', 'Wilson Wiring', 'Lightning Electric'],
      'typical_quote': (800, 8000), 'margin_range': (5, 40)},
-    {'category': 'HVAC', 'customers': ['Cool Air Services', 'Heat & Cool Pro', 'Climate Control Inc', 'Comfort Zone HVAC'], 
+    {'category': 'HVAC', 'customers': ['Cool Air Services', 'Heat & Cool Pro', 'Climate Control Inc', 'Comfort Zone HVAC'],
      'typical_quote': (1500, 12000), 'margin_range': (10, 45)},
-    {'category': 'Roofing', 'customers': ['Top Roof Repairs', 'Shelter Pro Roofing', 'Peak Performance Roofing', 'Sky High Roofing'], 
+    {'category': 'Roofing', 'customers': ['Top Roof Repairs', 'Shelter Pro Roofing', 'Peak Performance Roofing', 'Sky High Roofing'],
      'typical_quote': (3000, 25000), 'margin_range': (15, 50)},
-    {'category': 'General', 'customers': ['ABC Construction', 'BuildRight Co', 'Quality Contractors', 'Premier Building'], 
+    {'category': 'General', 'customers': ['ABC Construction', 'BuildRight Co', 'Quality Contractors', 'Premier Building'],
      'typical_quote': (1000, 10000), 'margin_range': (-10, 30)}
 ]
 
 VENDORS = [
-    'Home Depot', 'Lowes', 'Ferguson', 'Grainger', 'Menards', 
-    'Ace Hardware', 'True Value', 'Local Supply Co', 'ProBuild', 
+    'Home Depot', 'Lowes', 'Ferguson', 'Grainger', 'Menards',
+    'Ace Hardware', 'True Value', 'Local Supply Co', 'ProBuild',
     'Contractor Supply', 'Industrial Supply', 'Wholesale Electric'
 ]
 
@@ -57,107 +93,241 @@ RECEIPT_ITEMS = {
     ]
 }
 
-def generate_sample_data():
-    """Generate sample jobs and receipts"""
-    with app.app_context():
-        print("Generating sample data...")
-        
-        # Start job numbers from 2001 to avoid conflicts with test data
-        job_number = 2001
-        
-        for i in range(20):
-            # Select random job type
-            job_type = random.choice(JOB_TYPES)
-            customer = random.choice(job_type['customers'])
-            
-            # Generate quote
-            quote_min, quote_max = job_type['typical_quote']
-            quoted_price = random.uniform(quote_min, quote_max)
-            
-            # Determine target margin
-            margin_min, margin_max = job_type['margin_range']
-            target_margin = random.uniform(margin_min, margin_max)
-            
-            # Calculate target costs based on margin
-            target_costs = quoted_price * (1 - target_margin / 100)
-            
-            # Create job
-            job = Job(
-                job_number=str(job_number),
-                customer_name=customer,
-                quoted_price=quoted_price,
-                created_at=datetime.now() - timedelta(days=random.randint(1, 60))
-            )
-            db.session.add(job)
-            db.session.commit()
-            
-            # Generate receipts to reach target costs (with some randomness)
-            current_costs = 0
-            receipt_count = random.randint(2, 8)
-            
-            for j in range(receipt_count):
-                # Don't exceed target by too much
-                if current_costs >= target_costs * 1.1:
-                    break
-                
-                # Generate receipt amount
-                avg_receipt = target_costs / receipt_count
-                receipt_total = random.uniform(avg_receipt * 0.5, avg_receipt * 1.5)
-                
-                # Create receipt
-                receipt = Receipt(
-                    image_url=f"sample_{job_number}_{j}.jpg",
-                    vendor=random.choice(VENDORS),
-                    total=receipt_total,
-                    date=(job.created_at + timedelta(days=random.randint(0, 30))).date(),
-                    receipt_number=f"R{random.randint(100000, 999999)}",
-                    job_id=job.id,
-                    uploaded_by="Sample Generator",
-                    upload_method='web',
-                    extracted_data={'sample': True},
-                    created_at=job.created_at + timedelta(days=random.randint(0, 30))
-                )
-                db.session.add(receipt)
-                db.session.commit()
-                
-                # Add line items
-                category = job_type['category']
-                items = random.sample(RECEIPT_ITEMS[category], k=random.randint(1, 4))
-                
-                # Adjust item prices to match receipt total
-                item_total = sum(item[1] for item in items)
-                scale_factor = receipt_total / item_total if item_total > 0 else 1
-                
-                for item_name, base_price in items:
-                    line_item = LineItem(
-                        receipt_id=receipt.id,
-                        description=item_name,
-                        amount=base_price * scale_factor,
-                        category=category
-                    )
-                    db.session.add(line_item)
-                
-                current_costs += receipt_total
-            
-            db.session.commit()
-            
-            # Print job summary
-            actual_margin = ((quoted_price - current_costs) / quoted_price * 100) if quoted_price > 0 else 0
-            print(f"Job #{job_number} - {customer}: Quote ${quoted_price:.2f}, "
-                  f"Costs ${current_costs:.2f}, Margin {actual_margin:.1f}%")
-            
-            job_number += 1
-        
-        print("\nSample data generation complete!")
-        print(f"Created 20 jobs with receipts")
-        
-        # Generate daily summary
-        from analytics import generate_daily_summary
-        summary = generate_daily_summary()
-        print("\n" + "="*50)
-        print("DAILY SUMMARY:")
-        print("="*50)
-        print(summary)
-
-if __name__ == "__main__":
-    generate_sample_data()
\ No newline at end of file
+JOB_STATUSES = ('Quoted', 'In Progress', 'Completed')
+STATUS_WEIGHTS = (1, 3, 6)
+# Document fields written to documents.ndjson (the importer's columns plus id)
+DOCUMENT_KEYS = ('id', 'type', 'job_id', 'vendor', 'amount_cents', 'date', 'description', 'category')
+
+
+class Settings:
+    """What to generate; every worker gets a copy"""
+
+    def __init__(self, jobs, documents, seed=DEFAULT_SEED, start=DEFAULT_START, days=DEFAULT_DAYS,
+                 chunk_jobs=CHUNK_JOBS):
+        self.jobs = jobs
+        self.documents = documents
+        self.seed = seed
+        self.start = date.fromisoformat(start) if isinstance(start, str) else start
+        self.days = days
+        self.chunk_jobs = chunk_jobs
+
+    @property
+    def chunks(self):
+        return (self.jobs + self.chunk_jobs - 1) // self.chunk_jobs
+
+    def job_documents(self, index):
+        """(first document id, document count) for the job at 0-based `index`"""
+        per_job, extra = divmod(self.documents, self.jobs)
+        return index * per_job + min(index, extra) + 1, per_job + (index < extra)
+
+
+def _cents(dollars):
+    return int(round(dollars * 100))
+
+
+def generate_job(settings, rng, index):
+    """A job and its documents: a deposit and final payment, the rest expense receipts"""
+    job_type = rng.choice(JOB_TYPES)
+    category = job_type['category']
+    quoted_price = rng.uniform(*job_type['typical_quote'])
+    target_margin = rng.uniform(*job_type['margin_range'])
+    target_costs = quoted_price * (1 - target_margin / 100)
+    start = settings.start + timedelta(days=rng.randrange(settings.days))
+    duration = rng.randint(7, 60)
+    status = rng.choices(JOB_STATUSES, STATUS_WEIGHTS)[0]
+    job = Job(
+        id=index + 1,
+        number=f'JOB-{start.year}-{index + 1:06d}',
+        customer=rng.choice(job_type['customers']),
+        description=f'{category} job',
+        quoted_price_cents=_cents(quoted_price),
+        status=status,
+        start_date=start,
+        estimated_end=start + timedelta(days=duration),
+        progress={'Quoted': 0, 'Completed': 100}.get(status, rng.randint(5, 95)),
+        health=rng.choices(('healthy', 'warning', 'critical'), (7, 2, 1))[0],
+        notes='Sample data'
+    )
+
+    doc_id, count = settings.job_documents(index)
+    payments = 2 if count >= 2 else 0
+    expenses = count - payments
+    docs = []
+    if payments:
+        deposit = _cents(quoted_price / 2)
+        for amount, offset, description in ((deposit, 0, '50% deposit'),
+                                             (job.quoted_price_cents - deposit, duration, 'Final payment')):
+            docs.append(Document(id=doc_id, type='income', job_id=job.id, vendor=job.customer,
+                                 amount_cents=amount, date=start + timedelta(days=offset),
+                                 description=description, category='Payment'))
+            doc_id += 1
+    for _ in range(expenses):
+        items = rng.sample(RECEIPT_ITEMS[category], k=rng.randint(1, 3))
+        docs.append(Document(
+            id=doc_id, type='expense', job_id=job.id, vendor=rng.choice(VENDORS),
+            amount_cents=_cents(target_costs / expenses * rng.uniform(0.5, 1.5)),
+            date=start + timedelta(days=rng.randint(0, duration)),
+            description=', '.join(name for name, _ in items), category='Materials'
+        ))
+        doc_id += 1
+    return job, docs
+
+
+def generate_chunk(settings, chunk):
+    """(jobs, documents) for one chunk of jobs; the same for the same settings and chunk"""
+    rng = random.Random(f'{settings.seed}-{chunk}')
+    jobs, docs = [], []
+    first = chunk * settings.chunk_jobs
+    for index in range(first, min(first + settings.chunk_jobs, settings.jobs)):
+        job, job_docs = generate_job(settings, rng, index)
+        jobs.append(job)
+        docs.extend(job_docs)
+    return jobs, docs
+
+
+def ndjson(records, keys=None):
+    return ''.join(json.dumps(record.to_dict(keys)) + '\n' for record in records)
+
+
+# Worker process state: settings and the database connection, set up once per process
+_settings = None
+_backend = None
+_batch_size = DEFAULT_BATCH_SIZE
+_emit_ndjson = False
+
+
+def _init_worker(settings, target, batch_size, emit_ndjson):
+    global _settings, _backend, _batch_size, _emit_ndjson
+    _settings = settings
+    _backend = open_tenant(*target)
+    _batch_size = batch_size
+    _emit_ndjson = emit_ndjson
+
+
+def _close_worker():
+    global _backend
+    if _backend is not None:
+        _backend.close()
+        _backend = None
+
+
+def _run_chunk(chunk):
+    """Generate and write one chunk; returns ((jobs, documents) generated, (jobs, documents) inserted, NDJSON)"""
+    jobs, docs = generate_chunk(_settings, chunk)
+    inserted_jobs = inserted_docs = 0
+    if _backend is not None:
+        inserted_jobs = len(_backend.insert_jobs(jobs, keep_ids=True))
+        for start in range(0, len(docs), _batch_size):
+            inserted_docs += len(_backend.insert_documents(docs[start:start + _batch_size], keep_ids=True))
+    text = None
+    if _emit_ndjson:
+        text = (ndjson(jobs), ndjson(docs, DOCUMENT_KEYS))
+    return (len(jobs), len(docs)), (inserted_jobs, inserted_docs), text
+
+
+class TargetError(ValueError):
+    """A database the generated rows cannot be loaded into"""
+
+
+def check_target(backend, settings):
+    """Raise TargetError unless the tables are empty or begin with the rows these settings generate"""
+    jobs, docs = generate_chunk(settings, 0)
+    for name, stored, generated in (('jobs', backend.load_jobs(limit=1), jobs),
+                                    ('documents', backend.load_documents(limit=1), docs)):
+        if stored and stored[0] not in generated:
+            raise TargetError(f'The {name} table holds rows these settings did not generate '
+                             f'(id {stored[0].id}); load into an empty database')
+
+
+def generate(settings, database=None, ndjson_dir=None, workers=1, batch_size=DEFAULT_BATCH_SIZE,
+             company=DEFAULT_COMPANY, shards=None):
+    """Generate every chunk, writing to `company`'s ledger in `database` and/or NDJSON files; returns counts"""
+    started = time.perf_counter()
+    outputs = None
+    if ndjson_dir:
+        os.makedirs(ndjson_dir, exist_ok=True)
+        outputs = [open(os.path.join(ndjson_dir, name), 'w', encoding='utf-8')
+                   for name in ('jobs.ndjson', 'documents.ndjson')]
+    target = (database, company, shards)
+    init_args = (settings, target, batch_size, outputs is not None)
+    # Create the schema once, before workers race to do it
+    backend = open_tenant(*target)
+    if backend is not None:
+        try:
+            check_target(backend, settings)
+        finally:
+            backend.close()
+    result = {'jobs': 0, 'documents': 0}
+    if backend is not None:
+        result['inserted'] = {'jobs': 0, 'documents': 0}
+    pool = None
+    try:
+        if workers > 1:
+            pool = multiprocessing.Pool(workers, _init_worker, init_args)
+            results = pool.imap(_run_chunk, range(settings.chunks))
+        else:
+            _init_worker(*init_args)
+            results = map(_run_chunk, range(settings.chunks))
+        # imap hands results back in chunk order, so the files come out the same for any worker count
+        for (jobs, docs), (inserted_jobs, inserted_docs), text in results:
+            result['jobs'] += jobs
+            result['documents'] += docs
+            if backend is not None:
+                result['inserted']['jobs'] += inserted_jobs
+                result['inserted']['documents'] += inserted_docs
+            if outputs is not None:
+                for out, part in zip(outputs, text):
+                    out.write(part)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        else:
+            _close_worker()
+        for out in outputs or ():
+            out.close()
+    result['seconds'] = round(time.perf_counter() - started, 2)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate seeded sample jobs and documents in bulk')
+    parser.add_argument('--jobs', type=int, default=20)
+    parser.add_argument('--documents', type=int, default=100, help='total documents across all jobs')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--start', default=DEFAULT_START, help='first job start date (YYYY-MM-DD)')
+    parser.add_argument('--days', type=int, default=DEFAULT_DAYS, help='days over which jobs start')
+    parser.add_argument('--database', default=os.environ.get('DATABASE_URL'),
+                        help='database URL (default: $DATABASE_URL)')
+    parser.add_argument('--company', default=DEFAULT_COMPANY, help=f'company id (default: {DEFAULT_COMPANY})')
+    parser.add_argument('--shards', default=os.environ.get('TENANT_SHARDS'),
+                        help='JSON object of company id to database URL (default: $TENANT_SHARDS)')
+    parser.add_argument('--ndjson', metavar='DIR', help='also write jobs.ndjson and documents.ndjson to DIR')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help='documents per insert transaction')
+    args = parser.parse_args(argv)
+
+    try:
+        shards = parse_shards(args.shards)
+    except ValueError as e:
+        parser.error(str(e))
+    if not is_company_id(args.company):
+        parser.error(f'invalid company id: {args.company!r}')
+    if not (args.database or args.company in shards) and not args.ndjson:
+        parser.error('nothing to write: give --database (or DATABASE_URL) and/or --ndjson')
+    if args.jobs < 1 or args.documents < 0 or args.days < 1 or args.batch_size < 1:
+        parser.error('--jobs, --days and --batch-size must be positive and --documents not negative')
+    settings = Settings(args.jobs, args.documents, args.seed, args.start, args.days)
+    try:
+        result = generate(settings, args.database, args.ndjson, max(1, args.workers), args.batch_size,
+                          args.company, shards)
+    except TargetError as e:
+        parser.error(str(e))
+    json.dump(result, sys.stdout, indent=2)
+    print()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
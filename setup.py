@@ -42,6 +42,9 @@ setup(
             "isort>=5.13.2",
             "flake8>=7.0.0",
         ],
+        "analytics": [
+            "numpy>=1.21",
+        ],
     },
     entry_points={
         "console_scripts": [
@@ -0,0 +1,115 @@
+"""
+Ordered index for the ledger's (date, id) keys.
+
+A plain sorted list costs O(n) per insert, which turns a bulk import of
+back-dated documents into O(n^2). SortedIndex keeps keys in chunks of at
+most 2 * CHUNK_SIZE, so an insert only shifts one chunk, while positional
+reads (pages, ranges) still come back in key order.
+"""
+
+from bisect import bisect_left, bisect_right
+
+CHUNK_SIZE = 1000
+
+
+class SortedIndex:
+    """Values ordered by key, stored as a list of sorted chunks"""
+
+    def __init__(self, chunk_size=CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self._keys = []
+        self._values = []
+        self._maxes = []
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def insert(self, key, value):
+        if not self._keys:
+            self._keys.append([key])
+            self._values.append([value])
+            self._maxes.append(key)
+            self._len = 1
+            return
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            # Past the end: append to the last chunk (the common, chronological case)
+            i -= 1
+            self._keys[i].append(key)
+            self._values[i].append(value)
+        else:
+            keys = self._keys[i]
+            position = bisect_right(keys, key)
+            keys.insert(position, key)
+            self._values[i].insert(position, value)
+        self._maxes[i] = self._keys[i][-1]
+        self._len += 1
+        if len(self._keys[i]) > 2 * self.chunk_size:
+            self._split(i)
+
+    def update(self, items):
+        for key, value in items:
+            self.insert(key, value)
+
+    def remove(self, key):
+        """Remove the entry stored under `key` (keys are unique); KeyError if absent"""
+        i = bisect_left(self._maxes, key)
+        if i < len(self._maxes):
+            keys = self._keys[i]
+            position = bisect_left(keys, key)
+            if position < len(keys) and keys[position] == key:
+                del keys[position]
+                del self._values[i][position]
+                self._len -= 1
+                if keys:
+                    self._maxes[i] = keys[-1]
+                else:
+                    del self._keys[i], self._values[i], self._maxes[i]
+                return
+        raise KeyError(key)
+
+    def _split(self, i):
+        keys, values = self._keys[i], self._values[i]
+        half = len(keys) // 2
+        self._keys[i:i + 1] = [keys[:half], keys[half:]]
+        self._values[i:i + 1] = [values[:half], values[half:]]
+        self._maxes[i:i + 1] = [keys[half - 1], keys[-1]]
+
+    def _offset(self, chunk):
+        return sum(len(keys) for keys in self._keys[:chunk])
+
+    def bisect_left(self, key):
+        """Position of the first key >= `key`"""
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            return self._len
+        return self._offset(i) + bisect_left(self._keys[i], key)
+
+    def bisect_right(self, key):
+        """Position after the last key <= `key`"""
+        i = bisect_right(self._maxes, key)
+        if i == len(self._maxes):
+            return self._len
+        return self._offset(i) + bisect_right(self._keys[i], key)
+
+    def key_at(self, position):
+        for keys in self._keys:
+            if position < len(keys):
+                return keys[position]
+            position -= len(keys)
+        raise IndexError('SortedIndex position out of range')
+
+    def values(self, start=0, stop=None):
+        """Values at positions [start, stop) in ascending key order"""
+        stop = self._len if stop is None else min(stop, self._len)
+        result = []
+        offset = 0
+        for values in self._values:
+            if offset >= stop:
+                break
+            end = offset + len(values)
+            if end > start:
+                result.extend(values[max(start - offset, 0):stop - offset])
+            offset = end
+        return result
@@ -0,0 +1,59 @@
+// Add smooth transitions
+document.addEventListener('DOMContentLoaded', function() {
+    // Animate numbers on load
+    const animateValue = (element, start, end, duration) => {
+        let startTimestamp = null;
+        const step = (timestamp) => {
+            if (!startTimestamp) startTimestamp = timestamp;
+            const progress = Math.min((timestamp - startTimestamp) / duration, 1);
+            element.textContent = '$' + Math.floor(progress * (end - start) + start).toLocaleString();
+            if (progress < 1) {
+                window.requestAnimationFrame(step);
+            }
+        };
+        window.requestAnimationFrame(step);
+    };
+
+    // Animate stat values
+    document.querySelectorAll('.stat-value').forEach(el => {
+        const finalValue = parseInt(el.textContent.replace(/[^0-9]/g, ''));
+        if (!isNaN(finalValue)) {
+            animateValue(el, 0, finalValue, 1000);
+        }
+    });
+});
+
+function showQuickAdd() {
+    const modal = document.getElementById('quickAddModal');
+    modal.style.display = 'flex';
+}
+
+function closeQuickAdd() {
+    const modal = document.getElementById('quickAddModal');
+    modal.style.display = 'none';
+    document.getElementById('quickAddForm').reset();
+}
+
+// Quick Add form submission
+function quickAddSubmit(e) {
+    e.preventDefault();
+    const form = e.target;
+    const formData = new FormData(form);
+
+    fetch('/api/quick-add', {
+        method: 'POST',
+        body: formData
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            closeQuickAdd();
+            window.location.reload();
+        } else {
+            alert('Error: ' + data.message);
+        }
+    })
+    .catch(error => {
+        alert('Error saving entry');
+    });
+}
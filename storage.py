@@ -0,0 +1,443 @@
+"""
+Persistent storage backends for the ledger.
+
+LedgerStore keeps its indexes in memory and writes through to one of
+these backends, then catches up on rows written by other workers with
+an incremental `id > last_seen` read. Updates stamp the row with the
+next value of a per-table `revision` counter, so changed rows are picked
+up the same way with `revision > last_seen`. For that to be safe, ids and
+revisions must become visible in the order they were allocated, so
+writers to a table take turns (SQLite's BEGIN IMMEDIATE, a PostgreSQL
+advisory lock held until commit). Pick a backend with open_storage():
+
+    sqlite:///instance/ledger.db     SQLite (WAL, one connection per thread)
+    postgresql://user:pw@host/db     PostgreSQL (psycopg2 connection pool)
+"""
+
+import json
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+from datetime import date
+
+from records import Document, Job, Record
+
+DOCUMENT_FIELDS = ('id', 'type', 'job_id', 'vendor', 'amount_cents', 'date',
+                   'description', 'category', 'file_info', 'extraction')
+# Nested records stored as JSON text
+JSON_FIELDS = ('file_info', 'extraction')
+JOB_FIELDS = ('id', 'number', 'customer', 'description', 'quoted_price_cents', 'status',
+              'start_date', 'estimated_end', 'progress', 'health', 'notes')
+
+INDEXES = (
+    'CREATE INDEX IF NOT EXISTS ix_documents_job_id ON documents (job_id)',
+    'CREATE INDEX IF NOT EXISTS ix_documents_type ON documents (type)',
+    'CREATE INDEX IF NOT EXISTS ix_documents_date ON documents (date)',
+    'CREATE INDEX IF NOT EXISTS ix_documents_revision ON documents (revision)',
+    'CREATE INDEX IF NOT EXISTS ix_jobs_revision ON jobs (revision)',
+)
+
+
+def _row(record, fields):
+    row = []
+    for field in fields:
+        value = getattr(record, field)
+        if isinstance(value, date):
+            value = value.isoformat()
+        elif isinstance(value, Record):
+            value = json.dumps(value.to_dict())
+        row.append(value)
+    return row
+
+
+def _document_from_row(row):
+    doc = dict(zip(DOCUMENT_FIELDS, row))
+    for field in JSON_FIELDS:
+        if doc[field] is not None:
+            doc[field] = json.loads(doc[field])
+    return Document(**doc)
+
+
+def _job_from_row(row):
+    return Job(**dict(zip(JOB_FIELDS, row)))
+
+
+def _updates(rows, from_row):
+    """[(revision, record)] from (revision, *fields) rows"""
+    return [(row[0], from_row(row[1:])) for row in rows]
+
+
+class Storage:
+    """Interface shared by the storage backends"""
+
+    batch_size = 1000
+
+    def insert_documents(self, docs, keep_ids=False):
+        """Insert documents in one transaction and return their ids.
+
+        With keep_ids the documents' own ids are used and rows that already
+        exist are skipped (only the ids actually inserted are returned);
+        otherwise the database assigns the ids.
+        """
+        raise NotImplementedError
+
+    def insert_jobs(self, jobs, keep_ids=False):
+        raise NotImplementedError
+
+    def update_documents(self, docs):
+        """Overwrite existing documents (by id) in one transaction; returns the ids updated"""
+        raise NotImplementedError
+
+    def update_jobs(self, jobs):
+        raise NotImplementedError
+
+    def load_documents(self, after_id=0, limit=None):
+        """Documents with id > after_id, in id order; at most `limit` of them"""
+        raise NotImplementedError
+
+    def load_jobs(self, after_id=0, limit=None):
+        raise NotImplementedError
+
+    def load_document_updates(self, after_revision=0):
+        """[(revision, document)] for rows updated after `after_revision`, in revision order"""
+        raise NotImplementedError
+
+    def load_job_updates(self, after_revision=0):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SQLiteStorage(Storage):
+    """SQLite backend in WAL mode so readers never block the writer"""
+
+    SCHEMA = (
+        '''CREATE TABLE IF NOT EXISTS documents (
+            id INTEGER PRIMARY KEY,
+            type TEXT,
+            job_id INTEGER,
+            vendor TEXT,
+            amount_cents INTEGER,
+            date TEXT,
+            description TEXT,
+            category TEXT,
+            file_info TEXT,
+            extraction TEXT,
+            revision INTEGER NOT NULL DEFAULT 0
+        )''',
+        '''CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY,
+            number TEXT,
+            customer TEXT,
+            description TEXT,
+            quoted_price_cents INTEGER,
+            status TEXT,
+            start_date TEXT,
+            estimated_end TEXT,
+            progress INTEGER,
+            health TEXT,
+            notes TEXT,
+            revision INTEGER NOT NULL DEFAULT 0
+        )''',
+    ) + INDEXES
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self.transaction() as conn:
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+
+    def connection(self):
+        """One connection per thread; sqlite3 caches its prepared statements"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None,
+                                   check_same_thread=False, cached_statements=256)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        conn = self.connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def _insert(self, table, fields, rows, keep_ids):
+        verb = 'INSERT OR IGNORE' if keep_ids else 'INSERT'
+        sql = f'{verb} INTO {table} ({", ".join(fields)}) VALUES ({", ".join("?" * len(fields))})'
+        inserted = []
+        with self.transaction() as conn:
+            if keep_ids:
+                ids = [r.id for r in rows]
+            else:
+                # BEGIN IMMEDIATE holds the write lock, so ids can be handed out up front
+                # and the whole batch goes through executemany
+                last_id = conn.execute(f'SELECT COALESCE(MAX(id), 0) FROM {table}').fetchone()[0]
+                ids = list(range(last_id + 1, last_id + 1 + len(rows)))
+            for start in range(0, len(rows), self.batch_size):
+                batch = rows[start:start + self.batch_size]
+                params = [_row(r, fields) for r in batch]
+                if keep_ids:
+                    # INSERT OR IGNORE skips these; the write lock keeps the answer valid
+                    existing = {row[0] for row in conn.execute(
+                        f'SELECT id FROM {table} WHERE id BETWEEN ? AND ?',
+                        (min(r.id for r in batch), max(r.id for r in batch)))}
+                    inserted.extend(r.id for r in batch if r.id not in existing)
+                else:
+                    for row, row_id in zip(params, ids[start:start + self.batch_size]):
+                        row[0] = row_id
+                conn.executemany(sql, params)
+        return inserted if keep_ids else ids
+
+    def _update(self, table, fields, rows):
+        assignments = ', '.join(f'{field} = ?' for field in fields[1:])
+        sql = f'UPDATE {table} SET {assignments}, revision = ? WHERE id = ?'
+        updated = []
+        with self.transaction() as conn:
+            # As in _insert, the write lock makes MAX(revision) safe to build on
+            revision = conn.execute(f'SELECT COALESCE(MAX(revision), 0) FROM {table}').fetchone()[0]
+            for record in rows:
+                revision += 1
+                if conn.execute(sql, _row(record, fields)[1:] + [revision, record.id]).rowcount:
+                    updated.append(record.id)
+        return updated
+
+    def insert_documents(self, docs, keep_ids=False):
+        return self._insert('documents', DOCUMENT_FIELDS, docs, keep_ids)
+
+    def insert_jobs(self, jobs, keep_ids=False):
+        return self._insert('jobs', JOB_FIELDS, jobs, keep_ids)
+
+    def update_documents(self, docs):
+        return self._update('documents', DOCUMENT_FIELDS, docs)
+
+    def update_jobs(self, jobs):
+        return self._update('jobs', JOB_FIELDS, jobs)
+
+    def load_documents(self, after_id=0, limit=None):
+        cursor = self.connection().execute(
+            f'SELECT {", ".join(DOCUMENT_FIELDS)} FROM documents WHERE id > ? ORDER BY id LIMIT ?',
+            (after_id, -1 if limit is None else limit))
+        return [_document_from_row(row) for row in cursor]
+
+    def load_jobs(self, after_id=0, limit=None):
+        cursor = self.connection().execute(
+            f'SELECT {", ".join(JOB_FIELDS)} FROM jobs WHERE id > ? ORDER BY id LIMIT ?',
+            (after_id, -1 if limit is None else limit))
+        return [_job_from_row(row) for row in cursor]
+
+    def load_document_updates(self, after_revision=0):
+        cursor = self.connection().execute(
+            f'SELECT revision, {", ".join(DOCUMENT_FIELDS)} FROM documents '
+            'WHERE revision > ? ORDER BY revision', (after_revision,))
+        return _updates(cursor, _document_from_row)
+
+    def load_job_updates(self, after_revision=0):
+        cursor = self.connection().execute(
+            f'SELECT revision, {", ".join(JOB_FIELDS)} FROM jobs WHERE revision > ? ORDER BY revision',
+            (after_revision,))
+        return _updates(cursor, _job_from_row)
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+# One psycopg2 pool per DSN in this process, shared by every schema (company) on that
+# database: {dsn: [pool, number of PostgresStorage objects using it]}
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _acquire_pool(dsn, min_connections, max_connections):
+    import psycopg2.pool
+    with _pools_lock:
+        entry = _pools.get(dsn)
+        if entry is None:
+            entry = _pools[dsn] = [psycopg2.pool.ThreadedConnectionPool(min_connections, max_connections, dsn), 0]
+        entry[1] += 1
+        return entry[0]
+
+
+def _release_pool(dsn):
+    with _pools_lock:
+        entry = _pools[dsn]
+        entry[1] -= 1
+        if entry[1] == 0:
+            del _pools[dsn]
+            entry[0].closeall()
+
+
+class PostgresStorage(Storage):
+    """PostgreSQL backend on a psycopg2 threaded connection pool.
+
+    Storages on the same DSN share one pool. With `schema`, each
+    transaction sets search_path to it, so the tables live in that schema.
+    """
+
+    SCHEMA = (
+        '''CREATE TABLE IF NOT EXISTS documents (
+            id SERIAL PRIMARY KEY,
+            type TEXT,
+            job_id INTEGER,
+            vendor TEXT,
+            amount_cents BIGINT,
+            date TEXT,
+            description TEXT,
+            category TEXT,
+            file_info TEXT,
+            extraction TEXT,
+            revision BIGINT NOT NULL DEFAULT 0
+        )''',
+        '''CREATE TABLE IF NOT EXISTS jobs (
+            id SERIAL PRIMARY KEY,
+            number TEXT,
+            customer TEXT,
+            description TEXT,
+            quoted_price_cents BIGINT,
+            status TEXT,
+            start_date TEXT,
+            estimated_end TEXT,
+            progress INTEGER,
+            health TEXT,
+            notes TEXT,
+            revision BIGINT NOT NULL DEFAULT 0
+        )''',
+        'CREATE SEQUENCE IF NOT EXISTS documents_revision_seq',
+        'CREATE SEQUENCE IF NOT EXISTS jobs_revision_seq',
+    ) + INDEXES
+
+    def __init__(self, dsn, min_connections=1, max_connections=8, schema=None):
+        try:
+            import psycopg2.extras
+            import psycopg2.pool
+        except ImportError:
+            raise RuntimeError('PostgreSQL storage requires psycopg2 (pip install psycopg2-binary)')
+        self._extras = psycopg2.extras
+        self.schema = schema
+        self._pool = _acquire_pool(dsn, min_connections, max_connections)
+        # Released by close(), or when the storage is garbage collected
+        self._release = weakref.finalize(self, _release_pool, dsn)
+        with self.transaction() as cur:
+            if schema:
+                cur.execute(f'CREATE SCHEMA IF NOT EXISTS "{schema}"')
+            for statement in self.SCHEMA:
+                cur.execute(statement)
+
+    @contextmanager
+    def transaction(self):
+        conn = self._pool.getconn()
+        try:
+            with conn:
+                with conn.cursor() as cur:
+                    if self.schema:
+                        # Lasts until commit, so the pooled connection goes back unchanged
+                        cur.execute(f'SET LOCAL search_path TO "{self.schema}"')
+                    yield cur
+        finally:
+            self._pool.putconn(conn)
+
+    @staticmethod
+    def _lock_writes(cur, table):
+        """Hold the table's write lock until commit.
+
+        Sequence values are handed out before commit, so two concurrent
+        writers could commit ids 11 and then 10; a sync between the two
+        would move past 10 and never load it. Writers taking turns keep
+        ids and revisions committed in order.
+        """
+        cur.execute("SELECT pg_advisory_xact_lock(hashtext(current_schema() || '.' || %s))", (table,))
+
+    def _insert(self, table, fields, rows, keep_ids):
+        if not keep_ids:
+            fields = fields[1:]
+        sql = f'INSERT INTO {table} ({", ".join(fields)}) VALUES %s'
+        if keep_ids:
+            sql += ' ON CONFLICT (id) DO NOTHING'
+        sql += ' RETURNING id'
+        ids = []
+        with self.transaction() as cur:
+            self._lock_writes(cur, table)
+            for start in range(0, len(rows), self.batch_size):
+                batch = [_row(r, fields) for r in rows[start:start + self.batch_size]]
+                ids.extend(r[0] for r in self._extras.execute_values(cur, sql, batch, fetch=True))
+            if keep_ids:
+                # ON CONFLICT DO NOTHING returns only the rows inserted.
+                # Explicit ids bypass the sequence; move it past them
+                cur.execute(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                            f"COALESCE((SELECT MAX(id) FROM {table}), 1))")
+        return ids
+
+    def _update(self, table, fields, rows):
+        assignments = ', '.join(f'{field} = %s' for field in fields[1:])
+        sql = (f"UPDATE {table} SET {assignments}, revision = nextval('{table}_revision_seq') "
+               'WHERE id = %s RETURNING id')
+        updated = []
+        with self.transaction() as cur:
+            self._lock_writes(cur, table)
+            for record in rows:
+                cur.execute(sql, _row(record, fields)[1:] + [record.id])
+                updated.extend(row[0] for row in cur.fetchall())
+        return updated
+
+    def insert_documents(self, docs, keep_ids=False):
+        return self._insert('documents', DOCUMENT_FIELDS, docs, keep_ids)
+
+    def insert_jobs(self, jobs, keep_ids=False):
+        return self._insert('jobs', JOB_FIELDS, jobs, keep_ids)
+
+    def update_documents(self, docs):
+        return self._update('documents', DOCUMENT_FIELDS, docs)
+
+    def update_jobs(self, jobs):
+        return self._update('jobs', JOB_FIELDS, jobs)
+
+    def load_documents(self, after_id=0, limit=None):
+        with self.transaction() as cur:
+            cur.execute(f'SELECT {", ".join(DOCUMENT_FIELDS)} FROM documents WHERE id > %s ORDER BY id LIMIT %s',
+                        (after_id, limit))
+            return [_document_from_row(row) for row in cur.fetchall()]
+
+    def load_jobs(self, after_id=0, limit=None):
+        with self.transaction() as cur:
+            cur.execute(f'SELECT {", ".join(JOB_FIELDS)} FROM jobs WHERE id > %s ORDER BY id LIMIT %s',
+                        (after_id, limit))
+            return [_job_from_row(row) for row in cur.fetchall()]
+
+    def load_document_updates(self, after_revision=0):
+        with self.transaction() as cur:
+            cur.execute(f'SELECT revision, {", ".join(DOCUMENT_FIELDS)} FROM documents '
+                        'WHERE revision > %s ORDER BY revision', (after_revision,))
+            return _updates(cur.fetchall(), _document_from_row)
+
+    def load_job_updates(self, after_revision=0):
+        with self.transaction() as cur:
+            cur.execute(f'SELECT revision, {", ".join(JOB_FIELDS)} FROM jobs '
+                        'WHERE revision > %s ORDER BY revision', (after_revision,))
+            return _updates(cur.fetchall(), _job_from_row)
+
+    def close(self):
+        self._release()
+
+
+def open_storage(url):
+    """Backend for a database URL, or None to keep the ledger in memory only"""
+    if not url:
+        return None
+    if url.startswith('sqlite:///'):
+        return SQLiteStorage(url[len('sqlite:///'):])
+    if url.startswith(('postgres://', 'postgresql://')):
+        return PostgresStorage(url)
+    raise ValueError(f'Unsupported database URL: {url}')
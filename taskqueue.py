@@ -0,0 +1,262 @@
+"""
+Background task queues.
+
+Slow work (receipt extraction) is queued by name with a JSON-friendly
+payload instead of running inside a request. Each task is a pair of
+functions in TASKS: `run(payload) -> result` does the slow part and may
+run in another process; `apply(store, payload, result)` writes the
+result to the ledger in a process that has one.
+
+Pick a backend with open_queue(), like storage.open_storage():
+
+    inline                run on submit, in the caller (tests, scripts)
+    thread, thread://4    worker threads in the web process (default)
+    process, process://4  a process pool; results applied in the web process
+    redis://host:6379/0   a Redis list drained by `python -m scheduler`
+
+With Redis the worker writes results to the database (DATABASE_URL) and
+web workers pick them up on their next sync. A task the worker cannot
+start, e.g. because the database is unreachable, is logged, counted as
+failed and re-queued, up to MAX_ATTEMPTS times.
+
+The store may be a tenants.TenantRouter; results then go to the ledger
+of the payload's `company`.
+"""
+
+import json
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import receipt_processor
+from tenants import DEFAULT_COMPANY, TenantRouter
+
+log = logging.getLogger(__name__)
+
+TASKS = {
+    'extract_receipt': (receipt_processor.extract_receipt, receipt_processor.save_extraction),
+}
+
+DEFAULT_WORKERS = 2
+REDIS_KEY = 'profit-tracker:tasks'
+# A Redis task that cannot run (e.g. the database is down) is re-queued this many times in all
+MAX_ATTEMPTS = 3
+RETRY_DELAY = 1.0
+
+
+class TaskQueue:
+    """Interface shared by the queue backends"""
+
+    def __init__(self, store):
+        self.store = store
+        self.completed = 0
+        self.failed = 0
+        self._counts = threading.Lock()
+
+    def submit(self, name, payload):
+        """Queue task `name`; returns without waiting for it to run"""
+        raise NotImplementedError
+
+    def depth(self):
+        """Tasks submitted but not finished yet"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def store_for(self, payload):
+        """Ledger a task's result is written to"""
+        if isinstance(self.store, TenantRouter):
+            return self.store.store_for(payload.get('company', DEFAULT_COMPANY))
+        return self.store
+
+    def run_task(self, name, payload):
+        run, _ = TASKS[name]
+        try:
+            result = run(payload)
+        except Exception:
+            log.exception('Task %s failed', name)
+            self._count(False)
+            return
+        self.apply_result(name, payload, result)
+
+    def apply_result(self, name, payload, result):
+        _, apply = TASKS[name]
+        try:
+            apply(self.store_for(payload), payload, result)
+        except Exception:
+            log.exception('Saving the result of task %s failed', name)
+            self._count(False)
+            return
+        self._count(True)
+
+    def _count(self, ok):
+        with self._counts:
+            if ok:
+                self.completed += 1
+            else:
+                self.failed += 1
+
+
+class InlineQueue(TaskQueue):
+    """Runs each task as it is submitted; a synchronous stand-in for tests"""
+
+    def submit(self, name, payload):
+        if name not in TASKS:
+            raise KeyError(f'Unknown task: {name}')
+        self.run_task(name, payload)
+
+    def depth(self):
+        return 0
+
+
+class ThreadQueue(TaskQueue):
+    """Worker threads in this process draining an in-memory queue"""
+
+    def __init__(self, store, workers=DEFAULT_WORKERS):
+        super().__init__(store)
+        self._queue = queue.Queue()
+        self._threads = [threading.Thread(target=self._work, name=f'task-worker-{n}', daemon=True)
+                         for n in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, name, payload):
+        if name not in TASKS:
+            raise KeyError(f'Unknown task: {name}')
+        self._queue.put((name, payload))
+
+    def depth(self):
+        return self._queue.unfinished_tasks
+
+    def join(self):
+        """Wait until every submitted task has finished"""
+        self._queue.join()
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self.run_task(*item)
+            finally:
+                self._queue.task_done()
+
+    def close(self):
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+
+class ProcessQueue(TaskQueue):
+    """A process pool runs the slow part; results are applied back in this process"""
+
+    def __init__(self, store, workers=DEFAULT_WORKERS):
+        super().__init__(store)
+        self._pool = ProcessPoolExecutor(workers)
+        self._pending = 0
+
+    def submit(self, name, payload):
+        run, _ = TASKS[name]
+        with self._counts:
+            self._pending += 1
+        future = self._pool.submit(run, payload)
+        future.add_done_callback(lambda done: self._finished(name, payload, done))
+
+    def _finished(self, name, payload, future):
+        try:
+            if future.exception() is not None:
+                log.error('Task %s failed: %s', name, future.exception())
+                self._count(False)
+            else:
+                self.apply_result(name, payload, future.result())
+        finally:
+            with self._counts:
+                self._pending -= 1
+
+    def depth(self):
+        return self._pending
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
+
+class RedisQueue(TaskQueue):
+    """A Redis list shared by every web worker and drained by `python -m scheduler`"""
+
+    def __init__(self, store, url, key=REDIS_KEY):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('The Redis task queue requires redis (pip install redis)')
+        super().__init__(store)
+        self.key = key
+        self._redis = redis.Redis.from_url(url)
+
+    def submit(self, name, payload):
+        if name not in TASKS:
+            raise KeyError(f'Unknown task: {name}')
+        self._redis.rpush(self.key, json.dumps({'name': name, 'payload': payload}))
+
+    def depth(self):
+        return self._redis.llen(self.key)
+
+    def work(self, stop=None, timeout=5):
+        """Run queued tasks until `stop` (a threading.Event) is set"""
+        while stop is None or not stop.is_set():
+            item = self._redis.blpop([self.key], timeout=timeout)
+            if item is None:
+                continue
+            if not self.handle(item[1]):
+                # Give the database a moment before trying the next task
+                if stop is not None:
+                    stop.wait(RETRY_DELAY)
+                else:
+                    time.sleep(RETRY_DELAY)
+
+    def handle(self, raw):
+        """Run one task popped off the list; False if it failed before running and was re-queued or dropped"""
+        task = json.loads(raw)
+        name = task.get('name')
+        if name not in TASKS:
+            log.error('Dropping unknown task %r', name)
+            return True
+        try:
+            # Pick up the rows the web workers wrote before queueing the task
+            self.store_for(task['payload']).sync()
+            self.run_task(name, task['payload'])
+        except Exception:
+            self._count(False)
+            attempts = task.get('attempts', 0) + 1
+            if attempts < MAX_ATTEMPTS:
+                log.exception('Task %s could not run (attempt %d of %d); re-queued', name, attempts, MAX_ATTEMPTS)
+                self._redis.rpush(self.key, json.dumps(dict(task, attempts=attempts)))
+            else:
+                log.exception('Task %s could not run after %d attempts; dropped', name, attempts)
+            return False
+        return True
+
+    def close(self):
+        self._redis.close()
+
+
+def _workers(url, scheme):
+    rest = url[len(scheme):].lstrip(':/')
+    return int(rest) if rest else DEFAULT_WORKERS
+
+
+def open_queue(url, store):
+    """Task queue for a TASK_QUEUE setting; worker threads when unset"""
+    if not url or url.startswith('thread'):
+        return ThreadQueue(store, _workers(url or '', 'thread'))
+    if url == 'inline':
+        return InlineQueue(store)
+    if url.startswith('process'):
+        return ProcessQueue(store, _workers(url, 'process'))
+    if url.startswith(('redis://', 'rediss://')):
+        return RedisQueue(store, url)
+    raise ValueError(f'Unsupported task queue: {url}')
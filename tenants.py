@@ -0,0 +1,165 @@
+"""
+Per-company (tenant) ledgers.
+
+Every company gets its own LedgerStore, with its own indexes, rollups,
+version and database tables. A request only ever touches the ledger of
+the logged-in user's company, so its cost depends on that company's size
+and not on the size of the whole install.
+
+TenantRouter maps a company id to its store and opens it on first use.
+The database URL decides where each company's rows live:
+
+    (unset)                               in memory, one ledger per company
+    sqlite:///data/ledger.db              the default company in ledger.db,
+                                          others in ledger-<company>.db
+    sqlite:///data/tenants/{company}.db   one file per company
+    postgresql://host/db                  the default company in the public
+                                          schema, others in schema tenant_<company>
+    postgresql://host/{company}           one database per company
+
+Individual companies can be placed on another shard with TENANT_SHARDS,
+a JSON object of company id to database URL:
+
+    TENANT_SHARDS='{"acme": "postgresql://big-host/ledger"}'
+
+Companies on one PostgreSQL database share a single connection pool per
+process. At most TENANT_MAX_OPEN database-backed ledgers stay open; the
+least recently used one is dropped to make room and reloaded from the
+database when its company is next seen. In-memory ledgers are never
+dropped, as they would lose their rows.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from ledger import LedgerStore
+from storage import PostgresStorage, open_storage
+
+DEFAULT_COMPANY = 'default'
+MAX_COMPANY_ID = 40
+COMPANY_PLACEHOLDER = '{company}'
+SCHEMA_PREFIX = 'tenant_'
+DEFAULT_MAX_OPEN = 100
+
+_COMPANY_ID = re.compile(r'[a-z0-9_]+')
+
+
+def company_id(name):
+    """Company id for a name: lowercase letters, digits and underscores, safe in file and schema names"""
+    slug = re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_')[:MAX_COMPANY_ID]
+    return slug or 'c_' + hashlib.sha1(name.encode('utf-8')).hexdigest()[:12]
+
+
+def is_company_id(value):
+    return (isinstance(value, str) and len(value) <= MAX_COMPANY_ID
+            and _COMPANY_ID.fullmatch(value) is not None)
+
+
+def parse_shards(text):
+    """{company: database URL} from a TENANT_SHARDS setting"""
+    if not text:
+        return {}
+    shards = json.loads(text)
+    if not isinstance(shards, dict):
+        raise ValueError('TENANT_SHARDS must be a JSON object of company id to database URL')
+    for company in shards:
+        if not is_company_id(company):
+            raise ValueError(f'Invalid company id in TENANT_SHARDS: {company!r}')
+    return shards
+
+
+def open_shard(url, company, dedicated=False):
+    """Storage backend holding `company`'s ledger under `url`; None keeps it in memory.
+
+    A dedicated URL (from TENANT_SHARDS) holds only this company and is used as it is.
+    """
+    if not url:
+        return None
+    if COMPANY_PLACEHOLDER in url:
+        url = url.replace(COMPANY_PLACEHOLDER, company)
+    elif company != DEFAULT_COMPANY and not dedicated:
+        if url.startswith('sqlite:///'):
+            root, ext = os.path.splitext(url)
+            url = f'{root}-{company}{ext}'
+        elif url.startswith(('postgres://', 'postgresql://')):
+            return PostgresStorage(url, schema=SCHEMA_PREFIX + company)
+        else:
+            raise ValueError(f'Unsupported database URL: {url}')
+    if url.startswith('sqlite:///'):
+        directory = os.path.dirname(url[len('sqlite:///'):])
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+    return open_storage(url)
+
+
+def open_tenant(url, company, shards=None):
+    """Storage backend for `company`: its TENANT_SHARDS entry if it has one, else its part of `url`"""
+    if not is_company_id(company):
+        raise ValueError(f'Invalid company id: {company!r}')
+    if shards and company in shards:
+        return open_shard(shards[company], company, dedicated=True)
+    return open_shard(url, company)
+
+
+class TenantRouter:
+    """Company id -> that company's LedgerStore, opened on first use.
+
+    Keeps at most `max_open` database-backed stores, least recently used first out.
+    """
+
+    def __init__(self, url=None, shards=None, max_open=None):
+        self.url = url
+        self.shards = dict(shards or {})
+        if max_open is None:
+            max_open = int(os.environ.get('TENANT_MAX_OPEN', DEFAULT_MAX_OPEN))
+        self.max_open = max_open
+        self._stores = OrderedDict()
+        self._lock = threading.Lock()
+        self._opening = {}  # Company id -> lock held while its store is being opened
+
+    def store_for(self, company=DEFAULT_COMPANY):
+        with self._lock:
+            store = self._stores.get(company)
+            if store is not None:
+                self._stores.move_to_end(company)
+                return store
+        if not is_company_id(company):
+            raise ValueError(f'Invalid company id: {company!r}')
+        with self._lock:
+            opening = self._opening.setdefault(company, threading.Lock())
+        # Opening runs DDL and loads the ledger; only lookups of this company wait for it
+        with opening:
+            with self._lock:
+                store = self._stores.get(company)
+            if store is None:
+                store = LedgerStore(open_tenant(self.url, company, self.shards))
+                with self._lock:
+                    self._stores[company] = store
+                    self._evict()
+                    self._opening.pop(company, None)
+        return store
+
+    def _evict(self):
+        """Drop the least recently used database-backed stores beyond max_open.
+
+        Requests and tasks still holding a dropped store finish with it; its
+        backend is released once the last of them lets go.
+        """
+        open_stores = [company for company, store in self._stores.items() if store.backend is not None]
+        for company in open_stores[:max(0, len(open_stores) - self.max_open)]:
+            del self._stores[company]
+
+    def companies(self):
+        """Ids of the companies whose ledgers are open in this process"""
+        return sorted(self._stores)
+
+    def close(self):
+        with self._lock:
+            for store in self._stores.values():
+                if store.backend is not None:
+                    store.backend.close()
+            self._stores.clear()
@@ -0,0 +1,86 @@
+"""Test the columnar analytics table and period breakdowns."""
+import unittest
+from datetime import date
+import analytics
+from ledger import LedgerStore
+from records import Document
+
+DOCS = [
+    ('expense', 1, 100.0, '2024-01-10', 'Materials'),
+    ('expense', 1, 50.0, '2024-01-20', 'Labor'),
+    ('expense', None, 25.0, '2024-02-03', 'Materials'),
+    ('income', 1, 400.0, '2024-02-05', 'Payment'),
+    ('expense', 2, 10.0, '2024-03-01', 'Other'),
+]
+
+
+def make_store(with_table):
+    """Build a store, optionally forcing the pure-Python path."""
+    store = LedgerStore()
+    if not with_table:
+        store.table = None
+    for doc_type, job_id, amount, day, category in DOCS:
+        store.add_document(Document(type=doc_type, job_id=job_id, vendor='V', amount=amount,
+                                    date=day, category=category))
+    return store
+
+
+class TestPeriodBreakdown(unittest.TestCase):
+    """Test breakdowns from the date-ordered index."""
+
+    def setUp(self):
+        """Set up a store without the columnar table."""
+        self.store = make_store(with_table=False)
+
+    def test_breakdowns(self):
+        """Test each grouping over the whole ledger and a date range."""
+        self.assertEqual(self.store.period_breakdown('expense'),
+                         {'Materials': 12500, 'Labor': 5000, 'Other': 1000})
+        self.assertEqual(self.store.period_breakdown('expense', 'month'),
+                         {'2024-01': 15000, '2024-02': 2500, '2024-03': 1000})
+        self.assertEqual(self.store.period_breakdown('expense', 'job'), {1: 15000, None: 2500, 2: 1000})
+        self.assertEqual(self.store.period_breakdown('expense', 'day', '2024-01-20', '2024-02-03'),
+                         {'2024-01-20': 5000, '2024-02-03': 2500})
+
+    def test_documents_between(self):
+        """Test the inclusive date range slice."""
+        self.assertEqual([d.date for d in self.store.documents_between('2024-02-01', '2024-02-05')],
+                         [date(2024, 2, 3), date(2024, 2, 5)])
+
+
+@unittest.skipUnless(analytics.available(), 'numpy not installed')
+class TestDocumentTable(unittest.TestCase):
+    """Test the vectorized table agrees with the index walk."""
+
+    def test_matches_python_path(self):
+        """Test every grouping and range gives the same answer."""
+        vectorized = make_store(with_table=True)
+        python = make_store(with_table=False)
+        for by in ('category', 'month', 'day', 'job'):
+            for start, end in ((None, None), ('2024-01-15', None), (None, '2024-02-04')):
+                self.assertEqual(vectorized.period_breakdown('expense', by, start, end),
+                                 python.period_breakdown('expense', by, start, end))
+
+    def test_updates_overwrite_rows(self):
+        """Test an updated document replaces its row rather than adding one."""
+        vectorized = make_store(with_table=True)
+        python = make_store(with_table=False)
+        for store in (vectorized, python):
+            doc = store.get_document(1)
+            store.update_documents([doc.replace(amount_cents=999, date='2024-03-15', category='Tools')])
+        self.assertEqual(vectorized.table.size, len(DOCS))
+        for by in ('category', 'month', 'job'):
+            self.assertEqual(vectorized.period_breakdown('expense', by),
+                             python.period_breakdown('expense', by))
+
+    def test_grows_past_capacity(self):
+        """Test appends beyond the initial capacity keep earlier rows."""
+        table = analytics.DocumentTable(capacity=2)
+        for day in range(1, 6):
+            table.append(Document(type='income', amount=day, date=f'2024-01-0{day}', category='Payment'))
+        self.assertEqual(table.size, 5)
+        self.assertEqual(table.breakdown('income', 'month'), {'2024-01': 1500})
+
+
+if __name__ == '__main__':
+    unittest.main()
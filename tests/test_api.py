@@ -0,0 +1,187 @@
+"""Test the JSON API request helpers and routes."""
+import io
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# Before app is imported, as its blob store reads UPLOAD_FOLDER
+if 'app' not in sys.modules:
+    os.environ.setdefault('UPLOAD_FOLDER', tempfile.mkdtemp(prefix='api-uploads-'))
+import app
+import taskqueue
+from api import ApiError, batch_items, new_records, paginate, parse_fields, updated_records
+from receipt_processor import save_extraction
+from records import Document, Job
+
+EXTRACTED = {'vendor': 'Home Depot', 'amount_cents': 15678, 'date': '2024-01-15',
+             'line_items': [], 'tax_cents': 1234, 'subtotal_cents': 14444}
+
+
+class TestApiHelpers(unittest.TestCase):
+    """Test fieldsets, pagination and batch validation."""
+
+    def test_parse_fields(self):
+        """Test sparse fieldsets accept record fields only."""
+        self.assertIsNone(parse_fields('', Job))
+        self.assertEqual(parse_fields('id, number', Job), ('id', 'number'))
+        self.assertEqual(Job(id=1, number='J').to_dict(('id', 'number')), {'id': 1, 'number': 'J'})
+        with self.assertRaises(ApiError):
+            parse_fields('id,vendor', Job)
+
+    def test_paginate(self):
+        """Test page slicing, metadata and the per_page cap."""
+        items, meta = paginate(list(range(45)), '3', '20')
+        self.assertEqual(items, list(range(40, 45)))
+        self.assertEqual(meta, {'page': 3, 'per_page': 20, 'total': 45, 'pages': 3})
+        self.assertEqual(paginate(list(range(45)), None, '9999')[1]['per_page'], 500)
+        with self.assertRaises(ApiError):
+            paginate([], 'x')
+
+    def test_batch_items(self):
+        """Test bodies may be one object or a bounded array of objects."""
+        self.assertEqual(batch_items({'a': 1}), ([{'a': 1}], False))
+        self.assertEqual(batch_items([{'a': 1}]), ([{'a': 1}], True))
+        for body in ([], 'x', [{'a': 1}, 2]):
+            with self.assertRaises(ApiError):
+                batch_items(body)
+
+    def test_new_records(self):
+        """Test aliases, dollar amounts and per-item errors."""
+        job, = new_records(Job, [{'job_number': 'JOB-1', 'customer_name': 'Ann', 'revenue': '1,500'}])
+        self.assertEqual((job.number, job.customer, job.quoted_price_cents), ('JOB-1', 'Ann', 150000))
+        doc, = new_records(Document, [{'type': 'expense', 'total_amount': 12.34, 'job_id': '1'}], {1})
+        self.assertEqual((doc.amount_cents, doc.job_id), (1234, 1))
+        for item in ({'type': 'refund'}, {'type': 'expense', 'job_id': 9},
+                     {'type': 'expense', 'date': 'soon'}, {'type': 'expense', 'id': 5}):
+            with self.assertRaises(ApiError) as raised:
+                new_records(Document, [{'type': 'income'}, item], {1})
+            self.assertEqual(raised.exception.index, 1)
+
+    def test_updated_records(self):
+        """Test updates build new records and report missing ids as 404."""
+        stored = {1: Document(id=1, type='expense', vendor='A', amount=5)}
+        doc, = updated_records([{'id': 1, 'amount': 7}], stored.get)
+        self.assertEqual((doc.id, doc.vendor, doc.amount_cents), (1, 'A', 700))
+        self.assertEqual(stored[1].amount_cents, 500)
+        with self.assertRaises(ApiError) as raised:
+            updated_records([{'id': 2}], stored.get)
+        self.assertEqual(raised.exception.status, 404)
+
+    def test_read_only_fields(self):
+        """Test ids, receipt files and extraction results cannot be set."""
+        stored = {1: Document(id=1, type='expense')}
+        for field in ('id', 'file_info', 'extraction'):
+            with self.assertRaises(ApiError) as raised:
+                new_records(Document, [{'type': 'expense', field: {'sha256': 'ab'}}])
+            self.assertIn('Read-only field', str(raised.exception))
+            with self.assertRaises(ApiError):
+                updated_records([{field: 'x'}], stored.get, ids=[1])
+
+
+class TestApiRoutes(unittest.TestCase):
+    """Test the /api routes end to end on a company of their own."""
+
+    def setUp(self):
+        """Set up a logged-in client on an empty company ledger."""
+        app.users['api-tester'] = 'pw'
+        app.user_companies['api-tester'] = 'api_tests'
+        self.addCleanup(app.users.pop, 'api-tester', None)
+        self.addCleanup(app.user_companies.pop, 'api-tester', None)
+        self.store = app.tenants.store_for('api_tests')
+        self.store.clear()
+        self.client = app.app.test_client()
+        self.client.post('/login', data={'username': 'api-tester', 'password': 'pw'}, buffered=True)
+
+    def get(self, path):
+        return self.client.get(path, buffered=True)
+
+    def post(self, path, body):
+        return self.client.post(path, json=body, buffered=True)
+
+    def test_requires_login(self):
+        """Test the API answers 401 without a session."""
+        client = app.app.test_client()
+        for path in ('/api/jobs', '/api/receipts/1', '/api/documents'):
+            self.assertEqual(client.get(path, buffered=True).status_code, 401)
+        self.assertEqual(client.post('/api/receipts', json={'type': 'expense'}, buffered=True).status_code, 401)
+
+    def test_jobs(self):
+        """Test creating, listing, fetching and updating jobs."""
+        response = self.post('/api/jobs', [{'job_number': 'JOB-1', 'revenue': '1,000'}, {'number': 'JOB-2'}])
+        self.assertEqual(response.status_code, 201)
+        first, second = response.json['jobs']
+        self.assertEqual(first['quoted_price_cents'], 100000)
+
+        listing = self.get('/api/jobs?fields=id,number&per_page=1&page=2').json
+        self.assertEqual(listing['jobs'], [{'id': second['id'], 'number': 'JOB-2'}])
+        self.assertEqual((listing['total'], listing['pages']), (2, 2))
+        self.assertEqual(self.get(f'/api/jobs/{first["id"]}').json['job']['number'], 'JOB-1')
+        self.assertEqual(self.get('/api/jobs/999').status_code, 404)
+
+        updated = self.post(f'/api/jobs/{first["id"]}/update', {'status': 'Completed'}).json['job']
+        self.assertEqual(updated['status'], 'Completed')
+        batch = self.post('/api/jobs/update', [{'id': second['id'], 'progress': 50}]).json['jobs']
+        self.assertEqual(batch[0]['progress'], 50)
+        self.assertEqual(self.post('/api/jobs/update', [{'id': 999}]).status_code, 404)
+
+    def test_receipts(self):
+        """Test creating, fetching and updating receipts, and cursor pages of documents."""
+        job = self.post('/api/jobs', {'number': 'JOB-1'}).json['job']
+        response = self.post('/api/receipts', [
+            {'type': 'expense', 'vendor_name': 'Lowes', 'amount': '12.50', 'date': '2024-01-02', 'job_id': job['id']},
+            {'type': 'income', 'amount_cents': 5000, 'date': '2024-01-03'},
+        ])
+        self.assertEqual(response.status_code, 201)
+        expense, income = response.json['receipts']
+        self.assertEqual(self.get(f'/api/receipts/{expense["id"]}?fields=vendor').json['receipt'],
+                         {'vendor': 'Lowes'})
+        updated = self.post(f'/api/receipts/{expense["id"]}/update', {'amount': 20}).json['receipt']
+        self.assertEqual(updated['amount_cents'], 2000)
+        self.assertEqual(self.store.totals().net_profit, 3000)
+
+        page = self.get('/api/documents?limit=1').json
+        self.assertEqual(len(page['documents']), 1)
+        rest = self.get(f'/api/documents?limit=5&cursor={page["next_cursor"]}').json
+        self.assertEqual(len(rest['documents']), 1)
+        self.assertIsNone(rest['next_cursor'])
+
+    def test_invalid_writes_change_nothing(self):
+        """Test rejected items, including server-owned fields, leave the ledger untouched."""
+        doc = self.post('/api/receipts', {'type': 'expense', 'amount': '1'}).json['receipt']
+        version = self.store.version()
+        for body in ({'type': 'expense', 'amount': '1', 'file_info': 'x'},
+                     {'type': 'expense', 'file_info': {'sha256': 'a' * 64, 'filename': 'stolen.jpg'}},
+                     {'type': 'expense', 'extraction': {'status': 'completed'}},
+                     {'type': 'expense', 'vendor': {'name': 'A'}},
+                     {'type': 'expense', 'amount': '1e20'},
+                     {'type': 'expense', 'amount_cents': 2 ** 63},
+                     [{'type': 'expense'}, {'type': 'refund'}],
+                     {'type': 'expense', 'job_id': 42}):
+            response = self.post('/api/receipts', body)
+            self.assertEqual(response.status_code, 400, body)
+        self.assertEqual(response.json['error'], 'Unknown job_id 42')
+        self.assertEqual(self.post('/api/receipts', [{'type': 'expense'}, {'type': 'refund'}]).json['index'], 1)
+        response = self.post(f'/api/receipts/{doc["id"]}/update', {'file_info': {'sha256': 'a' * 64}})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.post('/api/receipts', 'not an object').status_code, 400)
+        self.assertEqual((self.store.document_count(), self.store.version()), (1, version))
+        self.assertIsNone(self.store.get_document(doc['id']).file_info)
+
+    def test_upload(self):
+        """Test a receipt upload is accepted and extracted in the background."""
+        with patch.dict(taskqueue.TASKS, {'extract_receipt': (lambda payload: EXTRACTED, save_extraction)}):
+            response = self.client.post('/api/upload', buffered=True, content_type='multipart/form-data', data={
+                'image': (io.BytesIO(b'api receipt %d' % os.getpid()), 'receipt.jpg', 'image/jpeg')})
+            if hasattr(app.task_queue, 'join'):
+                app.task_queue.join()
+        self.assertEqual(response.status_code, 202)
+        receipt = self.get(f'/api/receipts/{response.json["receipt_id"]}').json['receipt']
+        self.assertEqual((receipt['vendor'], receipt['extraction']['status']), ('Home Depot', 'completed'))
+        no_image = self.client.post('/api/upload', data={}, buffered=True)
+        self.assertEqual(no_image.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+"""Test the route benchmark harness."""
+import tempfile
+import unittest
+from unittest.mock import patch
+import pytest
+from scripts.benchmark import ROUTES, compare, load_app, percentile, run
+from tenants import DEFAULT_COMPANY
+
+
+class TestBenchmarkHelpers(unittest.TestCase):
+    """Test percentiles and run comparison."""
+
+    def test_percentile(self):
+        """Test nearest-rank percentiles."""
+        samples = list(range(1, 101))
+        self.assertEqual(percentile(samples, 50), 50)
+        self.assertEqual(percentile(samples, 95), 95)
+        self.assertEqual(percentile(samples, 99), 99)
+        self.assertEqual(percentile([7], 99), 7)
+
+    def test_compare(self):
+        """Test relative latency changes for routes both runs measured."""
+        baseline = {'sizes': {'1000': {'routes': {'dashboard': {'p50_ms': 2.0, 'p95_ms': 4.0}}}}}
+        current = {'sizes': {'1000': {'routes': {
+            'dashboard': {'p50_ms': 3.0, 'p95_ms': 4.0},
+            'reports': {'p50_ms': 1.0, 'p95_ms': 1.0},
+        }}}}
+        self.assertEqual(compare(baseline, current), [
+            ('1000', 'dashboard', 'p50_ms', 2.0, 3.0, 0.5),
+            ('1000', 'dashboard', 'p95_ms', 4.0, 4.0, 0.0),
+        ])
+
+
+class TestLoadApp(unittest.TestCase):
+    """Test the benchmark only ever seeds in-memory ledgers."""
+
+    def test_refuses_a_database(self):
+        """Test loading stops when the ledger is backed by a database."""
+        # Kept: the app's blob store keeps using the folder it was first imported with
+        upload_folder = tempfile.mkdtemp(prefix='benchmark-uploads-')
+        app = load_app(upload_folder)
+        self.assertIsNone(app.store.backend)
+        with patch.object(app.tenants.store_for(DEFAULT_COMPANY), 'backend', object()):
+            with self.assertRaises(RuntimeError):
+                load_app(upload_folder)
+
+
+@pytest.mark.slow
+class TestBenchmarkRun(unittest.TestCase):
+    """Run the benchmark at the smallest size."""
+
+    def test_run(self):
+        """Test every route is measured with percentiles, allocations and RSS."""
+        results = run(sizes=[1000], requests=3)
+        size = results['sizes']['1000']
+        self.assertEqual(size['documents'], 1000)
+        for name, (_, _, cached) in ROUTES.items():
+            metrics = size['routes'][name]
+            self.assertLessEqual(metrics['p50_ms'], metrics['p95_ms'])
+            self.assertLessEqual(metrics['p95_ms'], metrics['p99_ms'])
+            self.assertGreater(metrics['alloc_peak_bytes'], 0)
+            self.assertEqual(f'{name}_warm' in size['routes'], cached)
+
+
+if __name__ == '__main__':
+    unittest.main()
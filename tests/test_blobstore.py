@@ -0,0 +1,77 @@
+"""Test the content-addressed receipt blob store."""
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from blobstore import BlobStore, is_digest
+from ledger import LedgerStore
+from records import Document, UploadedFile
+
+
+class ChunkRecorder(io.BytesIO):
+    """BytesIO that records the size of every read."""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.reads = []
+
+    def read(self, size=-1):
+        self.reads.append(size)
+        return super().read(size)
+
+
+class TestBlobStore(unittest.TestCase):
+    """Test streaming uploads into the blob store."""
+
+    def setUp(self):
+        """Set up a store in a temp directory."""
+        self.root = tempfile.mkdtemp()
+        self.blobs = BlobStore(self.root, chunk_size=1024)
+
+    def tearDown(self):
+        """Remove the store."""
+        shutil.rmtree(self.root)
+
+    def test_put_stream(self):
+        """Test the file is hashed and sized while streaming in chunks."""
+        data = os.urandom(10 * 1024 + 7)
+        stream = ChunkRecorder(data)
+        digest, size, created = self.blobs.put_stream(stream)
+        self.assertEqual(digest, hashlib.sha256(data).hexdigest())
+        self.assertEqual(size, len(data))
+        self.assertTrue(created)
+        self.assertTrue(all(n == 1024 for n in stream.reads))
+        with open(self.blobs.path(digest), 'rb') as f:
+            self.assertEqual(f.read(), data)
+        self.assertEqual(self.blobs.relative_path(digest), os.path.join(digest[:2], digest[2:4], digest))
+
+    def test_identical_content_stored_once(self):
+        """Test the same bytes are deduplicated onto one blob."""
+        first = self.blobs.put_stream(io.BytesIO(b'receipt'))
+        second = self.blobs.put_stream(io.BytesIO(b'receipt'))
+        self.assertEqual(first.digest, second.digest)
+        self.assertTrue(first.created)
+        self.assertFalse(second.created)
+        self.assertEqual(os.listdir(os.path.join(self.root, 'tmp')), [])
+
+    def test_ledger_refcount(self):
+        """Test documents backed by a blob are counted by the ledger."""
+        digest = self.blobs.put_stream(io.BytesIO(b'receipt')).digest
+        store = LedgerStore()
+        self.assertEqual(store.blob_refcount(digest), 0)
+        store.add_document(Document(type='expense', vendor='A', amount=1, date='2024-01-01',
+                                    category='Other', file_info=UploadedFile(sha256=digest)))
+        self.assertEqual(store.blob_refcount(digest), 1)
+        self.assertEqual(store.documents_with_blob(digest)[0].id, 1)
+
+    def test_is_digest(self):
+        """Test only full lowercase SHA-256 hex digests are accepted."""
+        self.assertTrue(is_digest('a' * 64))
+        self.assertFalse(is_digest('../etc/passwd'))
+        self.assertFalse(is_digest(None))
+
+
+if __name__ == '__main__':
+    unittest.main()
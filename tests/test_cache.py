@@ -0,0 +1,59 @@
+"""Test the rendered-page cache."""
+import unittest
+from cache import ResponseCache
+from ledger import LedgerStore
+from records import Document, Job
+
+
+class TestResponseCache(unittest.TestCase):
+    """Test versioned lookups and size-bounded LRU eviction."""
+
+    def test_version_mismatch_misses(self):
+        """Test entries rendered at an older ledger version are dropped."""
+        cache = ResponseCache()
+        entry = cache.put(('admin', '/dashboard?'), 1, b'<html>1</html>')
+        self.assertIs(cache.get(('admin', '/dashboard?'), 1), entry)
+        self.assertIsNone(cache.get(('admin', '/dashboard?'), 2))
+        self.assertEqual(len(cache), 0)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_etag_follows_content(self):
+        """Test identical bodies share an ETag and different ones do not."""
+        cache = ResponseCache()
+        first = cache.put('a', 1, b'same')
+        self.assertEqual(cache.put('b', 2, b'same').etag, first.etag)
+        self.assertNotEqual(cache.put('c', 1, b'other').etag, first.etag)
+
+    def test_lru_eviction_by_size(self):
+        """Test the least recently used pages go first once over the byte cap."""
+        cache = ResponseCache(max_bytes=10)
+        cache.put('a', 1, b'aaaa')
+        cache.put('b', 1, b'bbbb')
+        cache.get('a', 1)
+        cache.put('c', 1, b'cccc')
+        self.assertIsNone(cache.get('b', 1))
+        self.assertIsNotNone(cache.get('a', 1))
+        self.assertEqual(cache.size, 8)
+        cache.put('huge', 1, b'x' * 11)
+        self.assertEqual(len(cache), 2)
+
+
+class TestLedgerVersion(unittest.TestCase):
+    """Test every ledger change bumps the version."""
+
+    def test_writes_bump_version(self):
+        """Test documents, jobs and clears each change the version."""
+        store = LedgerStore()
+        versions = [store.version()]
+        store.add_document(Document(type='income', amount=1, date='2024-01-01'))
+        versions.append(store.version())
+        store.add_job(Job(number='JOB-1'))
+        versions.append(store.version())
+        store.clear()
+        versions.append(store.version())
+        self.assertEqual(len(set(versions)), 4)
+        self.assertEqual(versions, sorted(versions))
+
+
+if __name__ == '__main__':
+    unittest.main()
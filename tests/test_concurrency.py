@@ -0,0 +1,93 @@
+"""Test the readers-writer lock and concurrent ledger access."""
+import threading
+import unittest
+from concurrency import ReadWriteLock
+from ledger import LedgerStore
+from records import Document
+
+
+class TestReadWriteLock(unittest.TestCase):
+    """Test reader/writer exclusion rules."""
+
+    def setUp(self):
+        """Set up a fresh lock."""
+        self.lock = ReadWriteLock()
+
+    def test_readers_share(self):
+        """Test two threads can hold the read lock together."""
+        inside = threading.Barrier(2, timeout=5)
+
+        def reader():
+            with self.lock.read():
+                inside.wait()
+
+        threads = [threading.Thread(target=reader) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def test_writer_excludes_readers(self):
+        """Test a reader waits until the writer releases."""
+        events = []
+        self.lock.acquire_write()
+        reader = threading.Thread(target=lambda: (self.lock.acquire_read(), events.append('read'),
+                                                  self.lock.release_read()))
+        reader.start()
+        reader.join(0.1)
+        events.append('write done')
+        self.lock.release_write()
+        reader.join()
+        self.assertEqual(events, ['write done', 'read'])
+
+    def test_reentrant(self):
+        """Test nested reads, nested writes and reads under a write."""
+        with self.lock.read():
+            with self.lock.read():
+                pass
+        with self.lock.write():
+            with self.lock.write():
+                with self.lock.read():
+                    pass
+        with self.lock.write():
+            pass
+
+    def test_upgrade_refused(self):
+        """Test taking the write lock while reading raises instead of deadlocking."""
+        with self.lock.read():
+            with self.assertRaises(RuntimeError):
+                self.lock.acquire_write()
+
+
+class TestConcurrentLedger(unittest.TestCase):
+    """Test the ledger under concurrent writers and readers."""
+
+    def test_totals_consistent(self):
+        """Test every snapshot read sees revenue and count move together."""
+        store = LedgerStore()
+        errors = []
+
+        def writer():
+            for _ in range(500):
+                store.add_document(Document(type='income', vendor='A', amount=2,
+                                            date='2024-01-01', category='Payment'))
+
+        def reader():
+            for _ in range(500):
+                totals = store.totals()
+                if totals.revenue != totals.income_count * 200:
+                    errors.append(totals.revenue)
+
+        threads = [threading.Thread(target=writer) for _ in range(4)]
+        threads += [threading.Thread(target=reader) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(store.document_count(), 2000)
+        self.assertEqual(len({d.id for d in store.recent_documents()}), 2000)
+
+
+if __name__ == '__main__':
+    unittest.main()
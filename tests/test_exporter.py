@@ -0,0 +1,66 @@
+"""Test streaming exports."""
+import csv
+import gzip
+import io
+import unittest
+from exporter import (DOCUMENT_COLUMNS, csv_chunks, document_rows, gzip_chunks, iter_documents,
+                      report_rows)
+from ledger import LedgerStore
+from records import Document, Job
+
+
+class TestExporter(unittest.TestCase):
+    """Test filtered document walks and chunked encodings."""
+
+    def setUp(self):
+        """Set up a ledger with two jobs and documents over two months."""
+        self.store = LedgerStore()
+        self.store.add_job(Job(number='JOB-1', quoted_price=1000))
+        self.store.add_job(Job(number='JOB-2', quoted_price=1000))
+        for day, doc_type, amount, job_id, category in [
+                ('2024-01-03', 'income', 500, 1, 'Payment'),
+                ('2024-01-03', 'expense', 100, 1, 'Materials'),
+                ('2024-01-20', 'expense', 50, 2, None),
+                ('2024-02-01', 'income', 300, 2, 'Payment'),
+                ('2024-02-10', 'expense', 25.5, 1, 'Materials')]:
+            self.store.add_document(Document(type=doc_type, amount=amount, date=day,
+                                             job_id=job_id, category=category))
+
+    def test_iter_documents_filters_across_batches(self):
+        """Test date, job and category filters hold across keyset batches."""
+        docs = list(iter_documents(self.store, batch_size=2))
+        self.assertEqual([d.id for d in docs], [1, 2, 3, 4, 5])
+        docs = iter_documents(self.store, start='2024-01-04', end='2024-02-01', batch_size=1)
+        self.assertEqual([d.id for d in docs], [3, 4])
+        docs = iter_documents(self.store, job_id=1, category='Materials', batch_size=2)
+        self.assertEqual([d.id for d in docs], [2, 5])
+        docs = iter_documents(self.store, category='Other')
+        self.assertEqual([d.id for d in docs], [3])
+
+    def test_csv_chunks(self):
+        """Test small chunks reassemble into the full CSV with the header first."""
+        chunks = list(csv_chunks(DOCUMENT_COLUMNS, document_rows(self.store), chunk_size=64))
+        self.assertGreater(len(chunks), 2)
+        rows = list(csv.reader(io.StringIO(b''.join(chunks).decode())))
+        self.assertEqual(rows[0], list(DOCUMENT_COLUMNS))
+        self.assertEqual(rows[5][:5], ['5', '2024-02-10', 'expense', '', '25.50'])
+        self.assertEqual(rows[5][7], 'JOB-1')
+
+    def test_gzip_chunks(self):
+        """Test the compressed stream decompresses to the original bytes."""
+        data = [b'a,b\n' * 1000, b'', b'c,d\n' * 10]
+        self.assertEqual(gzip.decompress(b''.join(gzip_chunks(iter(data)))), b''.join(data))
+
+    def test_report_period(self):
+        """Test a dated report only counts documents in the range."""
+        rows = {row[1]: row for row in report_rows(self.store, start='2024-02-01')}
+        self.assertEqual(str(rows['JOB-1'][5]), '0.00')
+        self.assertEqual(str(rows['JOB-1'][6]), '25.50')
+        self.assertEqual(str(rows['JOB-2'][5]), '300.00')
+        rows = list(report_rows(self.store, job_id=1))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(str(rows[0][7]), '374.50')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+"""Test the persistent extraction result cache."""
+import os
+import shutil
+import tempfile
+import unittest
+from extraction_cache import ExtractionCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestExtractionCache(unittest.TestCase):
+    """Test lookups, expiry and size-bounded eviction."""
+
+    def setUp(self):
+        """Set up a throwaway cache file and a controllable clock."""
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'extractions.db')
+        self.clock = FakeClock()
+
+    def tearDown(self):
+        """Remove the cache file."""
+        shutil.rmtree(self.tmpdir)
+
+    def test_get_and_persist(self):
+        """Test results survive a reopen and hits and misses are counted."""
+        cache = ExtractionCache(self.path, clock=self.clock)
+        self.assertIsNone(cache.get('abc:v1'))
+        cache.put('abc:v1', {'vendor_name': 'Home Depot', 'total_amount': 156.78})
+        self.assertEqual(cache.get('abc:v1')['vendor_name'], 'Home Depot')
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        cache.close()
+
+        reopened = ExtractionCache(self.path, clock=self.clock)
+        self.assertEqual(reopened.get('abc:v1')['total_amount'], 156.78)
+        self.assertIsNone(reopened.get('abc:v2'))
+
+    def test_ttl(self):
+        """Test entries expire ttl seconds after they were stored."""
+        cache = ExtractionCache(self.path, ttl=60, clock=self.clock)
+        cache.put('a', {'n': 1})
+        self.clock.now += 59
+        self.assertIsNotNone(cache.get('a'))
+        self.clock.now += 1
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(len(cache), 0)
+
+    def test_evicts_least_recently_used(self):
+        """Test the size cap evicts the least recently used entries first."""
+        cache = ExtractionCache(self.path, max_bytes=60, clock=self.clock)
+        for key in 'abc':
+            self.clock.now += 1
+            cache.put(key, {'text': 'x' * 8})  # 20 bytes of JSON each
+        self.clock.now += 1
+        cache.get('a')
+        self.clock.now += 1
+        cache.put('d', {'text': 'x' * 8})
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual([key for key in 'acd' if cache.get(key)], ['a', 'c', 'd'])
+        cache.put('huge', {'text': 'x' * 100})
+        self.assertIsNone(cache.get('huge'))
+        self.assertEqual(len(cache), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+"""Test the bulk sample data generator."""
+import os
+import shutil
+import tempfile
+import unittest
+from ledger import LedgerStore
+from records import Document
+from scripts.generate_sample_data import Settings, TargetError, generate, generate_chunk
+from storage import SQLiteStorage
+
+
+class TestGenerateSampleData(unittest.TestCase):
+    """Test seeded, chunked generation and bulk loading."""
+
+    def setUp(self):
+        """Set up a throwaway output directory."""
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Remove the output directory."""
+        shutil.rmtree(self.tmpdir)
+
+    def read(self, name):
+        with open(os.path.join(self.tmpdir, name), encoding='utf-8') as f:
+            return f.read()
+
+    def test_counts_and_ids(self):
+        """Test documents are spread over the jobs with contiguous ids."""
+        settings = Settings(jobs=25, documents=103, chunk_jobs=10)
+        self.assertEqual(settings.chunks, 3)
+        jobs, docs = [], []
+        for chunk in range(settings.chunks):
+            chunk_jobs, chunk_docs = generate_chunk(settings, chunk)
+            jobs += chunk_jobs
+            docs += chunk_docs
+        self.assertEqual([job.id for job in jobs], list(range(1, 26)))
+        self.assertEqual([doc.id for doc in docs], list(range(1, 104)))
+        self.assertEqual({doc.job_id for doc in docs}, set(range(1, 26)))
+        for job in jobs:
+            income = sum(d.amount_cents for d in docs if d.job_id == job.id and d.type == 'income')
+            self.assertEqual(income, job.quoted_price_cents)
+
+    def test_seeded_output(self):
+        """Test the same seed gives the same rows and another seed does not."""
+        settings = Settings(jobs=5, documents=20, seed=7)
+        self.assertEqual(generate_chunk(settings, 0), generate_chunk(Settings(5, 20, seed=7), 0))
+        self.assertNotEqual(generate_chunk(settings, 0), generate_chunk(Settings(5, 20, seed=8), 0))
+
+    def test_database_and_ndjson(self):
+        """Test a load into SQLite matches the NDJSON fixtures and can be re-run."""
+        database = 'sqlite:///' + os.path.join(self.tmpdir, 'ledger.db')
+        settings = Settings(jobs=12, documents=60, chunk_jobs=5)
+        result = generate(settings, database, self.tmpdir, batch_size=7)
+        self.assertEqual((result['jobs'], result['documents']), (12, 60))
+        self.assertEqual(result['inserted'], {'jobs': 12, 'documents': 60})
+        self.assertEqual(len(self.read('documents.ndjson').splitlines()), 60)
+        self.assertEqual(len(self.read('jobs.ndjson').splitlines()), 12)
+
+        self.assertEqual(generate(settings, database)['inserted'], {'jobs': 0, 'documents': 0})
+        store = LedgerStore(SQLiteStorage(os.path.join(self.tmpdir, 'ledger.db')))
+        store.sync()
+        self.assertEqual(store.document_count(), 60)
+        self.assertEqual(len(store.all_jobs()), 12)
+        self.assertEqual(store.totals().revenue, sum(job.quoted_price_cents for job in store.all_jobs()))
+
+
+    def test_refuses_other_rows(self):
+        """Test a database holding other data or another seed's rows is left alone."""
+        path = os.path.join(self.tmpdir, 'ledger.db')
+        database = 'sqlite:///' + path
+        generate(Settings(jobs=3, documents=9, seed=1), database)
+        with self.assertRaises(TargetError):
+            generate(Settings(jobs=3, documents=9, seed=2), database)
+
+        other = 'sqlite:///' + os.path.join(self.tmpdir, 'other.db')
+        store = LedgerStore(SQLiteStorage(os.path.join(self.tmpdir, 'other.db')))
+        store.add_document(Document(type='expense', amount=5))
+        with self.assertRaises(TargetError):
+            generate(Settings(jobs=3, documents=9), other)
+        self.assertEqual(len(SQLiteStorage(path).load_documents()), 9)
+        self.assertEqual(len(SQLiteStorage(os.path.join(self.tmpdir, 'other.db')).load_jobs()), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
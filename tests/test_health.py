@@ -0,0 +1,91 @@
+"""Test the liveness and readiness endpoints."""
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+if 'app' not in sys.modules:
+    os.environ.setdefault('UPLOAD_FOLDER', tempfile.mkdtemp(prefix='health-uploads-'))
+import app
+
+
+class TestHealth(unittest.TestCase):
+    """Test probes report store, queue and request saturation."""
+
+    def setUp(self):
+        """Set up a test client once background tasks from other tests are done."""
+        self.client = app.app.test_client()
+        if hasattr(app.task_queue, 'join'):
+            app.task_queue.join()
+
+    def get(self, path):
+        return self.client.get(path, buffered=True)
+
+    def test_liveness(self):
+        """Test liveness answers without touching the ledger."""
+        for path in ('/health', '/health/live'):
+            response = self.get(path)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json['status'], 'healthy')
+
+    def test_readiness(self):
+        """Test readiness reports the store, task queue and thread usage."""
+        response = self.get('/health/ready')
+        self.assertEqual(response.status_code, 200)
+        body = response.json
+        self.assertEqual(body['status'], 'ready')
+        self.assertEqual(body['store']['documents'], app.store.document_count())
+        self.assertIsNotNone(body['store']['last_write'])
+        self.assertEqual(body['task_queue']['depth'], 0)
+        self.assertEqual(body['requests'], {'in_flight': 0, 'threads': app.WEB_THREADS, 'saturation': 0.0})
+
+    def test_saturated(self):
+        """Test readiness fails once real requests hold every thread but the probe's."""
+        entered, release = threading.Semaphore(0), threading.Event()
+
+        def blocking_view():
+            entered.release()
+            release.wait(10)
+            return 'done'
+
+        def busy_request():
+            app.app.test_client().get('/health', buffered=True)
+
+        with patch.object(app, 'WEB_THREADS', 3), patch.dict(app.app.view_functions, {'health': blocking_view}):
+            threads = [threading.Thread(target=busy_request) for _ in range(2)]
+            try:
+                threads[0].start()
+                entered.acquire()
+                response = self.get('/health/ready')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json['requests']['saturation'], 0.5)
+
+                threads[1].start()
+                entered.acquire()
+                response = self.get('/health/ready')
+            finally:
+                release.set()
+                for thread in threads:
+                    if thread.is_alive():
+                        thread.join()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json['status'], 'saturated')
+        self.assertEqual(response.json['requests'], {'in_flight': 2, 'threads': 3, 'saturation': 1.0})
+        self.assertEqual(response.headers['Retry-After'], '1')
+
+    def test_database_down(self):
+        """Test readiness fails, and liveness does not, when syncing fails."""
+        def broken_sync():
+            raise OSError('database is down')
+        original, app.store.sync = app.store.sync, broken_sync
+        try:
+            self.assertEqual(self.get('/health/ready').status_code, 503)
+            self.assertEqual(self.get('/health/live').status_code, 200)
+        finally:
+            app.store.sync = original
+
+
+if __name__ == '__main__':
+    unittest.main()
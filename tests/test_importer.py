@@ -0,0 +1,107 @@
+"""Test bulk document import and the batch write path of the ledger."""
+import io
+import random
+import unittest
+from datetime import date
+from importer import DOCUMENT_TYPES, import_documents, iter_lines, read_rows
+from ledger import LedgerStore, date_key
+from records import Document
+from sortedindex import SortedIndex
+
+
+CSV = (
+    'type,date,amount,vendor,category,job_id\n'
+    'expense,2024-01-05,12.50,Home Depot,Materials,1\n'
+    'refund,2024-01-06,3,,,\n'
+    'income,2024-01-07,"1,000.00",Client,Payment,\n'
+    'expense,not-a-date,5,,,\n'
+    'expense,2024-01-08,7,,,99\n'
+)
+
+
+class TestReadRows(unittest.TestCase):
+    """Test streaming parsing of CSV and NDJSON input."""
+
+    def test_iter_lines_across_chunks(self):
+        """Test lines split across read chunks and a UTF-8 BOM are reassembled."""
+        data = '\ufeffvendor\nCafé Olé\nlast'.encode('utf-8')
+        lines = list(iter_lines(io.BytesIO(data), read_size=3))
+        self.assertEqual(lines, ['vendor\n', 'Café Olé\n', 'last'])
+
+    def test_csv_errors_by_line(self):
+        """Test bad CSV rows are rejected with their line number and the rest imported."""
+        batches = []
+        result = import_documents(read_rows(io.BytesIO(CSV.encode()), 'csv'), batches.append,
+                                  job_ids={1})
+        self.assertEqual((result.imported, result.rejected), (2, 3))
+        self.assertEqual([e['line'] for e in result.errors], [3, 5, 6])
+        self.assertIn('unknown job_id 99', result.errors[2]['error'])
+        imported = batches[0]
+        self.assertEqual([d.amount_cents for d in imported], [1250, 100000])
+        self.assertEqual(imported[0].date, date(2024, 1, 5))
+        self.assertEqual(imported[0].job_id, 1)
+
+    def test_ndjson(self):
+        """Test NDJSON rows, blank lines and malformed JSON."""
+        data = (b'{"type": "income", "date": "2024-02-01", "amount_cents": 500}\n\n'
+                b'{"type": "expense"\n'
+                b'[1, 2]\n')
+        result = import_documents(read_rows(io.BytesIO(data), 'ndjson'), lambda docs: None)
+        self.assertEqual((result.imported, result.rejected), (1, 2))
+        self.assertEqual([e['line'] for e in result.errors], [3, 4])
+
+    def test_batches(self):
+        """Test documents are written in batches of at most batch_size."""
+        rows = [(n, {'type': 'expense', 'date': '2024-01-01', 'amount': '1'}) for n in range(7)]
+        sizes = []
+        import_documents(rows, lambda docs: sizes.append(len(docs)), batch_size=3)
+        self.assertEqual(sizes, [3, 3, 1])
+
+
+class TestBatchWrites(unittest.TestCase):
+    """Test add_documents keeps every index consistent with single adds."""
+
+    def test_out_of_order_batches(self):
+        """Test back-dated batches merge into the date index in (date, id) order."""
+        rng = random.Random(7)
+        store = LedgerStore()
+        for _ in range(5):
+            store.add_documents([
+                Document(type=rng.choice(DOCUMENT_TYPES), amount=rng.randint(1, 100),
+                         date=date(2024, rng.randint(1, 12), rng.randint(1, 28)))
+                for _ in range(40)])
+        docs = store.recent_documents()
+        self.assertEqual(len(docs), 200)
+        self.assertEqual([date_key(d) for d in docs],
+                         sorted((date_key(d) for d in docs), reverse=True))
+        self.assertEqual(len(store.documents_between('2024-03-01', '2024-03-31')),
+                         len([d for d in docs if d.date.month == 3]))
+        income = sum(d.amount_cents for d in docs if d.type == 'income')
+        self.assertEqual(store.totals().revenue, income)
+
+
+class TestSortedIndex(unittest.TestCase):
+    """Test the chunked sorted index against a plain sorted list."""
+
+    def test_matches_sorted_list(self):
+        """Test positions, ranges and keys agree after random inserts and splits."""
+        rng = random.Random(3)
+        index = SortedIndex(chunk_size=4)
+        keys = []
+        for value in range(300):
+            key = rng.randint(0, 100)
+            index.insert(key, value)
+            keys.append(key)
+        keys.sort()
+        self.assertEqual(len(index), 300)
+        self.assertEqual([index.key_at(i) for i in range(300)], keys)
+        for probe in (-1, 0, 50, 100, 101):
+            low, high = index.bisect_left(probe), index.bisect_right(probe)
+            self.assertEqual(high - low, keys.count(probe))
+            self.assertEqual(len(index.values(low, high)), keys.count(probe))
+        self.assertEqual(len(index.values(10, 20)), 10)
+        self.assertEqual(index.values(295, 1000), index.values()[295:])
+
+
+if __name__ == '__main__':
+    unittest.main()
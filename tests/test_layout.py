@@ -0,0 +1,39 @@
+"""Test the precompiled page shell."""
+import os
+import unittest
+from layout import PageShell, compile_template, render_compiled
+
+STATIC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static')
+
+
+class TestPageShell(unittest.TestCase):
+    """Test page shell compilation and rendering."""
+
+    def setUp(self):
+        """Set up the shell from the real static folder."""
+        self.shell = PageShell(STATIC)
+
+    def test_compile_template(self):
+        """Test static slots are filled and dynamic ones kept for splicing."""
+        parts = compile_template('<a class="{nav}">{title}</a>', nav='active')
+        self.assertEqual(parts, ['<a class="active">', 'title', '</a>'])
+        self.assertEqual(render_compiled(parts, {'title': '{x}'}), '<a class="active">{x}</a>')
+
+    def test_render_with_nav(self):
+        """Test the active nav item, user and body are spliced in."""
+        html = self.shell.render('Jobs', '<p>body</p>', 'admin', 'jobs')
+        self.assertIn('<title>Jobs - Profit Tracker AI</title>', html)
+        self.assertIn('href="/jobs" class="nav-link active"', html)
+        self.assertIn('href="/dashboard" class="nav-link "', html)
+        self.assertIn('<div class="avatar">A</div>', html)
+        self.assertIn('<p>body</p>', html)
+        self.assertRegex(html, r'/static/css/app\.css\?v=[0-9a-f]{12}')
+
+    def test_render_without_nav(self):
+        """Test pages rendered without a user omit the nav."""
+        html = self.shell.render('Login', 'x')
+        self.assertNotIn('main-nav', html)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+"""Test the indexed ledger store."""
+import threading
+import unittest
+from datetime import date
+from unittest.mock import patch
+from ledger import IdSequence, LedgerStore, decode_cursor, encode_cursor
+from records import Document, Job
+
+
+class TestLedgerStore(unittest.TestCase):
+    """Test ledger store indexes and lookups."""
+
+    def setUp(self):
+        """Set up a store with a small ledger."""
+        self.store = LedgerStore()
+        self.store.add_job(Job(id=1, number='JOB-001', status='In Progress'))
+        self.store.add_job(Job(id=2, number='JOB-002', status='Quoted'))
+        self.store.add_document(Document(id=1, type='expense', job_id=1, vendor='Home Depot',
+                                         amount=100, date='2024-01-10', category='Materials'))
+        self.store.add_document(Document(id=2, type='income', job_id=1, vendor='Thompson',
+                                         amount=500, date='2024-01-12', category='Payment'))
+        self.store.add_document(Document(id=3, type='expense', job_id=None, vendor='Home Depot',
+                                         amount=40, date='2024-01-11', category='Equipment'))
+
+    def test_documents_for_job(self):
+        """Test job lookups, optionally filtered by type."""
+        self.assertEqual([d.id for d in self.store.documents_for_job(1)], [1, 2])
+        self.assertEqual([d.id for d in self.store.documents_for_job(1, 'expense')], [1])
+        self.assertEqual([d.id for d in self.store.documents_for_job(None)], [3])
+        self.assertEqual(self.store.documents_for_job(2), [])
+
+    def test_secondary_indexes(self):
+        """Test type, category, vendor and date indexes."""
+        self.assertEqual(len(self.store.documents_by_type('expense')), 2)
+        self.assertEqual(len(self.store.documents_by_category('Payment')), 1)
+        self.assertEqual(len(self.store.documents_by_vendor('Home Depot')), 2)
+        self.assertEqual([d.id for d in self.store.documents_on('2024-01-11')], [3])
+
+    def test_recent_documents(self):
+        """Test documents come back newest first."""
+        self.assertEqual([d.id for d in self.store.recent_documents()], [2, 3, 1])
+        self.assertEqual([d.id for d in self.store.recent_documents(2)], [2, 3])
+
+    def test_documents_page(self):
+        """Test keyset pagination walks the ledger newest first."""
+        self.store.add_document(Document(id=4, type='expense', job_id=None, vendor='Ace',
+                                         amount=5, date='2024-01-11', category='Other'))
+        page, cursor = self.store.documents_page(limit=2)
+        self.assertEqual([d.id for d in page], [2, 4])
+        self.assertEqual(encode_cursor(cursor), '2024-01-11_4')
+        page, cursor = self.store.documents_page(decode_cursor(encode_cursor(cursor)), limit=2)
+        self.assertEqual([d.id for d in page], [3, 1])
+        self.assertIsNone(cursor)
+
+    def test_decode_cursor(self):
+        """Test garbled cursors are ignored."""
+        self.assertEqual(decode_cursor('2024-01-10_12'), (date(2024, 1, 10), 12))
+        self.assertIsNone(decode_cursor('2024-13-40_1'))
+        self.assertIsNone(decode_cursor('nonsense'))
+        self.assertIsNone(decode_cursor(None))
+
+    def test_get_job(self):
+        """Test job lookup by id."""
+        self.assertEqual(self.store.get_job('2').number, 'JOB-002')
+        self.assertIsNone(self.store.get_job(''))
+        self.assertIsNone(self.store.get_job(99))
+
+    def test_running_totals(self):
+        """Test aggregates are maintained as documents are added."""
+        totals = self.store.totals()
+        self.assertEqual(totals.revenue, 50000)
+        self.assertEqual(totals.expenses, 14000)
+        self.assertEqual(totals.net_profit, 36000)
+        self.assertAlmostEqual(totals.profit_margin, 72.0)
+
+        self.store.add_document(Document(id=4, type='income', job_id=2, vendor='Chen',
+                                         amount=250, date='2024-02-01', category='Payment'))
+        self.assertEqual(self.store.totals().revenue, 75000)
+        self.assertEqual(self.store.job_totals(1).net_profit, 40000)
+        self.assertEqual(self.store.job_totals(2).revenue, 25000)
+        self.assertEqual(self.store.month_totals('2024-01').revenue, 50000)
+        self.assertEqual(self.store.month_totals('2024-02').revenue, 25000)
+        self.assertEqual(self.store.expense_category_totals(), {'Materials': 10000, 'Equipment': 4000})
+
+    def test_empty_totals(self):
+        """Test totals for slices with no documents."""
+        self.assertEqual(self.store.job_totals(99).revenue, 0)
+        self.assertEqual(self.store.month_totals('1999-01').profit_margin, 0)
+
+
+    def test_ids_assigned_by_store(self):
+        """Test new records get fresh ids past any seeded ones."""
+        doc = self.store.add_document(Document(id=1, type='expense', job_id=None, vendor='A',
+                                               amount=1, date='2024-01-01', category='Other'))
+        self.assertEqual(doc.id, 4)
+        self.assertIs(self.store.get_document('4'), doc)
+        self.store.seed([Job(id=10, number='JOB-010', status='Quoted')], [])
+        self.assertEqual(self.store.add_job(Job(number='JOB-011', status='Quoted')).id, 11)
+
+    def test_failed_add_changes_nothing(self):
+        """Test a batch the analytics table rejects is not left half indexed."""
+        self.assertIsNotNone(self.store.table)
+        version, totals = self.store.version(), self.store.totals().expenses
+
+        def overflow(docs):
+            raise OverflowError('Python int too large to convert to C long')
+        with patch.object(self.store.table, 'extend', overflow), self.assertRaises(OverflowError):
+            self.store.add_document(Document(type='expense', vendor='Home Depot', amount=10,
+                                             date='2024-01-13', category='Materials'))
+        self.assertEqual(self.store.document_count(), 3)
+        self.assertEqual(len(self.store.documents_by_vendor('Home Depot')), 2)
+        self.assertEqual((self.store.version(), self.store.totals().expenses), (version, totals))
+
+    def test_update_documents(self):
+        """Test a replaced document moves between indexes, totals and the date order."""
+        old = self.store.get_document(1)
+        new = old.replace(type='income', job_id=2, vendor='Lowes', amount_cents=25000,
+                          date='2024-02-01', category='Payment')
+        self.assertEqual(self.store.update_documents([new, Document(id=99, type='income')]), [new])
+        self.assertIs(self.store.get_document(1), new)
+        self.assertEqual([d.id for d in self.store.documents_for_job(1)], [2])
+        self.assertEqual([d.id for d in self.store.documents_for_job(2)], [1])
+        self.assertEqual([d.id for d in self.store.documents_by_vendor('Home Depot')], [3])
+        self.assertEqual([d.id for d in self.store.recent_documents()], [1, 2, 3])
+        totals = self.store.totals()
+        self.assertEqual((totals.revenue, totals.expenses), (75000, 4000))
+        self.assertEqual(self.store.job_totals(1).expenses, 0)
+        self.assertEqual(self.store.month_change('income'), (25000, 50000, -50.0))
+        self.assertEqual(self.store.document_count(), 3)
+        with self.assertRaises(ValueError):
+            self.store.update_documents([new])
+
+    def test_update_jobs(self):
+        """Test replaced jobs keep their place and unknown ids are skipped."""
+        version = self.store.version()
+        done = self.store.get_job(2).replace(status='Completed')
+        self.assertEqual(self.store.update_jobs([done, Job(id=50)]), [done])
+        self.assertEqual([j.id for j in self.store.all_jobs()], [1, 2])
+        self.assertEqual(self.store.jobs_with_status('Completed'), [done])
+        self.assertGreater(self.store.version(), version)
+
+    def test_last_write(self):
+        """Test every change records when it happened."""
+        self.assertIsNone(LedgerStore().last_write())
+        before = self.store.last_write()
+        self.assertIsNotNone(before)
+        self.store.update_jobs([self.store.get_job(1).replace(progress=50)])
+        self.assertGreaterEqual(self.store.last_write(), before)
+
+    def test_ids_unique_across_threads(self):
+        """Test concurrent allocations never collide."""
+        sequence = IdSequence()
+        allocated = []
+
+        def allocate():
+            allocated.extend(sequence.next() for _ in range(1000))
+
+        threads = [threading.Thread(target=allocate) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(allocated), list(range(1, 8001)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+"""Test integer-cent money parsing and formatting."""
+import unittest
+from decimal import Decimal
+from money import format_cents, to_cents, to_dollars
+
+
+class TestMoney(unittest.TestCase):
+    """Test conversions between dollars and cents."""
+
+    def test_to_cents(self):
+        """Test form strings, floats and Decimals become exact cents."""
+        self.assertEqual(to_cents('12.50'), 1250)
+        self.assertEqual(to_cents('$1,234.5'), 123450)
+        self.assertEqual(to_cents(0.1), 10)
+        self.assertEqual(to_cents(4250), 425000)
+        self.assertEqual(to_cents(Decimal('0.005')), 1)
+        self.assertEqual(to_cents('-0.015'), -2)
+        self.assertEqual(to_cents(''), 0)
+        self.assertEqual(to_cents('92233720368547758.07'), 2 ** 63 - 1)
+        for bad in ('abc', 'NaN', 'inf', '1e20', '-92233720368547758.09'):
+            with self.assertRaises(ValueError):
+                to_cents(bad)
+
+    def test_sums_are_exact(self):
+        """Test adding cents has none of the float drift."""
+        self.assertNotEqual(sum([0.1] * 10), 1.0)
+        self.assertEqual(sum([to_cents(0.1)] * 10), to_cents(1))
+
+    def test_format_cents(self):
+        """Test rendering with thousands separators and rounding."""
+        self.assertEqual(to_dollars(123456), Decimal('1234.56'))
+        self.assertEqual(format_cents(123456), '1,234.56')
+        self.assertEqual(format_cents(123450, 0), '1,235')
+        self.assertEqual(format_cents(-5), '-0.05')
+        self.assertEqual(format_cents(2500.4, 0), '25')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+"""Test the job performance engine."""
+import unittest
+from ledger import LedgerStore
+from performance import job_performance, top_jobs_by_margin
+from records import Document, Job
+
+
+class TestJobPerformance(unittest.TestCase):
+    """Test job performance rows and margin ranking."""
+
+    def setUp(self):
+        """Set up jobs with known margins."""
+        self.store = LedgerStore()
+        for job_id, quote, revenue, expenses in [(1, 1000, 1000, 900), (2, 1000, 1000, 500),
+                                                  (3, 0, 0, 100), (4, 2000, 2000, 1000)]:
+            self.store.add_job(Job(id=job_id, number=f'JOB-{job_id}', quoted_price=quote))
+            self.store.add_document(Document(id=job_id * 2 - 1, type='income', job_id=job_id,
+                                             amount=revenue, date='2024-01-01', category='Payment'))
+            self.store.add_document(Document(id=job_id * 2, type='expense', job_id=job_id,
+                                             amount=expenses, date='2024-01-02', category='Materials'))
+
+    def test_job_performance(self):
+        """Test rows keep job order and compute margin against the quote."""
+        rows = job_performance(self.store)
+        self.assertEqual([r['job'].id for r in rows], [1, 2, 3, 4])
+        self.assertEqual(rows[0]['profit'], 10000)
+        self.assertAlmostEqual(rows[0]['margin'], 10.0)
+        self.assertEqual(rows[2]['margin'], 0)
+
+    def test_top_jobs_by_margin(self):
+        """Test heap ranking matches a full sort."""
+        self.assertEqual([r['job'].id for r in top_jobs_by_margin(self.store, 2)], [2, 4])
+        self.assertEqual([r['job'].id for r in top_jobs_by_margin(self.store)], [2, 4, 1, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+"""Test the request metrics and profiling middleware."""
+import os
+import shutil
+import tempfile
+import unittest
+from flask import Flask, Response, jsonify, send_file
+from werkzeug.test import EnvironBuilder
+from werkzeug.wsgi import FileWrapper
+from profiling import PhaseTimer, RequestProfiler, phase
+
+
+def make_app(profiler):
+    app = Flask(__name__)
+
+    @app.route('/page')
+    def page():
+        with phase('aggregate'):
+            total = sum(range(1000))
+        return f'<p>{total}</p>'
+
+    @app.route('/data')
+    def data():
+        return jsonify({'values': list(range(100))})
+
+    @app.route('/stream')
+    def stream():
+        return Response((f'{n}\n' for n in range(10)), mimetype='text/csv')
+
+    @app.route('/file')
+    def file():
+        return send_file(__file__, mimetype='text/plain')
+
+    profiler.init_app(app)
+    return app
+
+
+class TestPhaseTimer(unittest.TestCase):
+    """Test exclusive phase accounting."""
+
+    def test_nested_phases_are_exclusive(self):
+        """Test time in a nested phase is not counted twice."""
+        timer = PhaseTimer()
+        timer.enter('other')
+        timer.enter('render')
+        timer.enter('aggregate')
+        timer.enter('aggregate')
+        timer.exit()
+        timer.exit()
+        timer.exit()
+        timer.exit()
+        self.assertEqual(set(timer.phases), {'other', 'render', 'aggregate'})
+        self.assertTrue(all(seconds >= 0 for seconds in timer.phases.values()))
+
+    def test_phase_without_sampling(self):
+        """Test phase() is a no-op outside a sampled request."""
+        with phase('aggregate') as result:
+            self.assertIsNone(result)
+
+
+class TestRequestProfiler(unittest.TestCase):
+    """Test per-route metrics, sampling and profile dumps."""
+
+    def setUp(self):
+        """Set up a profile directory."""
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Remove the profile directory."""
+        shutil.rmtree(self.tmpdir)
+
+    def test_metrics(self):
+        """Test requests, statuses, bytes and the histogram per route."""
+        profiler = RequestProfiler()
+        client = make_app(profiler).test_client()
+        for path in ('/page', '/page', '/stream', '/missing'):
+            client.get(path, buffered=True)
+        stats = profiler.snapshot()
+        self.assertEqual(stats['page'].requests, 2)
+        self.assertEqual(stats['stream'].bytes, len(''.join(f'{n}\n' for n in range(10))))
+        self.assertEqual(dict(stats['unmatched'].statuses), {'404': 1})
+        self.assertEqual(stats['page'].sampled, 0)
+
+        text = profiler.metrics_text()
+        self.assertIn('profit_tracker_requests_total{route="page",status="200"} 2', text)
+        self.assertIn('profit_tracker_request_duration_seconds_bucket{route="page",le="+Inf"} 2', text)
+        self.assertIn('# TYPE profit_tracker_request_duration_seconds histogram', text)
+
+    def test_file_wrapper_is_not_wrapped(self):
+        """Test a file response reaches the server as its own file wrapper, so it can use sendfile."""
+        profiler = RequestProfiler()
+        app = make_app(profiler)
+        environ = EnvironBuilder('/file', environ_base={'wsgi.file_wrapper': FileWrapper}).get_environ()
+        body = app.wsgi_app(environ, lambda status, headers, exc_info=None: None)
+        self.assertIsInstance(body, FileWrapper)
+        self.assertEqual(profiler.in_flight, 1)
+        body.close()
+        stats = profiler.snapshot()['file']
+        self.assertEqual((stats.requests, stats.bytes), (1, os.path.getsize(__file__)))
+        self.assertEqual(profiler.in_flight, 0)
+
+    def test_sampled_requests(self):
+        """Test the profile header samples a request into phases and writes a profile."""
+        profiler = RequestProfiler(token='secret', profile_dir=self.tmpdir)
+        client = make_app(profiler).test_client()
+        client.get('/page', buffered=True, headers={'X-Profile': 'wrong'})
+        client.get('/page', buffered=True, headers={'X-Profile': 'secret'})
+        client.get('/data', buffered=True, headers={'X-Profile': 'secret'})
+        stats = profiler.snapshot()
+        self.assertEqual((stats['page'].requests, stats['page'].sampled), (2, 1))
+        self.assertEqual(set(stats['page'].phases), {'other', 'render', 'aggregate', 'serialize'})
+        self.assertIn('serialize', stats['data'].phases)
+        self.assertEqual(sorted(name.split('-')[0] for name in os.listdir(self.tmpdir)), ['data', 'page'])
+        self.assertIn('phase="aggregate"', profiler.metrics_text())
+
+    def test_sample_rate(self):
+        """Test a sample rate of 1 times every request."""
+        profiler = RequestProfiler(sample_rate=1.0)
+        client = make_app(profiler).test_client()
+        client.get('/stream', buffered=True)
+        self.assertEqual(profiler.snapshot()['stream'].sampled, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,14 +1,25 @@
 """Test receipt processor functionality."""
+import os
+import tempfile
 import unittest
-from unittest.mock import patch, MagicMock
-from app.receipt_processor import process_receipt_image, parse_receipt_text
+from datetime import date
+from unittest.mock import MagicMock, patch
+from extraction_cache import ExtractionCache
+from receipt_processor import (apply_extraction, extract_receipt, file_digest, process_receipt_image,
+                               parse_receipt_text)
+from records import COMPLETED, FAILED, Document
 
 
 class TestReceiptProcessor(unittest.TestCase):
     """Test receipt processing functionality."""
     
-    @patch('app.receipt_processor.anthropic.Anthropic')
-    def test_process_receipt_image(self, mock_anthropic):
+    def setUp(self):
+        fd, self.image = tempfile.mkstemp(suffix='.jpg')
+        os.write(fd, b'\xff\xd8\xff\xe0 receipt')
+        os.close(fd)
+        self.addCleanup(os.remove, self.image)
+
+    def test_process_receipt_image(self):
         """Test receipt image processing."""
         # Mock the Anthropic API response
         mock_response = MagicMock()
@@ -19,7 +30,7 @@ class TestReceiptProcessor(unittest.TestCase):
                 "date": "2024-01-15",
                 "total_amount": 156.78,
                 "items": [
-                    {"description": "PVC Pipe 2\"", "quantity": 5, "price": 15.99},
+                    {"description": "PVC Pipe 2\\"", "quantity": 5, "price": 15.99},
                     {"description": "Pipe Fittings", "quantity": 10, "price": 3.99}
                 ],
                 "tax": 12.34,
@@ -30,15 +41,16 @@ class TestReceiptProcessor(unittest.TestCase):
         
         mock_client = MagicMock()
         mock_client.messages.create.return_value = mock_response
-        mock_anthropic.return_value = mock_client
         
         # Test processing
-        result = process_receipt_image('test.jpg')
+        result = process_receipt_image(self.image, client=mock_client)
         
         self.assertIsNotNone(result)
         self.assertEqual(result['vendor_name'], 'Home Depot')
         self.assertEqual(result['total_amount'], 156.78)
         self.assertEqual(len(result['items']), 2)
+        image = mock_client.messages.create.call_args.kwargs['messages'][0]['content'][0]
+        self.assertEqual(image['source']['media_type'], 'image/jpeg')
         
     def test_parse_receipt_text_valid_json(self):
         """Test parsing valid JSON receipt text."""
@@ -83,6 +95,43 @@ class TestReceiptProcessor(unittest.TestCase):
         self.assertEqual(result['vendor_name'], 'Test Vendor')
         self.assertEqual(result['total_amount'], 50.00)
 
+    def test_extract_receipt_reports_errors(self):
+        """Test extraction failures come back as an error result."""
+        result = extract_receipt({'document_id': 1, 'path': os.path.join(self.image, 'missing')})
+        self.assertIn('error', result)
+
+    def test_extract_receipt_uses_cache(self):
+        """Test the same image is only sent to the model once."""
+        cache = ExtractionCache(self.image + '.db')
+        self.addCleanup(os.remove, self.image + '.db')
+        data = {'vendor_name': 'Home Depot', 'total_amount': 156.78, 'date': '2024-01-15'}
+        with patch('receipt_processor.extraction_cache', return_value=cache), \
+                patch('receipt_processor.process_receipt_image', return_value=data) as model:
+            first = extract_receipt({'document_id': 1, 'path': self.image})
+            second = extract_receipt({'document_id': 2, 'path': self.image, 'sha256': file_digest(self.image)})
+            with patch('receipt_processor.EXTRACTION_VERSION', 'new-prompt'):
+                extract_receipt({'document_id': 3, 'path': self.image})
+        self.assertEqual(first, second)
+        self.assertEqual(first['amount_cents'], 15678)
+        self.assertEqual(model.call_count, 2)
+        cache.close()
+
+    def test_apply_extraction(self):
+        """Test extraction fills empty fields and keeps values from the form."""
+        result = {
+            'vendor': 'Home Depot', 'amount_cents': 15678, 'date': '2024-01-15',
+            'line_items': [{'description': 'PVC Pipe', 'quantity': 5, 'price_cents': 1599}],
+            'tax_cents': 1234, 'subtotal_cents': 14444,
+        }
+        doc = apply_extraction(Document(id=1, type='expense', vendor='HD Pro'), result)
+        self.assertEqual((doc.vendor, doc.amount_cents, doc.date), ('HD Pro', 15678, date(2024, 1, 15)))
+        self.assertEqual(doc.extraction.status, COMPLETED)
+        self.assertEqual(doc.extraction.line_items[0]['price_cents'], 1599)
+
+        failed = apply_extraction(Document(id=2, type='expense', amount_cents=500), {'error': 'timeout'})
+        self.assertEqual((failed.amount_cents, failed.extraction.status), (500, FAILED))
+        self.assertEqual(failed.extraction.error, 'timeout')
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
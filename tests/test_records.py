@@ -0,0 +1,62 @@
+"""Test the slotted ledger record types."""
+import unittest
+from datetime import date, datetime
+from records import Document, Job, UploadedFile, parse_date, parse_id
+
+
+class TestRecords(unittest.TestCase):
+    """Test field normalization and serialization."""
+
+    def test_document_normalizes_fields(self):
+        """Test form strings become typed values."""
+        doc = Document(type='expense', job_id='3', amount='12.50', date='2024-01-10',
+                       file_info={'filename': 'r.jpg', 'size': '10', 'sha256': 'ab'})
+        self.assertEqual(doc.job_id, 3)
+        self.assertEqual(doc.amount_cents, 1250)
+        self.assertEqual(doc.date, date(2024, 1, 10))
+        self.assertEqual(doc.file_info, UploadedFile(filename='r.jpg', size=10, sha256='ab'))
+        self.assertIsNone(Document(job_id='').job_id)
+
+    def test_rejects_wrong_types(self):
+        """Test values that would break the indexes or storage are refused up front."""
+        for fields in ({'file_info': 'x'}, {'extraction': 5}, {'vendor': {'name': 'A'}},
+                       {'category': ['Materials']}, {'file_info': {'sha256': 12}},
+                       {'extraction': {'line_items': 'abc'}}):
+            with self.assertRaises(ValueError):
+                Document(type='expense', **fields)
+        with self.assertRaises(ValueError):
+            Job(number=7)
+        with self.assertRaises(ValueError):
+            parse_id('abc')
+
+    def test_no_instance_dict(self):
+        """Test records carry no per-instance __dict__."""
+        for record in (Document(), Job(), UploadedFile()):
+            self.assertFalse(hasattr(record, '__dict__'))
+            with self.assertRaises(AttributeError):
+                record.unknown = 1
+
+    def test_round_trip(self):
+        """Test to_dict gives JSON-friendly values that from_dict reads back."""
+        job = Job(id=1, number='JOB-1', quoted_price=500, start_date='2024-02-01')
+        data = job.to_dict()
+        self.assertEqual(data['start_date'], '2024-02-01')
+        self.assertIsNone(data['estimated_end'])
+        self.assertEqual(Job.from_dict(data), job)
+
+        doc = Document(id=2, type='income', date='2024-01-03', file_info=UploadedFile(filename='r.jpg'))
+        self.assertEqual(doc.to_dict()['file_info']['filename'], 'r.jpg')
+        self.assertEqual(Document.from_dict(doc.to_dict()), doc)
+
+    def test_parsers(self):
+        """Test id and date parsing edge cases."""
+        self.assertIsNone(parse_id(None))
+        self.assertEqual(parse_id(7), 7)
+        self.assertEqual(parse_date(datetime(2024, 1, 2, 15, 30)), date(2024, 1, 2))
+        self.assertIsNone(parse_date(''))
+        with self.assertRaises(ValueError):
+            parse_date('not a date')
+
+
+if __name__ == '__main__':
+    unittest.main()
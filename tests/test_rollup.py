@@ -0,0 +1,71 @@
+"""Test the rollup cube and the ledger's period metrics."""
+import unittest
+from ledger import LedgerStore
+from records import Document
+from rollup import Cell, RollupCube, shift_month
+
+
+class TestRollupCube(unittest.TestCase):
+    """Test bucket sums and period queries."""
+
+    def setUp(self):
+        """Set up a cube spanning a year boundary."""
+        self.cube = RollupCube()
+        for month, job_id, category, doc_type, cents in [
+                ('2023-11', 1, 'Payment', 'income', 10000),
+                ('2023-12', 1, 'Materials', 'expense', 4000),
+                ('2024-01', 1, 'Payment', 'income', 12000),
+                ('2024-01', 2, 'Payment', 'income', 3000),
+                ('2024-01', 2, 'Materials', 'expense', 1000),
+                ('2024-02', None, 'Other', 'expense', 500)]:
+            self.cube.add(month, job_id, category, doc_type, cents)
+        self.cube.add(None, 1, 'Payment', 'income', 999)
+
+    def test_shift_month(self):
+        """Test month arithmetic across years."""
+        self.assertEqual(shift_month('2024-01', -1), '2023-12')
+        self.assertEqual(shift_month('2023-12', 1), '2024-01')
+        self.assertEqual(shift_month('2024-03', -14), '2023-01')
+
+    def test_total_filters(self):
+        """Test a month's buckets summed with type, job and category filters."""
+        self.assertEqual(self.cube.total('2024-01', 'income'), Cell(15000, 2))
+        self.assertEqual(self.cube.total('2024-01', 'income', job_id=2), Cell(3000, 1))
+        self.assertEqual(self.cube.total('2024-01', category='Materials'), Cell(1000, 1))
+        self.assertEqual(self.cube.total('1999-01'), Cell())
+        self.assertEqual(self.cube.months(), ['2023-11', '2023-12', '2024-01', '2024-02'])
+
+    def test_change(self):
+        """Test month-over-month change and the no-previous-month case."""
+        self.assertEqual(self.cube.change('2024-01', 'income', job_id=1), (12000, 0, None))
+        current, previous, percent = self.cube.change('2024-02', 'expense')
+        self.assertEqual((current, previous), (500, 1000))
+        self.assertAlmostEqual(percent, -50.0)
+
+    def test_trailing_and_ytd(self):
+        """Test trailing series fill empty months and YTD resets in January."""
+        self.assertEqual(self.cube.trailing('2024-01', 'income', count=3),
+                         [('2023-11', 10000), ('2023-12', 0), ('2024-01', 15000)])
+        self.assertEqual(self.cube.year_to_date('2024-02', 'expense'), 1500)
+        self.assertEqual(self.cube.year_to_date('2023-12', 'income'), 10000)
+
+
+class TestLedgerPeriods(unittest.TestCase):
+    """Test the store keeps the cube in step with its documents."""
+
+    def test_latest_month_default(self):
+        """Test period queries default to the latest month with documents."""
+        store = LedgerStore()
+        self.assertEqual(store.month_change('income'), (0, 0, None))
+        self.assertEqual(store.monthly_trend('income'), [])
+        store.add_document(Document(type='income', amount=100, date='2024-01-15', job_id=1))
+        store.add_document(Document(type='income', amount=150, date='2024-02-03', job_id=1))
+        self.assertEqual(store.month_change('income')[:2], (15000, 10000))
+        self.assertAlmostEqual(store.month_change('income')[2], 50.0)
+        self.assertEqual(store.monthly_trend('income', count=2), [('2024-01', 10000), ('2024-02', 15000)])
+        self.assertEqual(store.year_to_date('income', job_id=1), 25000)
+        self.assertEqual(store.year_to_date('income', '2024-01'), 10000)
+
+
+if __name__ == '__main__':
+    unittest.main()
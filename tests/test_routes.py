@@ -0,0 +1,117 @@
+"""Test the HTML form and receipt routes."""
+import hashlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# Before app is imported, as its blob store reads UPLOAD_FOLDER
+if 'app' not in sys.modules:
+    os.environ.setdefault('UPLOAD_FOLDER', tempfile.mkdtemp(prefix='route-uploads-'))
+import app
+import taskqueue
+from receipt_processor import save_extraction
+
+RESULT = {'vendor': 'Lumber Yard', 'amount_cents': 4200, 'date': '2024-02-01',
+          'line_items': [], 'tax_cents': 0, 'subtotal_cents': 4200}
+
+
+class TestReceiptRoutes(unittest.TestCase):
+    """Test uploading a receipt and downloading it again."""
+
+    def setUp(self):
+        """Set up a logged-in client and a fake extractor."""
+        self.client = app.app.test_client()
+        self.client.post('/login', data={'username': 'admin', 'password': 'admin123'}, buffered=True)
+        patcher = patch.dict(taskqueue.TASKS, {'extract_receipt': (lambda payload: RESULT, save_extraction)})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        if hasattr(app.task_queue, 'join'):
+            # Cleanups run last-in first-out: queued extractions finish before the fake is removed
+            self.addCleanup(app.task_queue.join)
+
+    def upload(self, content, **fields):
+        data = {'doc_type': 'expense', 'vendor': 'Lumber Yard', 'amount': '42', 'date': '2024-02-01',
+                'category': 'Materials', 'job_id': '1',
+                'receipt_file': (io.BytesIO(content), 'receipt.png', 'image/png')}
+        data.update(fields)
+        return self.client.post('/upload', data=data, content_type='multipart/form-data', buffered=True)
+
+    def test_upload_then_download(self):
+        """Test an uploaded receipt is served back with its name and type."""
+        content = b'receipt image %f' % os.getpid()
+        self.assertEqual(self.upload(content).status_code, 302)
+        digest = hashlib.sha256(content).hexdigest()
+        response = self.client.get(f'/receipts/{digest}', buffered=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, content)
+        self.assertEqual(response.mimetype, 'image/png')
+        self.assertIn('receipt.png', response.headers['Content-Disposition'])
+        self.assertTrue(response.cache_control.private)
+
+    def test_download_through_nginx(self):
+        """Test with UPLOAD_ACCEL_REDIRECT the app only checks access and names the file for nginx."""
+        content = b'nginx receipt %f' % os.getpid()
+        self.upload(content)
+        digest = hashlib.sha256(content).hexdigest()
+        with patch.object(app, 'UPLOAD_ACCEL_REDIRECT', '/uploads'):
+            response = self.client.get(f'/receipts/{digest}', buffered=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, b'')
+        self.assertEqual(response.headers['X-Accel-Redirect'], f'/uploads/{digest[:2]}/{digest[2:4]}/{digest}')
+        self.assertEqual(response.mimetype, 'image/png')
+        self.assertIn('receipt.png', response.headers['Content-Disposition'])
+        self.assertNotIn('X-Sendfile', response.headers)
+
+    def test_duplicate_upload_is_reported(self):
+        """Test uploading a receipt already on file says so and records nothing."""
+        content = b'duplicate receipt %f' % os.getpid()
+        self.assertEqual(self.upload(content).status_code, 302)
+        documents = app.store.document_count()
+        response = self.upload(content, vendor='Someone Else')
+        self.assertEqual(response.status_code, 409)
+        self.assertIn(b'already on file', response.data)
+        self.assertEqual(app.store.document_count(), documents)
+
+    def test_download_unknown_receipt(self):
+        """Test digests not on record and malformed ones are not found."""
+        self.assertEqual(self.client.get('/receipts/' + 'a' * 64, buffered=True).status_code, 404)
+        self.assertEqual(self.client.get('/receipts/not-a-digest', buffered=True).status_code, 404)
+
+
+class TestFormErrors(unittest.TestCase):
+    """Test malformed form values are a 400, not a server error."""
+
+    def setUp(self):
+        """Set up a logged-in client."""
+        self.client = app.app.test_client()
+        self.client.post('/login', data={'username': 'admin', 'password': 'admin123'}, buffered=True)
+
+    def post(self, path, data):
+        return self.client.post(path, data=data, buffered=True)
+
+    def test_bad_values_are_rejected(self):
+        """Test bad dates, amounts and job ids re-render an error and store nothing."""
+        documents, jobs = app.store.document_count(), app.store.job_count()
+        for path, data in (
+                ('/upload', {'doc_type': 'expense', 'amount': '12', 'date': '02/01/2024'}),
+                ('/upload', {'doc_type': 'expense', 'amount': 'twelve', 'date': '2024-02-01'}),
+                ('/upload', {'doc_type': 'expense', 'amount': '12', 'job_id': 'abc'}),
+                ('/invoices/new', {'customer': 'Smith', 'amount': '1,000', 'date': 'yesterday'}),
+                ('/jobs/new', {'number': 'JOB-9', 'quoted_price': '$$', 'start_date': '2024-02-01'})):
+            response = self.post(path, data)
+            self.assertEqual(response.status_code, 400, path)
+            self.assertIn(b'Invalid', response.data)
+        self.assertEqual((app.store.document_count(), app.store.job_count()), (documents, jobs))
+
+    def test_error_message_is_escaped(self):
+        """Test the submitted value is escaped in the error page."""
+        response = self.post('/invoices/new', {'customer': 'Smith', 'amount': '<b>1</b>'})
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn(b'<b>1</b>', response.data)
+
+
+if __name__ == '__main__':
+    unittest.main()
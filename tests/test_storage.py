@@ -0,0 +1,134 @@
+"""Test the persistent storage backends."""
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+from ledger import LedgerStore
+from records import Document, Job, UploadedFile
+from storage import SQLiteStorage, open_storage
+
+
+class TestSQLiteStorage(unittest.TestCase):
+    """Test the SQLite backend and cross-worker syncing."""
+
+    def setUp(self):
+        """Set up a throwaway database file."""
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'ledger.db')
+
+    def tearDown(self):
+        """Remove the database file."""
+        shutil.rmtree(self.tmpdir)
+
+    def test_round_trip(self):
+        """Test documents and jobs survive a reopen."""
+        storage = SQLiteStorage(self.path)
+        ids = storage.insert_documents([
+            Document(type='expense', job_id=1, vendor='Lowes', amount=12.5, date='2024-01-02',
+                     description='Nails', category='Materials', file_info=UploadedFile(filename='r.jpg')),
+            Document(type='income', job_id=1, vendor='Smith', amount=100, date='2024-01-03',
+                     description='Deposit', category='Payment'),
+        ])
+        self.assertEqual(ids, [1, 2])
+        storage.insert_jobs([Job(id=7, number='JOB-7', quoted_price=500)], keep_ids=True)
+        storage.close()
+
+        reopened = SQLiteStorage(self.path)
+        docs = reopened.load_documents()
+        self.assertEqual([d.id for d in docs], [1, 2])
+        self.assertEqual(docs[0].file_info, UploadedFile(filename='r.jpg'))
+        self.assertEqual(docs[0].job_id, 1)
+        self.assertEqual(docs[0].amount_cents, 1250)
+        self.assertEqual([d.id for d in reopened.load_documents(after_id=1)], [2])
+        self.assertEqual(reopened.load_jobs()[0].number, 'JOB-7')
+
+    def test_keep_ids_skips_existing(self):
+        """Test seeding twice does not duplicate rows and reports only the rows inserted."""
+        storage = SQLiteStorage(self.path)
+        jobs = [Job(id=1, number='JOB-1'), Job(id=2, number='JOB-2')]
+        self.assertEqual(storage.insert_jobs(jobs[:1], keep_ids=True), [1])
+        self.assertEqual(storage.insert_jobs(jobs, keep_ids=True), [2])
+        self.assertEqual(storage.insert_jobs(jobs, keep_ids=True), [])
+        self.assertEqual(len(storage.load_jobs()), 2)
+        self.assertEqual([job.id for job in storage.load_jobs(limit=1)], [1])
+        self.assertEqual(storage.insert_jobs([Job(number='JOB-3')]), [3])
+
+    def test_workers_share_ledger(self):
+        """Test two stores on one database see each other's writes."""
+        first = LedgerStore(SQLiteStorage(self.path))
+        second = LedgerStore(SQLiteStorage(self.path))
+        first.add_document(Document(type='income', vendor='A', amount=50,
+                                    date='2024-01-01', category='Payment'))
+        doc = second.add_document(Document(type='expense', vendor='B', amount=20,
+                                           date='2024-01-02', category='Other'))
+        self.assertEqual(doc.id, 2)
+        first.sync()
+        self.assertEqual(first.document_count(), 2)
+        self.assertEqual(first.totals().net_profit, 3000)
+        self.assertEqual(second.totals().net_profit, 3000)
+
+    def test_workers_share_updates(self):
+        """Test an update written by one store is synced into the other."""
+        first = LedgerStore(SQLiteStorage(self.path))
+        second = LedgerStore(SQLiteStorage(self.path))
+        job = first.add_job(Job(number='JOB-1', status='Quoted'))
+        doc = first.add_document(Document(type='expense', vendor='A', amount=50, date='2024-01-01'))
+        second.sync()
+        first.update_documents([doc.replace(amount_cents=700, vendor='B')])
+        first.update_jobs([job.replace(status='Completed')])
+        self.assertEqual(first.update_documents([Document(id=42, type='income')]), [])
+        second.sync()
+        self.assertEqual(second.get_document(doc.id).vendor, 'B')
+        self.assertEqual(second.totals().expenses, 700)
+        self.assertEqual(second.get_job(job.id).status, 'Completed')
+        self.assertEqual([rev for rev, _ in second.backend.load_document_updates()], [1])
+        third = LedgerStore(SQLiteStorage(self.path))
+        third.sync()
+        self.assertEqual(third.totals().expenses, 700)
+
+    def test_sync_does_not_block_readers(self):
+        """Test a sync with nothing new returns while another thread holds the read lock."""
+        first = LedgerStore(SQLiteStorage(self.path))
+        second = LedgerStore(SQLiteStorage(self.path))
+        first.add_document(Document(type='income', vendor='A', amount=50, date='2024-01-01'))
+        second.sync()
+        with second.reading():
+            thread = threading.Thread(target=second.sync)
+            thread.start()
+            thread.join(timeout=5)
+            self.assertFalse(thread.is_alive())
+        second.sync()
+        self.assertEqual(second.document_count(), 1)
+
+    def test_sync_skips_rows_already_applied(self):
+        """Test rows fetched by two overlapping syncs are applied once."""
+        first = LedgerStore(SQLiteStorage(self.path))
+        second = LedgerStore(SQLiteStorage(self.path))
+        doc = first.add_document(Document(type='income', vendor='A', amount=50, date='2024-01-01'))
+        first.update_documents([doc.replace(amount_cents=700)])
+        load_documents = second.backend.load_documents
+
+        def load_then_race(after_id):
+            rows = load_documents(after_id)
+            patcher.stop()
+            second.sync()  # Another request thread applies the same rows first
+            return rows
+
+        patcher = patch.object(second.backend, 'load_documents', load_then_race)
+        patcher.start()
+        second.sync()
+        self.assertEqual(second.document_count(), 1)
+        self.assertEqual(second.totals().revenue, 700)
+
+    def test_open_storage(self):
+        """Test backend selection from a database URL."""
+        self.assertIsNone(open_storage(None))
+        self.assertIsInstance(open_storage('sqlite:///' + self.path), SQLiteStorage)
+        with self.assertRaises(ValueError):
+            open_storage('mysql://localhost/db')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+"""Test the background task queues."""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+import taskqueue
+from ledger import LedgerStore
+from receipt_processor import save_extraction
+from records import COMPLETED, PENDING, Document, Extraction
+from storage import SQLiteStorage
+from taskqueue import InlineQueue, RedisQueue, TaskQueue, ThreadQueue, open_queue
+
+RESULT = {'vendor': 'Home Depot', 'amount_cents': 15678, 'date': '2024-01-15',
+          'line_items': [], 'tax_cents': 1234, 'subtotal_cents': 14444}
+
+
+def fake_extract(payload):
+    if payload.get('fail'):
+        raise RuntimeError('unreadable')
+    return RESULT
+
+
+FAKE_TASKS = {'extract_receipt': (fake_extract, save_extraction)}
+
+
+class TestTaskQueues(unittest.TestCase):
+    """Test queued extraction results reach the ledger."""
+
+    def setUp(self):
+        """Set up a store with one pending receipt and a fake extractor."""
+        self.store = LedgerStore()
+        self.doc = self.store.add_document(Document(type='expense', extraction=Extraction()))
+        patcher = patch.dict(taskqueue.TASKS, FAKE_TASKS)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_inline_queue(self):
+        """Test the inline queue applies results before submit returns."""
+        queue = InlineQueue(self.store)
+        queue.submit('extract_receipt', {'document_id': self.doc.id})
+        doc = self.store.get_document(self.doc.id)
+        self.assertEqual((doc.vendor, doc.amount_cents), ('Home Depot', 15678))
+        self.assertEqual(doc.extraction.status, COMPLETED)
+        self.assertEqual(self.store.totals().expenses, 15678)
+        self.assertEqual((queue.completed, queue.failed), (1, 0))
+        with self.assertRaises(KeyError):
+            queue.submit('unknown', {})
+
+    def test_thread_queue(self):
+        """Test worker threads run tasks and count failures."""
+        queue = ThreadQueue(self.store, workers=2)
+        self.addCleanup(queue.close)
+        queue.submit('extract_receipt', {'document_id': self.doc.id, 'fail': True})
+        queue.submit('extract_receipt', {'document_id': self.doc.id})
+        queue.join()
+        self.assertEqual(queue.depth(), 0)
+        self.assertEqual((queue.completed, queue.failed), (1, 1))
+        self.assertEqual(self.store.get_document(self.doc.id).extraction.status, COMPLETED)
+
+    def test_open_queue(self):
+        """Test TASK_QUEUE values select the backend."""
+        self.assertIsInstance(open_queue('inline', self.store), InlineQueue)
+        queue = open_queue('thread://3', self.store)
+        self.addCleanup(queue.close)
+        self.assertEqual(len(queue._threads), 3)
+        with self.assertRaises(ValueError):
+            open_queue('amqp://localhost', self.store)
+
+
+class FakeRedis:
+    """The list command RedisQueue.handle uses"""
+
+    def __init__(self):
+        self.lists = {}
+
+    def rpush(self, key, value):
+        self.lists.setdefault(key, []).append(value)
+
+
+class TestRedisWorker(unittest.TestCase):
+    """Test the scheduler's task handling survives a broken database."""
+
+    def setUp(self):
+        """Set up a Redis queue on a ledger whose sync fails."""
+        self.store = LedgerStore()
+        self.doc = self.store.add_document(Document(type='expense', extraction=Extraction()))
+        patcher = patch.dict(taskqueue.TASKS, FAKE_TASKS)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.queue = RedisQueue.__new__(RedisQueue)
+        TaskQueue.__init__(self.queue, self.store)
+        self.queue.key = 'tasks'
+        self.queue._redis = FakeRedis()
+
+    def test_failed_sync_requeues_the_task(self):
+        """Test a task whose sync fails is counted, re-queued, and dropped after MAX_ATTEMPTS."""
+        task = json.dumps({'name': 'extract_receipt', 'payload': {'document_id': self.doc.id}})
+        with patch.object(self.store, 'sync', side_effect=OSError('database is down')):
+            for _ in range(taskqueue.MAX_ATTEMPTS):
+                self.assertFalse(self.queue.handle(task))
+                requeued = self.queue._redis.lists.get('tasks', [])
+                task = requeued.pop() if requeued else None
+        self.assertIsNone(task)
+        self.assertEqual((self.queue.completed, self.queue.failed), (0, taskqueue.MAX_ATTEMPTS))
+
+        retried = json.dumps({'name': 'extract_receipt', 'payload': {'document_id': self.doc.id}, 'attempts': 1})
+        self.assertTrue(self.queue.handle(retried))
+        self.assertEqual(self.store.get_document(self.doc.id).extraction.status, COMPLETED)
+
+
+class TestWorkerSync(unittest.TestCase):
+    """Test a separate worker's extraction reaches the web workers."""
+
+    def setUp(self):
+        """Set up a throwaway database file."""
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'ledger.db')
+
+    def tearDown(self):
+        """Remove the database file."""
+        shutil.rmtree(self.tmpdir)
+
+    def test_worker_result_syncs(self):
+        """Test the pending status and extraction result round-trip through storage."""
+        web = LedgerStore(SQLiteStorage(self.path))
+        doc = web.add_document(Document(type='expense', extraction=Extraction()))
+        worker = LedgerStore(SQLiteStorage(self.path))
+        worker.sync()
+        self.assertEqual(worker.get_document(doc.id).extraction.status, PENDING)
+
+        save_extraction(worker, {'document_id': doc.id}, RESULT)
+        web.sync()
+        synced = web.get_document(doc.id)
+        self.assertEqual(synced.vendor, 'Home Depot')
+        self.assertEqual(synced.extraction, Extraction(COMPLETED, [], 1234, 14444))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,200 @@
+"""Test per-company ledgers and the shard router."""
+import io
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import patch
+import importer
+import taskqueue
+import tenants
+from receipt_processor import save_extraction
+from records import COMPLETED, Document, Extraction, Job
+from storage import SQLiteStorage
+from scripts import generate_sample_data
+from taskqueue import InlineQueue
+from tenants import DEFAULT_COMPANY, TenantRouter, company_id, open_shard, parse_shards
+
+if 'app' not in sys.modules:
+    os.environ.setdefault('UPLOAD_FOLDER', tempfile.mkdtemp(prefix='tenant-uploads-'))
+import app
+
+
+class TestCompanyIds(unittest.TestCase):
+    """Test company ids and shard settings."""
+
+    def test_company_id(self):
+        """Test names become ids safe in file and schema names."""
+        self.assertEqual(company_id('Acme Builders, LLC'), 'acme_builders_llc')
+        self.assertEqual(company_id('bob'), 'bob')
+        self.assertRegex(company_id('!!!'), r'^c_[0-9a-f]{12}$')
+        self.assertLessEqual(len(company_id('x' * 100)), 40)
+
+    def test_parse_shards(self):
+        """Test TENANT_SHARDS is a JSON object keyed by valid company ids."""
+        self.assertEqual(parse_shards(None), {})
+        self.assertEqual(parse_shards('{"acme": "sqlite:///acme.db"}'), {'acme': 'sqlite:///acme.db'})
+        with self.assertRaises(ValueError):
+            parse_shards('["acme"]')
+        with self.assertRaises(ValueError):
+            parse_shards('{"Acme; DROP": "sqlite:///x.db"}')
+
+
+class TestTenantRouter(unittest.TestCase):
+    """Test each company gets its own ledger and database."""
+
+    def setUp(self):
+        """Set up a throwaway data directory."""
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Remove the data directory."""
+        shutil.rmtree(self.tmpdir)
+
+    def test_memory_ledgers_are_separate(self):
+        """Test companies never see each other's documents or totals."""
+        router = TenantRouter()
+        acme = router.store_for('acme')
+        acme.add_document(Document(type='income', amount=500))
+        self.assertIs(router.store_for('acme'), acme)
+        self.assertEqual(router.store_for(DEFAULT_COMPANY).document_count(), 0)
+        self.assertEqual(acme.totals().revenue, 50000)
+        self.assertEqual(router.companies(), ['acme', DEFAULT_COMPANY])
+        with self.assertRaises(ValueError):
+            router.store_for('../acme')
+
+    def test_sqlite_files(self):
+        """Test the default company keeps the configured file and others get one each."""
+        url = 'sqlite:///' + os.path.join(self.tmpdir, 'ledger.db')
+        router = TenantRouter(url)
+        self.addCleanup(router.close)
+        router.store_for(DEFAULT_COMPANY).add_job(Job(number='JOB-1'))
+        router.store_for('acme').add_job(Job(number='JOB-A'))
+        self.assertEqual(sorted(os.listdir(self.tmpdir)),
+                         ['ledger-acme.db', 'ledger-acme.db-shm', 'ledger-acme.db-wal',
+                          'ledger.db', 'ledger.db-shm', 'ledger.db-wal'])
+        self.assertEqual([job.number for job in SQLiteStorage(os.path.join(self.tmpdir, 'ledger-acme.db'))
+                          .load_jobs()], ['JOB-A'])
+
+    def test_placeholder_and_shards(self):
+        """Test {company} URLs and explicit shard placement."""
+        template = 'sqlite:///' + os.path.join(self.tmpdir, 'tenants', '{company}.db')
+        big = 'sqlite:///' + os.path.join(self.tmpdir, 'big.db')
+        router = TenantRouter(template, {'acme': big})
+        self.addCleanup(router.close)
+        self.assertEqual(router.store_for('bob').backend.path, os.path.join(self.tmpdir, 'tenants', 'bob.db'))
+        self.assertEqual(router.store_for('acme').backend.path, os.path.join(self.tmpdir, 'big.db'))
+        self.assertIsNone(open_shard(None, 'acme'))
+
+    def test_least_recently_used_ledgers_are_closed(self):
+        """Test only max_open database ledgers stay open and a closed one reloads its rows."""
+        router = TenantRouter('sqlite:///' + os.path.join(self.tmpdir, '{company}.db'), max_open=2)
+        self.addCleanup(router.close)
+        router.store_for('acme')
+        router.store_for('bob').add_job(Job(number='JOB-B'))
+        router.store_for('acme')
+        router.store_for('carol')
+        self.assertEqual(router.companies(), ['acme', 'carol'])
+        bob = router.store_for('bob')
+        bob.sync()
+        self.assertEqual([job.number for job in bob.all_jobs()], ['JOB-B'])
+
+    def test_memory_ledgers_are_kept(self):
+        """Test in-memory ledgers are never dropped, since their rows live nowhere else."""
+        router = TenantRouter(max_open=1)
+        for company in ('acme', 'bob', 'carol'):
+            router.store_for(company).add_job(Job(number=company))
+        self.assertEqual(router.companies(), ['acme', 'bob', 'carol'])
+        self.assertEqual(router.store_for('acme').job_count(), 1)
+
+    def test_opening_a_company_does_not_block_others(self):
+        """Test a company whose ledger is slow to open holds up only its own lookups."""
+        router = TenantRouter('sqlite:///' + os.path.join(self.tmpdir, '{company}.db'))
+        self.addCleanup(router.close)
+        opening, release = threading.Event(), threading.Event()
+
+        def open_slowly(url, company, shards=None):
+            if company == 'slow':
+                opening.set()
+                release.wait(10)
+            return tenants.open_shard(url, company)
+        with patch.object(tenants, 'open_tenant', open_slowly):
+            thread = threading.Thread(target=router.store_for, args=('slow',))
+            thread.start()
+            opening.wait(10)
+            try:
+                self.assertIsNotNone(router.store_for('fast'))
+                self.assertEqual(router.companies(), ['fast'])
+            finally:
+                release.set()
+                thread.join()
+        self.assertEqual(router.companies(), ['fast', 'slow'])
+
+    def test_command_line_tools_target_a_company(self):
+        """Test bulk import and sample data generation write to the chosen company's ledger."""
+        url = 'sqlite:///' + os.path.join(self.tmpdir, 'ledger.db')
+        rows = os.path.join(self.tmpdir, 'rows.csv')
+        with open(rows, 'w', encoding='utf-8') as f:
+            f.write('type,date,amount,vendor\nexpense,2024-01-05,12.50,Home Depot\n')
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(importer.main([rows, '--database', url, '--company', 'acme']), 0)
+            generate_sample_data.main(['--jobs', '2', '--documents', '4', '--workers', '1', '--database', url,
+                                       '--company', 'bob'])
+        router = TenantRouter(url)
+        self.addCleanup(router.close)
+        for company, documents in (('acme', 1), ('bob', 4), (DEFAULT_COMPANY, 0)):
+            store = router.store_for(company)
+            store.sync()
+            self.assertEqual(store.document_count(), documents)
+
+    def test_task_results_reach_their_company(self):
+        """Test a queued task writes to the ledger of the company in its payload."""
+        router = TenantRouter()
+        doc = router.store_for('acme').add_document(Document(type='expense', extraction=Extraction()))
+        result = {'vendor': 'Home Depot', 'amount_cents': 1200, 'date': '2024-01-15', 'line_items': [],
+                  'tax_cents': 0, 'subtotal_cents': 1200}
+        with patch.dict(taskqueue.TASKS, {'extract_receipt': (lambda payload: result, save_extraction)}):
+            InlineQueue(router).submit('extract_receipt', {'document_id': doc.id, 'company': 'acme'})
+        self.assertEqual(router.store_for('acme').get_document(doc.id).extraction.status, COMPLETED)
+        self.assertEqual(router.store_for(DEFAULT_COMPANY).document_count(), 0)
+
+
+class TestAppTenancy(unittest.TestCase):
+    """Test users only see their own company's ledger."""
+
+    def setUp(self):
+        """Set up a client for a newly signed-up user."""
+        self.client = app.app.test_client()
+        self.client.post('/signup', buffered=True, data={
+            'username': 'Tenant Test', 'email': 't@example.com', 'password': 'pw', 'confirm_password': 'pw'})
+        self.addCleanup(app.users.pop, 'Tenant Test', None)
+        self.addCleanup(app.user_companies.pop, 'Tenant Test', None)
+
+    def test_signup_gets_an_empty_ledger(self):
+        """Test a new company starts empty and its writes stay out of the default ledger."""
+        self.assertEqual(app.user_companies['Tenant Test'], 'tenant_test')
+        self.assertEqual(self.client.get('/api/jobs', buffered=True).json['jobs'], [])
+        jobs_before = app.tenants.store_for(DEFAULT_COMPANY).job_count()
+        response = self.client.post('/api/jobs', json={'number': 'T-1', 'customer': 'Tenant'}, buffered=True)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(app.tenants.store_for('tenant_test').job_count(), 1)
+        self.assertEqual(app.tenants.store_for(DEFAULT_COMPANY).job_count(), jobs_before)
+
+        admin = app.app.test_client()
+        admin.post('/login', data={'username': 'admin', 'password': 'admin123'}, buffered=True)
+        numbers = [job['number'] for job in admin.get('/api/jobs', buffered=True).json['jobs']]
+        self.assertNotIn('T-1', numbers)
+
+    def test_company_names_are_unique(self):
+        """Test a username mapping to a taken company id is refused."""
+        client = app.app.test_client()
+        client.post('/signup', buffered=True, data={
+            'username': 'tenant_test', 'email': 't@example.com', 'password': 'pw', 'confirm_password': 'pw'})
+        self.assertNotIn('tenant_test', app.users)
+
+
+if __name__ == '__main__':
+    unittest.main()